@@ -8,6 +8,11 @@ Módulos principales:
 - data_processor: Procesamiento y scoring de datos
 - api_google: Integración con Google Maps API
 - main: Script principal del pipeline
+- pipeline: Ejecutor del pipeline por etapas (DAG con caché de artefactos)
+- districts: Dimensión compartida de distritos (id, alias, slug, UBIGEO)
+- watch: Modo daemon (reprocesa al llegar datos nuevos a data/raw/)
+- gazetteer: Gazetteer local de urbanizaciones (distrito sin geocodificar)
+- delta_feed: Feed versionado de cambios de properties.json (deltas + snapshots)
 """
 
 __version__ = "1.0.0"
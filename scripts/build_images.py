@@ -0,0 +1,232 @@
+"""
+BUILD DE IMÁGENES - Variantes responsivas de las fotos de distritos
+
+Para cada web/assets/img/<slug>.jpg de un distrito conocido genera
+versiones redimensionadas en AVIF (si Pillow lo soporta), WebP y JPEG,
+con un hash del contenido en el nombre (cacheables para siempre), y un
+manifest slug → variantes que usa el dashboard para armar <picture>.
+
+Solo se reconstruye una imagen si cambió su archivo fuente o las opciones
+del build (WIDTHS/FORMATS); ambos hashes quedan guardados en el manifest. Las imágenes se procesan en paralelo.
+
+Uso (desde la raíz del repo):
+    python scripts/build_images.py [--force] [--workers N]
+"""
+
+import argparse
+import hashlib
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps, features
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.districts import DISTRICT_TABLE
+
+SOURCE_DIR = "web/assets/img"
+BUILD_DIR = "web/assets/img/build"
+MANIFEST_PATH = os.path.join(BUILD_DIR, "manifest.json")
+# Las URLs del manifest son relativas a web/
+URL_PREFIX = "assets/img/build"
+
+WIDTHS = [320, 640, 1024]
+SOURCE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# formato → (extensión, opciones de Pillow)
+FORMATS = {
+    "avif": ("avif", {"quality": 50}),
+    "webp": ("webp", {"quality": 75, "method": 6}),
+    "jpeg": ("jpg", {"quality": 80, "optimize": True, "progressive": True}),
+}
+
+
+def available_formats():
+    """AVIF solo si el Pillow instalado lo trae compilado"""
+    formats = ["webp", "jpeg"]
+    if features.check("avif"):
+        formats.insert(0, "avif")
+    return formats
+
+
+def build_key(formats):
+    """Hash de las opciones que definen las variantes (anchos, formatos y calidades)"""
+    options = {"widths": WIDTHS, "formats": {fmt: FORMATS[fmt] for fmt in formats}}
+    return hashlib.sha256(json.dumps(options, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def find_sources(source_dir=SOURCE_DIR):
+    """
+    slug → ruta de la imagen fuente, solo para distritos de la dimensión.
+    Retorna también los archivos ignorados (p.ej. capturas de debug).
+    """
+    slugs = set(DISTRICT_TABLE["slug"])
+    sources, ignored = {}, []
+    for name in sorted(os.listdir(source_dir)):
+        path = os.path.join(source_dir, name)
+        stem, ext = os.path.splitext(name)
+        if not os.path.isfile(path) or ext.lower() not in SOURCE_EXTENSIONS:
+            continue
+        if stem in slugs:
+            sources[stem] = path
+        else:
+            ignored.append(name)
+    return sources, ignored
+
+
+def build_variants(slug, source_path, formats, build_dir=BUILD_DIR):
+    """Genera todas las variantes de una imagen (se ejecuta en un proceso del pool)"""
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        width, height = image.size
+
+        # No agrandar: los anchos mayores al original se reemplazan por el original
+        widths = sorted({min(w, width) for w in WIDTHS})
+
+        variants = {fmt: [] for fmt in formats}
+        for w in widths:
+            resized = image if w == width else image.resize(
+                (w, round(height * w / width)), Image.LANCZOS
+            )
+            for fmt in formats:
+                ext, options = FORMATS[fmt]
+                buffer = io.BytesIO()
+                resized.save(buffer, format=fmt.upper(), **options)
+                data = buffer.getvalue()
+
+                digest = hashlib.sha256(data).hexdigest()[:10]
+                filename = f"{slug}-{w}.{digest}.{ext}"
+                path = os.path.join(build_dir, filename)
+                if not os.path.exists(path):
+                    with open(path, "wb") as f:
+                        f.write(data)
+
+                variants[fmt].append({
+                    "width": w,
+                    "url": f"{URL_PREFIX}/{filename}",
+                    "bytes": len(data),
+                })
+
+    return {
+        "source": os.path.basename(source_path),
+        "width": width,
+        "height": height,
+        "variants": variants,
+    }
+
+
+def load_manifest(path=MANIFEST_PATH):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def _variants_exist(entry, formats):
+    for fmt in formats:
+        if fmt not in entry["variants"]:
+            return False
+        for variant in entry["variants"][fmt]:
+            filename = os.path.basename(variant["url"])
+            if not os.path.exists(os.path.join(BUILD_DIR, filename)):
+                return False
+    return True
+
+
+def remove_stale_files(manifest, build_dir=BUILD_DIR):
+    """Borra variantes que ya no referencia el manifest"""
+    referenced = {
+        os.path.basename(variant["url"])
+        for entry in manifest.values()
+        for variants in entry["variants"].values()
+        for variant in variants
+    }
+    removed = 0
+    for name in os.listdir(build_dir):
+        if name != os.path.basename(MANIFEST_PATH) and name not in referenced:
+            os.remove(os.path.join(build_dir, name))
+            removed += 1
+    return removed
+
+
+def build_images(force=False, workers=None):
+    """Reconstruye solo las imágenes cuyo archivo fuente u opciones de build cambiaron"""
+    os.makedirs(BUILD_DIR, exist_ok=True)
+    formats = available_formats()
+    sources, ignored = find_sources()
+    old_manifest = load_manifest()
+
+    if ignored:
+        print(f"   Ignorados (no son distritos): {ignored}")
+
+    options = build_key(formats)
+    manifest, pending = {}, {}
+    for slug, path in sources.items():
+        source_sha256 = file_sha256(path)
+        entry = old_manifest.get(slug)
+        if (not force and entry and entry.get("source_sha256") == source_sha256
+                and entry.get("build_key") == options and _variants_exist(entry, formats)):
+            manifest[slug] = entry
+        else:
+            pending[slug] = (path, source_sha256)
+
+    print(f"🖼️  Imágenes: {len(sources)} | a reconstruir: {len(pending)} | formatos: {formats}")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                slug: pool.submit(build_variants, slug, path, formats)
+                for slug, (path, _) in pending.items()
+            }
+            for slug, future in futures.items():
+                entry = future.result()
+                entry["source_sha256"] = pending[slug][1]
+                entry["build_key"] = options
+                manifest[slug] = entry
+                print(f"   ✅ {slug}")
+
+    manifest = dict(sorted(manifest.items()))
+    tmp = MANIFEST_PATH + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, MANIFEST_PATH)
+
+    removed = remove_stale_files(manifest)
+    if removed:
+        print(f"   🧹 Variantes obsoletas borradas: {removed}")
+
+    source_bytes = sum(os.path.getsize(p) for p in sources.values())
+    smallest = sum(
+        min(v["bytes"] for v in entry["variants"][formats[0]])
+        for entry in manifest.values()
+    )
+    print(f"✅ Manifest guardado: {MANIFEST_PATH}")
+    print(f"   Fuente: {source_bytes / 1e6:.1f} MB → variante móvil ({formats[0]}): {smallest / 1e6:.2f} MB")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera variantes responsivas de las imágenes de distritos")
+    parser.add_argument("--force", action="store_true", help="reconstruir todas las imágenes")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🖼️  LIMA HOUSING ANALYTICS - BUILD DE IMÁGENES")
+    print("=" * 60)
+    build_images(force=args.force, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
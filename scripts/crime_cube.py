@@ -0,0 +1,159 @@
+"""
+Cubo de delitos: distrito × periodo × categoría de delito
+
+Arreglo denso de NumPy con `cantidad` sumada, más los diccionarios de
+cada dimensión. Se escribe en la misma pasada que security_by_district.csv
+(process_security.py), así que otras vistas del security_score (otros
+años, sin faltas menores, ponderado por tipo de delito) salen del cubo
+en milisegundos sin releer el extracto INEI.
+
+Ejemplo:
+    cube = CrimeCube.load()
+    cube.security_scores(periods=("2022-01", "2022-12"))
+    cube.security_scores(weights={"HURTO": 0.5, "ROBO": 2.0})
+"""
+
+import numpy as np
+import pandas as pd
+
+from scripts.districts import DISTRICT_TABLE, district_names
+
+CUBE_PATH = "data/processed/crime_cube.npz"
+
+# Columnas candidatas del extracto INEI (se usan las que existan)
+YEAR_COLUMNS = ["ANIO", "ANIO_HECHO", "AÑO", "ANO", "PERIODO_ANIO"]
+MONTH_COLUMNS = ["MES", "MES_HECHO", "PERIODO_MES"]
+CATEGORY_COLUMNS = ["GENERICO", "P_MODALIDADES", "MODALIDAD", "DELITO", "TIPO_DELITO"]
+
+TOTAL = "TOTAL"
+UNDATED = "SIN FECHA"  # filas con el año vacío en un extracto que sí trae fechas
+
+
+def _first_column(df, candidates):
+    for column in candidates:
+        if column in df.columns:
+            return column
+    return None
+
+
+def add_cube_keys(df):
+    """
+    Agrega las columnas `period` y `category` a un bloque INEI.
+    period = 'AAAA-MM' si hay año y mes, 'AAAA' si solo hay año, 'TOTAL' si el
+    extracto no trae fechas y 'SIN FECHA' para filas con el año vacío.
+    """
+    year_col = _first_column(df, YEAR_COLUMNS)
+    month_col = _first_column(df, MONTH_COLUMNS)
+    category_col = _first_column(df, CATEGORY_COLUMNS)
+
+    if year_col:
+        # Año vacío → UNDATED; año sin mes válido → 'AAAA' (nunca '<NA>-<NA>')
+        year = pd.to_numeric(df[year_col], errors="coerce").astype("Int64")
+        period = pd.Series(UNDATED, index=df.index, dtype=object)
+        dated = year.notna()
+        period[dated] = year[dated].astype(str)
+        if month_col:
+            month = pd.to_numeric(df[month_col], errors="coerce").astype("Int64")
+            monthly = dated & month.between(1, 12).fillna(False).astype(bool)
+            period[monthly] = period[monthly] + "-" + month[monthly].astype(str).str.zfill(2)
+        df["period"] = period
+    else:
+        df["period"] = TOTAL
+
+    if category_col:
+        df["category"] = df[category_col].astype(str).str.upper().str.strip()
+    else:
+        df["category"] = TOTAL
+    return df
+
+
+class CrimeCube:
+    """Cubo denso (distritos × periodos × categorías) con sus dimensiones"""
+
+    def __init__(self, counts, district_ids, periods, categories):
+        self.counts = counts
+        self.district_ids = np.asarray(district_ids, dtype=np.int16)
+        self.periods = np.asarray(periods, dtype=str)
+        self.categories = np.asarray(categories, dtype=str)
+
+    @classmethod
+    def from_long(cls, long_df):
+        """Construye el cubo desde filas (district_id, period, category, crime_count)"""
+        district_ids = np.sort(long_df["district_id"].unique())
+        periods = np.sort(long_df["period"].unique())
+        categories = np.sort(long_df["category"].unique())
+
+        d = np.searchsorted(district_ids, long_df["district_id"].to_numpy())
+        p = np.searchsorted(periods, long_df["period"].to_numpy())
+        c = np.searchsorted(categories, long_df["category"].to_numpy())
+
+        counts = np.zeros((len(district_ids), len(periods), len(categories)), dtype=np.int64)
+        np.add.at(counts, (d, p, c), long_df["crime_count"].to_numpy(dtype=np.int64))
+        return cls(counts, district_ids, periods, categories)
+
+    def save(self, path=CUBE_PATH):
+        np.savez_compressed(
+            path,
+            counts=self.counts,
+            district_ids=self.district_ids,
+            periods=self.periods,
+            categories=self.categories,
+        )
+
+    @classmethod
+    def load(cls, path=CUBE_PATH):
+        with np.load(path) as data:
+            return cls(data["counts"], data["district_ids"], data["periods"], data["categories"])
+
+    def _period_mask(self, periods):
+        if periods is None:
+            return np.ones(len(self.periods), dtype=bool)
+        if isinstance(periods, tuple):
+            # Rango inclusivo; los periodos 'AAAA-MM' se ordenan como texto
+            start, end = periods
+            return (self.periods >= str(start)) & (self.periods <= str(end))
+        return np.isin(self.periods, [str(p) for p in periods])
+
+    def _category_weights(self, weights, exclude):
+        category_weights = np.ones(len(self.categories))
+        for category, weight in (weights or {}).items():
+            category_weights[self.categories == category.upper()] = weight
+        for category in exclude or []:
+            category_weights[self.categories == category.upper()] = 0.0
+        return category_weights
+
+    def crime_counts(self, periods=None, weights=None, exclude=None):
+        """
+        Delitos por distrito (arreglo alineado con district_ids).
+        periods: None (todo), lista de periodos o tupla (inicio, fin).
+        weights: dict categoría → peso (las no listadas pesan 1.0).
+        exclude: categorías a ignorar (equivale a peso 0).
+        """
+        category_weights = self._category_weights(weights, exclude)
+        mask = self._period_mask(periods)
+        if periods is not None and not mask.any():
+            raise ValueError(f"Ningún periodo del cubo coincide con {periods} (disponibles: {list(self.periods)})")
+        window = self.counts[:, mask, :]
+        return window.sum(axis=1) @ category_weights
+
+    def security_scores(self, periods=None, weights=None, exclude=None):
+        """Misma escala que security_by_district.csv (0-10, menos delitos = mejor)"""
+        crime = self.crime_counts(periods, weights, exclude)
+        min_crime, max_crime = crime.min(), crime.max()
+        spread = (max_crime - min_crime) or 1.0
+
+        return pd.DataFrame({
+            "district_id": self.district_ids,
+            "ubigeo": DISTRICT_TABLE.loc[self.district_ids, "ubigeo"].values,
+            "district": district_names(self.district_ids),
+            "crime_count": crime,
+            "security_score": (10 - (crime - min_crime) / spread * 10).round(2),
+        })
+
+    def trend(self, district_id, weights=None, exclude=None):
+        """Serie por periodo para un distrito"""
+        i = int(np.searchsorted(self.district_ids, district_id))
+        if i >= len(self.district_ids) or self.district_ids[i] != district_id:
+            raise KeyError(f"district_id {district_id} no está en el cubo")
+        category_weights = self._category_weights(weights, exclude)
+        return pd.Series(self.counts[i] @ category_weights, index=self.periods, name="crime_count")
@@ -1,48 +1,38 @@
+import argparse
 import pandas as pd
 import os
 import re
+import sys
 
-def clean_price(price_str):
-    """Limpia y convierte precios a soles"""
-    if pd.isna(price_str):
-        return None
-    
-    price_str = str(price_str).upper().strip()
-    
-    # Extraer número (soporta comas como separadores de miles)
-    number_match = re.search(r'[\d,]+\.?\d*', price_str.replace(',', ''))
-    if not number_match:
-        return None
-    
-    value = float(number_match.group(0).replace(',', ''))
-    
-    # Detectar moneda
-    if 'USD' in price_str:
-        return value * 3.7  # tipo de cambio
-    else:
-        return value  # asumir soles
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def clean_area(area_str):
-    """Limpia el área y extrae el valor numérico"""
-    if pd.isna(area_str):
-        return None
-    
-    # Buscar número (puede tener comas)
-    match = re.search(r'[\d,]+\.?\d*', str(area_str).replace(',', ''))
-    return float(match.group(0)) if match else None
+from scripts.districts import (
+    UNKNOWN_ID, district_names, district_slugs, lookup_by_id,
+    resolve_district_id, resolve_district_ids,
+)
+from scripts.district_polygons import load_polygons
+from scripts.gazetteer import load_gazetteer
+from scripts.exporters import ExportQueue, write_csv, write_json_records
+from scripts.validation import parse_count, parse_number, parse_price
+
+DATASET_PATH = "data/raw/dataset.csv"
+SECURITY_PATH = "data/processed/security_by_district.csv"
+OUTPUT_CSV = "data/processed/scored_properties.csv"
+OUTPUT_JSON = "web/data/properties.json"
 
-def clean_bedroom_bathroom(value):
-    """Convierte '2 dormitorios' o '3 baños' a int"""
-    if pd.isna(value):
-        return 1
-    
-    value_str = str(value).strip()
-    match = re.search(r'(\d+)', value_str)
-    return int(match.group(1)) if match else 1
+# Columnas que recibe el frontend
+JSON_COLUMNS = [
+    'title', 'location', 'district', 'district_slug',
+    'price_clean', 'area_clean', 
+    'bedroom_clean', 'bathroom_clean',
+    'cost_score', 'safety_score', 'services_score', 'final_score',
+    'date_pub', 'url'
+]
 
 def extract_district_from_location(location):
     """
-    Extrae el distrito de una ubicación.
+    Extrae el distrito de una ubicación (texto crudo; los alias y tildes
+    se resuelven después con la dimensión de distritos).
     Para Lima: 'Ur. Santa Cruz, Miraflores, Lima, Lima' → 'MIRAFLORES'
     Para otras ciudades: retorna None
     """
@@ -62,79 +52,60 @@ def extract_district_from_location(location):
         # Limpiar prefijos comunes
         district = re.sub(r'^(URB\.|URB|UR\.|UR|AV\.|AV|CALLE|JR\.|JR)\s+', '', district)
         
-        # Corregir nombres específicos
-        corrections = {
-            'SANTIAGO DE SURCO': 'SURCO',
-            'SAN MARTÍN DE PORRES': 'SAN MARTIN DE PORRES',
-            'JESÚS MARÍA': 'JESUS MARIA',
-            'MAGDALENA DEL MAR': 'MAGDALENA DEL MAR',
-            'VILLA MARÍA DEL TRIUNFO': 'VILLA MARIA DEL TRIUNFO',
-            'LURIGANCHO - CHOSICA': 'LURIGANCHO',
-            'SANTA MARÍA DEL MAR': 'SANTA MARIA DEL MAR'
-        }
-        
-        # Aplicar correcciones
-        for wrong, correct in corrections.items():
-            if wrong in district:
-                district = district.replace(wrong, correct)
-                break
-        
         return district
     
     # Si no cumple el patrón de Lima, retornar None
     return None
 
-def normalize_district_name(district):
-    """Normaliza nombres de distritos para coincidir con security_by_district.csv"""
-    if pd.isna(district):
-        return None
-    
-    district_str = str(district).upper().strip()
-    
-    # Lista exacta de distritos en security_by_district.csv
-    VALID_DISTRICTS = [
-        'ANCON', 'ATE', 'BARRANCO', 'BREÑA', 'CARABAYLLO', 'CHACLACAYO',
-        'CHORRILLOS', 'CIENEGUILLA', 'COMAS', 'EL AGUSTINO', 'INDEPENDENCIA',
-        'JESUS MARIA', 'LA MOLINA', 'LA VICTORIA', 'LIMA', 'LINCE', 'LOS OLIVOS',
-        'LURIGANCHO', 'LURIN', 'MAGDALENA DEL MAR', 'MIRAFLORES', 'PACHACAMAC',
-        'PUEBLO LIBRE', 'PUENTE PIEDRA', 'RIMAC', 'SAN BARTOLO', 'SAN BORJA',
-        'SAN ISIDRO', 'SAN JUAN DE LURIGANCHO', 'SAN JUAN DE MIRAFLORES',
-        'SAN LUIS', 'SAN MARTIN DE PORRES', 'SAN MIGUEL', 'SANTA ANITA',
-        'SANTA MARIA DEL MAR', 'SANTA ROSA', 'SURCO', 'SURQUILLO',
-        'VILLA EL SALVADOR', 'VILLA MARIA DEL TRIUNFO', 'PUNTA HERMOSA',
-        'PUNTA NEGRA', 'PUCUSANA'
-    ]
-    
-    # Verificar si ya está en la lista
-    if district_str in VALID_DISTRICTS:
-        return district_str
-    
-    # Intentar mapear nombres similares
-    mappings = {
-        'SANTIAGO DE SURCO': 'SURCO',
-        'LURIGANCHO - CHOSICA': 'LURIGANCHO',
-        'SAN MARTÍN DE PORRES': 'SAN MARTIN DE PORRES',
-        'JESÚS MARÍA': 'JESUS MARIA',
-        'VILLA MARÍA DEL TRIUNFO': 'VILLA MARIA DEL TRIUNFO',
-        'SANTA MARÍA DEL MAR': 'SANTA MARIA DEL MAR'
-    }
-    
-    for wrong, correct in mappings.items():
-        if wrong in district_str:
-            return correct
-    
-    return None
+def load_security_scores(path=SECURITY_PATH):
+    """Carga security_by_district.csv y asegura la columna district_id"""
+    security_df = pd.read_csv(path)
+    if "district_id" not in security_df.columns:
+        # CSV generado antes de la dimensión de distritos
+        security_df["district_id"] = resolve_district_ids(security_df["district"])
+    return security_df
 
-def calculate_scores(df):
-    """Calcula scores para propiedades de Lima"""
+def load_listings(path=DATASET_PATH):
+    """Carga el dataset crudo y filtra solo alquileres"""
+    print("\n📥 Cargando dataset...")
+    df = pd.read_csv(path, encoding='utf-8')
+    print(f"   Total propiedades en dataset: {len(df)}")
+    
+    # Filtrar solo alquileres
+    if 'operation_type' in df.columns:
+        df = filter_rentals(df)
+        print(f"   Alquileres encontrados: {len(df)}")
+    
+    return df
+
+def filter_rentals(df):
+    """Solo filas de alquiler (operation_type contiene 'alquiler')"""
+    if 'operation_type' not in df.columns:
+        return df
+    return df[df['operation_type'].str.contains('alquiler', case=False, na=False)]
+
+def clean_listings(df, lima_only=True):
+    """
+    Limpia precio/área/ambientes/año y resuelve el distrito de cada propiedad.
+    lima_only=True: solo propiedades de Lima. Con lat/lon y el GeoJSON de
+    distritos, el distrito sale del polígono que contiene al punto; sin
+    coordenadas o con un punto fuera de todos los polígonos, del gazetteer
+    local (distrito o urbanización en location, ver gazetteer.py) y, para
+    lo que no resuelva, de la regex sobre location. Las filas sin lat/lon
+    toman el centroide de su urbanización si el gazetteer lo trae.
+    En todos los casos se resuelve con la dimensión.
+    lima_only=False: cualquier ciudad; el distrito es la parte 'distrito' de
+    location (ver partitions.parse_location) y no se cruza con la dimensión
+    de Lima (Arequipa también tiene un Miraflores).
+    """
     
     print("🧹 Limpiando datos básicos...")
     
-    # Limpiar datos básicos
-    df['price_clean'] = df['price'].apply(clean_price)
-    df['area_clean'] = df['area'].apply(clean_area)
-    df['bedroom_clean'] = df['bedroom'].apply(clean_bedroom_bathroom)
-    df['bathroom_clean'] = df['bathroom'].apply(clean_bedroom_bathroom)
+    # Limpiar datos básicos (parsers vectorizados de validation.py, los mismos que se validan)
+    df['price_clean'] = parse_price(df['price']).astype(float)
+    df['area_clean'] = parse_number(df['area']).astype(float)
+    df['bedroom_clean'] = parse_count(df['bedroom'])
+    df['bathroom_clean'] = parse_count(df['bathroom'])
     
     # Año de construcción (valor por defecto 2000 si no hay)
     if 'year_contruction' in df.columns:
@@ -143,27 +114,74 @@ def calculate_scores(df):
     
     print("📍 Extrayendo distritos...")
     
-    # Extraer distritos
-    df['district'] = df['location'].apply(extract_district_from_location)
+    if not lima_only:
+        df['district'] = df['location_district'].str.upper()
+        df = df[df['district'].notna()].copy()
+        df['district_id'] = UNKNOWN_ID
+        df['district_slug'] = None
+        return df
+    
+    # Con coordenadas: distrito por punto en polígono; sin coordenadas: texto de location
+    # (un punto fuera de todos los polígonos también se resuelve por texto)
+    by_coords = pd.Series(False, index=df.index)
+    polygons = load_polygons()
+    if polygons is not None and {'lat', 'lon'}.issubset(df.columns):
+        located = df['lat'].notna() & df['lon'].notna()
+        geo_ids = pd.Series(
+            polygons.assign(df.loc[located, 'lon'], df.loc[located, 'lat']), index=df.index[located]
+        )
+        geo_ids = geo_ids[geo_ids != UNKNOWN_ID]
+        by_coords = pd.Series(df.index.isin(geo_ids.index), index=df.index)
+        print(f"   Distrito por coordenadas: {by_coords.sum()} | fuera de los polígonos: "
+              f"{located.sum() - by_coords.sum()} | por texto: {(~by_coords).sum()}")
+    
+    # Extraer distritos: gazetteer local (en lote) y regex solo para lo que no resuelve
+    df['district'] = None
+    by_text = ~by_coords
+    gazetteer = load_gazetteer()
+    if gazetteer is not None:
+        found = gazetteer.resolve(df.loc[by_text, 'location'])
+        resolved = found['district_id'] != UNKNOWN_ID
+        df.loc[resolved.index[resolved], 'district'] = district_names(found.loc[resolved, 'district_id'])
+        by_text = by_text & df['district'].isna()
+        
+        # Centroide de la urbanización solo para las filas sin lat/lon propias
+        fill = found['lat'].notna() & found['lon'].notna()
+        if {'lat', 'lon'}.issubset(df.columns):
+            fill &= df.loc[found.index, 'lat'].isna() | df.loc[found.index, 'lon'].isna()
+        if fill.any():
+            for axis in ('lat', 'lon'):
+                if axis not in df.columns:
+                    df[axis] = float('nan')
+            df.loc[fill.index[fill], ['lat', 'lon']] = found.loc[fill, ['lat', 'lon']].to_numpy()
+        print(f"   Distrito por gazetteer: {resolved.sum()} ({fill.sum()} coordenadas de urbanización) | "
+              f"por regex: {by_text.sum()}")
+    df.loc[by_text, 'district'] = df.loc[by_text, 'location'].apply(extract_district_from_location)
+    if by_coords.any():
+        df.loc[geo_ids.index, 'district'] = district_names(geo_ids)
     
     # Filtrar SOLO propiedades con distrito válido de Lima
     initial_count = len(df)
     df = df[df['district'].notna()].copy()
     print(f"   Propiedades con distrito de Lima: {len(df)}/{initial_count}")
     
-    # Normalizar nombres de distrito
-    df['district'] = df['district'].apply(normalize_district_name)
+    # Resolver distrito → id una sola vez (cada nombre distinto se resuelve una vez)
+    df['district_id'] = resolve_district_ids(df['district'])
+    df['district'] = district_names(df['district_id'])
+    df['district_slug'] = district_slugs(df['district_id'])
     
-    # Cargar datos de seguridad
-    security_df = pd.read_csv("data/processed/security_by_district.csv")
-    security_df["district_norm"] = security_df["district"].apply(normalize_district_name)
+    return df
+
+def score_listings(df, security_df, max_price_m2=None):
+    """
+    Calcula scores para propiedades ya limpias (ver clean_listings).
+    max_price_m2: referencia para normalizar cost_score; por defecto el
+    máximo de df (el modo muestra usa el de la última corrida completa).
+    """
     
-    # Merge con seguridad
-    df = pd.merge(
-        df,
-        security_df[["district_norm", "security_score"]].rename(columns={"district_norm": "district"}),
-        on="district",
-        how="left"
+    # Join con seguridad por id (búsqueda en arreglo)
+    df['security_score'] = lookup_by_id(
+        df['district_id'], security_df['district_id'], security_df['security_score']
     )
     
     # Renombrar
@@ -173,8 +191,14 @@ def calculate_scores(df):
     matched = df['safety_score'].notna().sum()
     print(f"✅ Coincidencias con seguridad: {matched}/{len(df)}")
     
-    if matched < len(df):
+    if len(df) and (df['district_id'] == UNKNOWN_ID).all():
+        # Ciudades fuera de Lima: no hay datos INEI por distrito
+        print(f"ℹ️  Sin datos de seguridad para esta ciudad (safety_score = 5.0)")
+    elif matched < len(df):
         missing = df[df['safety_score'].isna()]['district'].unique()
+        if (df['district_id'] == UNKNOWN_ID).any():
+            unknown = df.loc[df['district_id'] == UNKNOWN_ID, 'location'].head(5).tolist()
+            print(f"⚠️  Ubicaciones sin distrito reconocido (ej.): {unknown}")
         print(f"⚠️  Distritos sin match: {missing}")
     
     # Rellenar valores faltantes
@@ -191,7 +215,8 @@ def calculate_scores(df):
     
     if len(valid_data) > 0:
         valid_data['price_per_m2'] = valid_data['price_clean'] / valid_data['area_clean']
-        max_price_m2 = valid_data['price_per_m2'].max()
+        if max_price_m2 is None:
+            max_price_m2 = valid_data['price_per_m2'].max()
         
         if max_price_m2 > 0:
             # Normalizar: precio más bajo = score más alto
@@ -237,84 +262,86 @@ def calculate_scores(df):
     
     return df, valid_for_display
 
+def export_results(df_scored, output_csv=OUTPUT_CSV, output_json=OUTPUT_JSON, exports=None):
+    """
+    Guarda el CSV completo y el JSON para el frontend en hilos de fondo.
+    Si se pasa `exports` (ExportQueue) solo se encolan y el llamador decide
+    cuándo esperar; si no, se espera a que ambos terminen.
+    """
+    queue = exports or ExportQueue()
+    
+    # Ambos se serializan por bloques y se publican con rename atómico
+    queue.submit(write_csv, df_scored, output_csv)
+    queue.submit(write_json_records, df_scored, output_json, JSON_COLUMNS)
+    
+    if exports is None:
+        with queue:
+            pass
+        print(f"✅ CSV guardado: {output_csv}")
+        print(f"✅ JSON guardado: {output_json}")
+        print(f"   Propiedades en JSON: {len(df_scored)}")
+
+def print_report(valid_data):
+    """Muestra top 5 y estadísticas por distrito"""
+    if len(valid_data) > 0:
+        print(f"\n🏆 TOP 5 PROPIEDADES (MEJOR SCORE):")
+        top5 = valid_data.head(5)
+        for i, (_, row) in enumerate(top5.iterrows(), 1):
+            print(f"   {i}. {row['district']} - S/. {row['price_clean']:.0f} - {row['area_clean']:.0f}m²")
+            print(f"      Score: {row['final_score']:.1f} (Costo:{row['cost_score']:.1f}, Seg:{row['safety_score']:.1f}, Serv:{row['services_score']:.1f})")
+        
+        print(f"\n📈 ESTADÍSTICAS GENERALES:")
+        print(f"   • Precio promedio: S/. {valid_data['price_clean'].mean():.0f}")
+        print(f"   • Área promedio: {valid_data['area_clean'].mean():.0f} m²")
+        print(f"   • Score promedio: {valid_data['final_score'].mean():.1f}")
+        
+        print(f"\n🏙️  DISTRITOS CON MÁS PROPIEDADES:")
+        district_stats = valid_data['district'].value_counts().head(5)
+        for distrito, count in district_stats.items():
+            avg_price = valid_data[valid_data['district'] == distrito]['price_clean'].mean()
+            avg_score = valid_data[valid_data['district'] == distrito]['final_score'].mean()
+            print(f"   • {distrito}: {count} propiedades")
+            print(f"     Precio avg: S/. {avg_price:.0f}, Score avg: {avg_score:.1f}")
+
 def main():
+    parser = argparse.ArgumentParser(description="Procesa y puntúa las propiedades del dataset")
+    parser.add_argument("--sample", type=float, default=None, metavar="FRACCION",
+                        help="vista previa sobre una muestra estratificada por distrito (ej. 0.2); no publica salidas")
+    parser.add_argument("--seed", type=int, default=42, help="semilla de la muestra (default: 42)")
+    parser.add_argument("--top", type=int, default=10, help="tamaño del top-N a comparar (default: 10)")
+    args = parser.parse_args()
+    
     print("="*60)
     print("🏡 LIMA HOUSING ANALYTICS - PROCESADOR FINAL")
     print("="*60)
     
     try:
-        # Cargar datos
-        print("\n📥 Cargando dataset...")
-        df = pd.read_csv('data/raw/dataset.csv', encoding='utf-8')
-        print(f"   Total propiedades en dataset: {len(df)}")
+        if args.sample is not None:
+            from scripts.sampling import run_sample
+            run_sample(args.sample, seed=args.seed, top_n=args.top)
+            return
         
-        # Filtrar solo alquileres
-        if 'operation_type' in df.columns:
-            df = df[df['operation_type'].str.contains('alquiler', case=False, na=False)]
-            print(f"   Alquileres encontrados: {len(df)}")
+        # Import diferido: partitions usa las funciones de este módulo
+        from scripts import partitions
         
-        # Calcular scores
-        df_scored, valid_data = calculate_scores(df)
+        # Cargar, validar (filas inválidas → cuarentena) y particionar por ciudad
+        partitions.ingest()
         
-        print(f"\n📊 RESULTADOS:")
-        print(f"   • Propiedades procesadas: {len(df_scored)}")
-        print(f"   • Propiedades válidas para mostrar: {len(valid_data)}")
-        
-        # Guardar CSV
-        output_csv = 'data/processed/scored_properties.csv'
-        os.makedirs(os.path.dirname(output_csv), exist_ok=True)
-        df_scored.to_csv(output_csv, index=False, encoding='utf-8-sig')
-        print(f"✅ CSV guardado: {output_csv}")
-        
-        # Preparar JSON para frontend
-        print("\n🔄 Preparando JSON para frontend...")
-        
-        # Seleccionar columnas importantes
-        columns_for_json = [
-            'title', 'location', 'district',
-            'price_clean', 'area_clean', 
-            'bedroom_clean', 'bathroom_clean',
-            'cost_score', 'safety_score', 'services_score', 'final_score',
-            'date_pub', 'url'
-        ]
-        
-        # Filtrar columnas existentes
-        columns_for_json = [col for col in columns_for_json if col in df_scored.columns]
-        json_data = df_scored[columns_for_json].copy()
+        # Calcular scores por ciudad (en paralelo; solo las que cambiaron)
+        processed = partitions.process_partitions()
         
-        # Convertir NaN a None
-        json_data = json_data.where(pd.notna(json_data), None)
-        
-        # Guardar JSON
-        output_json = 'web/data/properties.json'
-        os.makedirs(os.path.dirname(output_json), exist_ok=True)
-        
-        with open(output_json, 'w', encoding='utf-8') as f:
-            json_data.to_json(f, orient='records', force_ascii=False, indent=2)
-        
-        print(f"✅ JSON guardado: {output_json}")
-        print(f"   Propiedades en JSON: {len(json_data)}")
+        print(f"\n📊 RESULTADOS:")
+        for city, summary in sorted(processed.items()):
+            print(f"   • city={city}: {summary['rows']} procesadas, {summary['valid']} válidas para mostrar")
         
-        # Mostrar estadísticas
-        if len(valid_data) > 0:
-            print(f"\n🏆 TOP 5 PROPIEDADES (MEJOR SCORE):")
-            top5 = valid_data.head(5)
-            for i, (_, row) in enumerate(top5.iterrows(), 1):
-                print(f"   {i}. {row['district']} - S/. {row['price_clean']:.0f} - {row['area_clean']:.0f}m²")
-                print(f"      Score: {row['final_score']:.1f} (Costo:{row['cost_score']:.1f}, Seg:{row['safety_score']:.1f}, Serv:{row['services_score']:.1f})")
-            
-            print(f"\n📈 ESTADÍSTICAS GENERALES:")
-            print(f"   • Precio promedio: S/. {valid_data['price_clean'].mean():.0f}")
-            print(f"   • Área promedio: {valid_data['area_clean'].mean():.0f} m²")
-            print(f"   • Score promedio: {valid_data['final_score'].mean():.1f}")
-            
-            print(f"\n🏙️  DISTRITOS CON MÁS PROPIEDADES:")
-            district_stats = valid_data['district'].value_counts().head(5)
-            for distrito, count in district_stats.items():
-                avg_price = valid_data[valid_data['district'] == distrito]['price_clean'].mean()
-                avg_score = valid_data[valid_data['district'] == distrito]['final_score'].mean()
-                print(f"   • {distrito}: {count} propiedades")
-                print(f"     Precio avg: S/. {avg_price:.0f}, Score avg: {avg_score:.1f}")
+        # Mostrar estadísticas de Lima
+        if os.path.exists(OUTPUT_CSV):
+            df_scored = pd.read_csv(OUTPUT_CSV)
+            print_report(df_scored[
+                df_scored['price_clean'].notna() &
+                df_scored['area_clean'].notna() &
+                (df_scored['area_clean'] > 0)
+            ])
         
         print(f"\n🎉 PROCESAMIENTO COMPLETADO!")
         
@@ -322,6 +349,7 @@ def main():
         print(f"\n❌ ERROR: {e}")
         import traceback
         traceback.print_exc()
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
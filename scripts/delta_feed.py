@@ -0,0 +1,200 @@
+"""
+FEED DE CAMBIOS - deltas versionados de properties.json
+
+Cada publicación de Lima compara el conjunto puntuado nuevo con el
+anterior por `url` y, si algo cambió, escribe una versión nueva:
+
+    web/data/feed/index.json            versión actual, snapshot vigente y cadena de deltas
+    web/data/feed/delta-000042.json     v41 → v42: added (registros), removed (urls),
+                                        changed (url + solo los campos que cambiaron)
+    web/data/feed/snapshot-000040.json  todos los registros en la v40
+
+Un consumidor con la versión v aplica los deltas con from >= v en orden.
+Si v es más antigua que la cadena (se guardan MAX_DELTAS), parte del
+snapshot vigente y aplica los deltas siguientes. Se escribe un snapshot
+nuevo cada SNAPSHOT_EVERY versiones, o antes si un delta es casi tan
+grande como el conjunto completo.
+
+El conjunto anterior se guarda en data/processed/feed_state.pkl. Si ese
+estado se pierde, la cadena se reinicia con un snapshot en una versión
+mayor que la publicada, así que los consumidores nunca ven retroceder v.
+
+Uso (desde la raíz del repo, después de data_processor_final.py):
+    python scripts/delta_feed.py
+"""
+
+import json
+import os
+import pickle
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.data_processor_final import JSON_COLUMNS
+from scripts.exporters import atomic_writer
+
+SCORED_PATH = "data/processed/scored_properties.csv"
+FEED_DIR = "web/data/feed"
+FEED_INDEX = os.path.join(FEED_DIR, "index.json")
+STATE_PATH = "data/processed/feed_state.pkl"
+
+MAX_DELTAS = 30        # deltas publicados (debe cubrir al menos SNAPSHOT_EVERY versiones)
+SNAPSHOT_EVERY = 10    # versiones entre snapshots completos
+SNAPSHOT_RATIO = 0.5   # delta con más cambios que esta fracción del total → snapshot
+
+
+def feed_records(df_scored):
+    """Registros del feed: columnas de properties.json, una fila por url"""
+    records = df_scored.reindex(columns=JSON_COLUMNS)
+    records = records[records["url"].notna()].drop_duplicates("url", keep="first")
+    return records.set_index("url", drop=False)
+
+
+def _json_value(value):
+    """Escalar de pandas/NumPy → valor JSON (NaN → null)"""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _to_json(records):
+    return json.loads(records.to_json(orient="records"))
+
+
+def diff_records(previous, current):
+    """
+    Diferencias por url entre dos conjuntos de registros (índice = url).
+    Retorna (agregados, urls eliminadas, [{url, campo: valor nuevo, ...}]).
+    """
+    added = current[~current.index.isin(previous.index)]
+    removed = previous.index[~previous.index.isin(current.index)].tolist()
+
+    common = current.index[current.index.isin(previous.index)]
+    old, new = previous.loc[common, JSON_COLUMNS], current.loc[common, JSON_COLUMNS]
+    differs = (old != new) & ~(old.isna() & new.isna())
+    rows = differs.any(axis=1)
+
+    changed = []
+    for url, mask in differs[rows].iterrows():
+        entry = {"url": url}
+        entry.update({column: _json_value(new.at[url, column]) for column in mask.index[mask.to_numpy()]})
+        changed.append(entry)
+    return added, removed, changed
+
+
+def apply_delta(records, delta):
+    """
+    Aplica un delta a un dict {url: registro} (lado del consumidor).
+    Los agregados van al final; los modificados conservan su posición.
+    """
+    for url in delta["removed"]:
+        records.pop(url, None)
+    for entry in delta["changed"]:
+        records[entry["url"]] = {**records.get(entry["url"], {}), **entry}
+    for record in delta["added"]:
+        records[record["url"]] = record
+    return records
+
+
+def _load_state(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def _save_state(state, path):
+    with atomic_writer(path, mode="wb") as f:
+        pickle.dump(state, f)
+
+
+def _write_json(payload, path):
+    with atomic_writer(path) as f:
+        json.dump(payload, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def _load_manifest(feed_dir):
+    path = os.path.join(feed_dir, "index.json")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def publish_feed(df_scored, feed_dir=FEED_DIR, state_path=STATE_PATH):
+    """
+    Publica la versión siguiente del feed si el conjunto cambió.
+    Retorna el resumen del delta (o None si no hubo cambios).
+    """
+    current = feed_records(df_scored)
+    state = _load_state(state_path)
+    manifest = _load_manifest(feed_dir)
+    now = datetime.now().isoformat(timespec="seconds")
+
+    # Sin estado o sin feed publicado: se reinicia la cadena con un snapshot. La versión
+    # nunca retrocede (un cliente con la versión publicada debe ver que cambió)
+    if state is None or manifest is None or manifest.get("version") != state["version"]:
+        version = max((manifest or {}).get("version", 0), state["version"] if state else 0) + 1
+        summary = {"to": version, "added": len(current), "removed": 0, "changed": 0}
+        manifest = {"version": version, "deltas": []}
+        snapshot = True
+    else:
+        added, removed, changed = diff_records(state["records"], current)
+        if not len(added) and not removed and not changed:
+            return None
+
+        version = state["version"] + 1
+        name = f"delta-{version:06d}.json"
+        _write_json({
+            "from": version - 1, "to": version, "generated_at": now,
+            "added": _to_json(added), "removed": removed, "changed": changed,
+        }, os.path.join(feed_dir, name))
+
+        summary = {"from": version - 1, "to": version, "path": name,
+                   "added": len(added), "removed": len(removed), "changed": len(changed)}
+        manifest["deltas"] = (manifest["deltas"] + [summary])[-MAX_DELTAS:]
+        manifest["version"] = version
+        touched = len(added) + len(removed) + len(changed)
+        snapshot = (version - manifest["snapshot"]["version"] >= SNAPSHOT_EVERY
+                    or touched > SNAPSHOT_RATIO * max(len(current), 1))
+
+    if snapshot:
+        name = f"snapshot-{version:06d}.json"
+        _write_json({"version": version, "generated_at": now, "records": _to_json(current)},
+                    os.path.join(feed_dir, name))
+        manifest["snapshot"] = {"version": version, "path": name, "count": len(current)}
+
+    manifest["generated_at"] = now
+    _write_json(manifest, os.path.join(feed_dir, "index.json"))
+    _save_state({"version": version, "records": current}, state_path)
+    _prune(feed_dir, manifest)
+    return summary
+
+
+def _prune(feed_dir, manifest):
+    """Borra deltas fuera de la cadena y snapshots que no son el vigente"""
+    keep = {manifest["snapshot"]["path"], "index.json"} | {d["path"] for d in manifest["deltas"]}
+    for name in os.listdir(feed_dir):
+        if name.endswith(".json") and name.startswith(("delta-", "snapshot-")) and name not in keep:
+            os.remove(os.path.join(feed_dir, name))
+
+
+def main():
+    print("=" * 60)
+    print("🔁 LIMA HOUSING ANALYTICS - FEED DE CAMBIOS")
+    print("=" * 60)
+
+    summary = publish_feed(pd.read_csv(SCORED_PATH))
+    if summary is None:
+        print("✅ Sin cambios: el feed sigue en la misma versión")
+    else:
+        print(f"✅ Feed v{summary['to']}: +{summary['added']} / -{summary['removed']} / "
+              f"~{summary['changed']} propiedades ({FEED_DIR})")
+
+
+if __name__ == "__main__":
+    main()
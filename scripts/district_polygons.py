@@ -0,0 +1,243 @@
+"""
+DISTRITOS POR COORDENADAS (punto en polígono)
+
+Para las propiedades con lat/lon, el distrito sale de los límites
+distritales de Lima (GeoJSON local) en vez del texto de `location`:
+
+1. Árbol de cajas (BBoxTree) sobre los polígonos: cada punto solo se
+   compara con los distritos cuya caja lo contiene.
+2. Por polígono, los bordes se agrupan en franjas horizontales; el test
+   de paridad (ray casting) de cada punto solo recorre los bordes de su
+   franja. Todo es vectorizado con NumPy (sin bucles por punto).
+
+El GeoJSON puede traer Polygon o MultiPolygon (con huecos); el distrito
+de cada feature se reconoce por UBIGEO o por nombre (NOMBDIST, DISTRITO,
+name, ...; nunca por los campos de departamento/provincia) con la
+dimensión de districts.py.
+
+Archivo por defecto: data/raw/lima_districts.geojson (o la variable de
+entorno DISTRICTS_GEOJSON). Sin archivo, clean_listings usa solo el texto.
+"""
+
+import json
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+
+from scripts.districts import DISTRICT_TABLE, UNKNOWN_ID, resolve_district_id
+
+POLYGONS_PATH = os.getenv("DISTRICTS_GEOJSON", "data/raw/lima_districts.geojson")
+
+EDGES_PER_BAND = 8        # bordes promedio por franja (define cuántas franjas tiene cada polígono)
+BLOCK_ELEMENTS = 4_000_000  # puntos × bordes evaluados por bloque (memoria acotada)
+
+# Campos con el nombre del distrito (en mayúsculas), en orden de preferencia
+DISTRICT_KEYS = ("NOMBDIST", "DISTRITO", "DIST", "NOM_DIST", "NAME", "NOMBRE")
+# Campos de departamento/provincia (INEI: NOMBDEP, NOMBPROV, DEPARTAMEN, PROVINCIA, ...)
+_REGION_KEY_PREFIXES = ("NOMBDEP", "NOMBPROV", "DEP", "PROV", "REGION", "NOM_DEP", "NOM_PROV")
+
+_UBIGEO = re.compile(r"^\d{6}$")
+_UBIGEO_TO_ID = {ubigeo: district_id for district_id, ubigeo in DISTRICT_TABLE["ubigeo"].items()}
+
+
+def feature_district_id(properties):
+    """
+    Propiedades de un feature → district_id: UBIGEO primero; luego los campos
+    de nombre de distrito (DISTRICT_KEYS) y, como último recurso, cualquier
+    otro campo salvo los de departamento/provincia ('LIMA' es también un
+    distrito y pondría todo en Cercado).
+    """
+    properties = properties or {}
+    values = [v for v in properties.values() if isinstance(v, (str, int))]
+    for value in values:
+        text = str(value).strip()
+        if _UBIGEO.match(text) and text in _UBIGEO_TO_ID:
+            return _UBIGEO_TO_ID[text]
+
+    by_key = {str(key).upper(): value for key, value in properties.items() if isinstance(value, str)}
+    named = [by_key[key] for key in DISTRICT_KEYS if key in by_key]
+    others = [value for key, value in by_key.items()
+              if key not in DISTRICT_KEYS and not key.startswith(_REGION_KEY_PREFIXES)]
+    for value in named + others:
+        district_id = resolve_district_id(value)
+        if district_id != UNKNOWN_ID:
+            return district_id
+    return UNKNOWN_ID
+
+
+def _rings(geometry):
+    """Todos los anillos (exteriores y huecos) de un Polygon/MultiPolygon"""
+    if geometry["type"] == "Polygon":
+        return geometry["coordinates"]
+    if geometry["type"] == "MultiPolygon":
+        return [ring for polygon in geometry["coordinates"] for ring in polygon]
+    raise ValueError(f"Geometría no soportada: {geometry['type']}")
+
+
+class BBoxTree:
+    """
+    Árbol estático de cajas (minx, miny, maxx, maxy): se parte por la
+    mediana del centro en el eje más largo hasta hojas de LEAF_SIZE cajas.
+    La consulta baja con todos los puntos a la vez.
+    """
+
+    LEAF_SIZE = 4
+
+    def __init__(self, boxes):
+        self.boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+        self.root = self._build(np.arange(len(self.boxes)))
+
+    def _build(self, items):
+        box = np.concatenate([self.boxes[items, :2].min(axis=0), self.boxes[items, 2:].max(axis=0)])
+        if len(items) <= self.LEAF_SIZE:
+            return {"box": box, "items": items}
+        centers = (self.boxes[items, :2] + self.boxes[items, 2:]) / 2
+        axis = int(np.argmax(box[2:] - box[:2]))
+        order = items[np.argsort(centers[:, axis], kind="stable")]
+        half = len(order) // 2
+        return {"box": box, "children": (self._build(order[:half]), self._build(order[half:]))}
+
+    def query(self, x, y):
+        """Pares candidatos (índice de punto, índice de caja) con el punto dentro de la caja"""
+        points, boxes = [], []
+
+        def inside(box, idx):
+            return idx[(x[idx] >= box[0]) & (x[idx] <= box[2]) & (y[idx] >= box[1]) & (y[idx] <= box[3])]
+
+        def visit(node, idx):
+            idx = inside(node["box"], idx)
+            if not len(idx):
+                return
+            if "items" in node:
+                for item in node["items"]:
+                    hit = inside(self.boxes[item], idx)
+                    points.append(hit)
+                    boxes.append(np.full(len(hit), item))
+                return
+            for child in node["children"]:
+                visit(child, idx)
+
+        if len(self.boxes):
+            visit(self.root, np.arange(len(x)))
+        if not points:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(points), np.concatenate(boxes)
+
+
+class _BandedPolygon:
+    """Bordes de un distrito agrupados por franja horizontal (formato CSR)"""
+
+    def __init__(self, rings):
+        starts, ends = [], []
+        for ring in rings:
+            ring = np.asarray(ring, dtype=float)[:, :2]
+            if len(ring) < 3:
+                continue
+            starts.append(ring)
+            ends.append(np.roll(ring, -1, axis=0))  # cierra el anillo si no viene cerrado
+        start, end = np.vstack(starts), np.vstack(ends)
+        keep = np.any(start != end, axis=1)
+        self.x0, self.y0 = start[keep, 0], start[keep, 1]
+        self.x1, self.y1 = end[keep, 0], end[keep, 1]
+
+        self.box = np.array([
+            min(self.x0.min(), self.x1.min()), min(self.y0.min(), self.y1.min()),
+            max(self.x0.max(), self.x1.max()), max(self.y0.max(), self.y1.max()),
+        ])
+        self.bands = max(1, len(self.x0) // EDGES_PER_BAND)
+        self.band_height = (self.box[3] - self.box[1]) / self.bands or 1.0
+
+        # Cada borde se registra en todas las franjas que cruza su rango vertical
+        low = self._band(np.minimum(self.y0, self.y1))
+        high = self._band(np.maximum(self.y0, self.y1))
+        spans = high - low + 1
+        edge_ids = np.repeat(np.arange(len(self.x0)), spans)
+        band_ids = np.repeat(low, spans) + (np.arange(spans.sum()) - np.repeat(np.cumsum(spans) - spans, spans))
+        order = np.argsort(band_ids, kind="stable")
+        self.edge_index = edge_ids[order]
+        self.offsets = np.searchsorted(band_ids[order], np.arange(self.bands + 1))
+
+    def _band(self, y):
+        return np.clip(((y - self.box[1]) / self.band_height).astype(np.int64), 0, self.bands - 1)
+
+    def contains(self, px, py):
+        """Máscara de puntos dentro (regla par-impar: los huecos quedan fuera)"""
+        result = np.zeros(len(px), dtype=bool)
+        band = self._band(py)
+        order = np.argsort(band, kind="stable")
+        bounds = np.searchsorted(band[order], np.arange(self.bands + 1))
+
+        for b in np.flatnonzero(np.diff(bounds)):
+            edges = self.edge_index[self.offsets[b]:self.offsets[b + 1]]
+            if not len(edges):
+                continue
+            x0, y0, x1, y1 = self.x0[edges], self.y0[edges], self.x1[edges], self.y1[edges]
+            slope = np.divide(x1 - x0, y1 - y0, out=np.zeros(len(edges)), where=(y1 != y0))
+            members = order[bounds[b]:bounds[b + 1]]
+            step = max(1, BLOCK_ELEMENTS // len(edges))
+            for i in range(0, len(members), step):
+                idx = members[i:i + step]
+                y = py[idx, None]
+                straddles = (y0 > y) != (y1 > y)
+                crosses = straddles & (px[idx, None] < x0 + (y - y0) * slope)
+                result[idx] = (np.count_nonzero(crosses, axis=1) & 1).astype(bool)
+        return result
+
+
+class DistrictPolygons:
+    """Límites distritales indexados para asignación masiva de puntos"""
+
+    def __init__(self, district_ids, polygons):
+        self.district_ids = np.asarray(district_ids, dtype=np.int16)
+        self.polygons = list(polygons)
+        self.tree = BBoxTree([polygon.box for polygon in self.polygons])
+
+    @classmethod
+    def from_geojson(cls, path=POLYGONS_PATH):
+        with open(path, encoding="utf-8") as f:
+            collection = json.load(f)
+
+        ids, polygons, unknown = [], [], []
+        for feature in collection.get("features", []):
+            if not feature.get("geometry"):
+                continue
+            district_id = feature_district_id(feature.get("properties"))
+            if district_id == UNKNOWN_ID:
+                unknown.append(feature.get("properties"))
+                continue
+            ids.append(district_id)
+            polygons.append(_BandedPolygon(_rings(feature["geometry"])))
+
+        if unknown:
+            print(f"⚠️  Features sin distrito reconocido en {path}: {len(unknown)}")
+        return cls(ids, polygons)
+
+    def assign(self, lon, lat):
+        """lon/lat (arrays) → district_id por punto (UNKNOWN_ID fuera de todos los polígonos)"""
+        x = np.asarray(lon, dtype=float)
+        y = np.asarray(lat, dtype=float)
+        result = np.full(len(x), UNKNOWN_ID, dtype=np.int16)
+
+        valid = np.flatnonzero(np.isfinite(x) & np.isfinite(y))
+        point_idx, polygon_idx = self.tree.query(x[valid], y[valid])
+        point_idx = valid[point_idx]
+
+        order = np.argsort(polygon_idx, kind="stable")
+        bounds = np.searchsorted(polygon_idx[order], np.arange(len(self.polygons) + 1))
+        for p in np.flatnonzero(np.diff(bounds)):
+            candidates = point_idx[order[bounds[p]:bounds[p + 1]]]
+            # Los distritos no se solapan: el primero que contiene al punto gana
+            candidates = candidates[result[candidates] == UNKNOWN_ID]
+            inside = self.polygons[p].contains(x[candidates], y[candidates])
+            result[candidates[inside]] = self.district_ids[p]
+        return result
+
+
+@lru_cache(maxsize=4)
+def load_polygons(path=POLYGONS_PATH):
+    """Polígonos cacheados por proceso; None si no hay GeoJSON local"""
+    if not path or not os.path.exists(path):
+        return None
+    return DistrictPolygons.from_geojson(path)
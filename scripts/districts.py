@@ -0,0 +1,159 @@
+"""
+Dimensión de distritos de Lima Metropolitana (provincia de Lima)
+
+Tabla única con id entero, nombre canónico, nombre para mostrar, alias,
+slug de imagen (web/assets/img/<slug>.jpg) y código UBIGEO INEI.
+Todas las etapas resuelven el texto a `district_id` una sola vez y luego
+unen por id (búsqueda en arreglo) en lugar de re-normalizar strings.
+"""
+
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# id 0 = distrito desconocido (no está en la tabla)
+UNKNOWN_ID = 0
+
+# (ubigeo, nombre canónico, nombre para mostrar, alias adicionales)
+# El nombre canónico es el que ya usan los CSV/JSON publicados.
+_DISTRICTS = [
+    ("150101", "LIMA", "Lima", ["CERCADO DE LIMA", "LIMA CERCADO"]),
+    ("150102", "ANCON", "Ancón", []),
+    ("150103", "ATE", "Ate", ["ATE VITARTE"]),
+    ("150104", "BARRANCO", "Barranco", []),
+    ("150105", "BREÑA", "Breña", []),
+    ("150106", "CARABAYLLO", "Carabayllo", []),
+    ("150107", "CHACLACAYO", "Chaclacayo", []),
+    ("150108", "CHORRILLOS", "Chorrillos", []),
+    ("150109", "CIENEGUILLA", "Cieneguilla", []),
+    ("150110", "COMAS", "Comas", []),
+    ("150111", "EL AGUSTINO", "El Agustino", []),
+    ("150112", "INDEPENDENCIA", "Independencia", []),
+    ("150113", "JESUS MARIA", "Jesús María", []),
+    ("150114", "LA MOLINA", "La Molina", []),
+    ("150115", "LA VICTORIA", "La Victoria", []),
+    ("150116", "LINCE", "Lince", []),
+    ("150117", "LOS OLIVOS", "Los Olivos", []),
+    ("150118", "LURIGANCHO", "Lurigancho", ["LURIGANCHO - CHOSICA", "LURIGANCHO CHOSICA", "CHOSICA"]),
+    ("150119", "LURIN", "Lurín", []),
+    ("150120", "MAGDALENA DEL MAR", "Magdalena del Mar", ["MAGDALENA"]),
+    ("150121", "PUEBLO LIBRE", "Pueblo Libre", ["MAGDALENA VIEJA"]),
+    ("150122", "MIRAFLORES", "Miraflores", []),
+    ("150123", "PACHACAMAC", "Pachacámac", []),
+    ("150124", "PUCUSANA", "Pucusana", []),
+    ("150125", "PUENTE PIEDRA", "Puente Piedra", []),
+    ("150126", "PUNTA HERMOSA", "Punta Hermosa", []),
+    ("150127", "PUNTA NEGRA", "Punta Negra", []),
+    ("150128", "RIMAC", "Rímac", []),
+    ("150129", "SAN BARTOLO", "San Bartolo", []),
+    ("150130", "SAN BORJA", "San Borja", []),
+    ("150131", "SAN ISIDRO", "San Isidro", []),
+    ("150132", "SAN JUAN DE LURIGANCHO", "San Juan de Lurigancho", ["SJL"]),
+    ("150133", "SAN JUAN DE MIRAFLORES", "San Juan de Miraflores", ["SJM"]),
+    ("150134", "SAN LUIS", "San Luis", []),
+    ("150135", "SAN MARTIN DE PORRES", "San Martín de Porres", ["SMP"]),
+    ("150136", "SAN MIGUEL", "San Miguel", []),
+    ("150137", "SANTA ANITA", "Santa Anita", []),
+    ("150138", "SANTA MARIA DEL MAR", "Santa María del Mar", []),
+    ("150139", "SANTA ROSA", "Santa Rosa", []),
+    ("150140", "SURCO", "Santiago de Surco", ["SANTIAGO DE SURCO"]),
+    ("150141", "SURQUILLO", "Surquillo", []),
+    ("150142", "VILLA EL SALVADOR", "Villa El Salvador", []),
+    ("150143", "VILLA MARIA DEL TRIUNFO", "Villa María del Triunfo", []),
+]
+
+
+def fold_name(text):
+    """
+    Forma de comparación de un nombre: mayúsculas, sin tildes ni Ñ,
+    guiones como espacio, espacios simples. Repara texto UTF-8 leído
+    como latin1 ('BREÃ\\x91A').
+    'Jesús María' → 'JESUS MARIA', 'BREÑA' → 'BRENA'
+    """
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return ""
+
+    text = str(text)
+    if "Ã" in text:
+        try:
+            text = text.encode("latin1").decode("utf-8")
+        except (UnicodeEncodeError, UnicodeDecodeError):
+            text = text.replace("Ã", "Ñ")
+
+    text = unicodedata.normalize("NFKD", text.upper())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(text.replace("-", " ").split())
+
+
+def _slug(name):
+    return fold_name(name).lower().replace(" ", "-")
+
+
+def _build_table():
+    rows = []
+    for district_id, (ubigeo, name, display_name, aliases) in enumerate(_DISTRICTS, start=1):
+        rows.append({
+            "district_id": district_id,
+            "name": name,
+            "display_name": display_name,
+            "slug": _slug(name),
+            "ubigeo": ubigeo,
+            "aliases": [name, display_name] + aliases,
+        })
+    return pd.DataFrame(rows).set_index("district_id")
+
+
+DISTRICT_TABLE = _build_table()
+
+# alias plegado → id
+_ALIAS_TO_ID = {
+    fold_name(alias): district_id
+    for district_id, aliases in DISTRICT_TABLE["aliases"].items()
+    for alias in aliases
+}
+
+# Arreglos indexados por id (posición 0 = desconocido)
+_NAMES = np.array([None] + DISTRICT_TABLE["name"].tolist(), dtype=object)
+_SLUGS = np.array([None] + DISTRICT_TABLE["slug"].tolist(), dtype=object)
+
+
+@lru_cache(maxsize=4096)
+def resolve_district_id(text):
+    """Texto libre de distrito → district_id (0 si no se reconoce)"""
+    return _ALIAS_TO_ID.get(fold_name(text), UNKNOWN_ID)
+
+
+def resolve_district_ids(values):
+    """
+    Resuelve una columna completa a ids (np.int16).
+    Solo se resuelve cada valor distinto una vez.
+    """
+    codes, uniques = pd.factorize(pd.Series(values), use_na_sentinel=True)
+    lookup = np.array([resolve_district_id(u) for u in uniques] + [UNKNOWN_ID], dtype=np.int16)
+    # el sentinel -1 (NaN) cae en la última posición → desconocido
+    return lookup[codes]
+
+
+def district_names(ids):
+    """ids → nombre canónico (None para desconocido)"""
+    return _NAMES[np.asarray(ids, dtype=np.int64)]
+
+
+def district_slugs(ids):
+    """ids → slug de imagen (None para desconocido)"""
+    return _SLUGS[np.asarray(ids, dtype=np.int64)]
+
+
+def lookup_by_id(ids, table_ids, values, fill=np.nan):
+    """
+    Join por id entero como búsqueda en arreglo.
+    `table_ids`/`values` describen una tabla pequeña (p.ej. seguridad por
+    distrito); retorna values[id] para cada id de `ids`, o `fill`.
+    """
+    dense = np.full(len(DISTRICT_TABLE) + 1, fill, dtype=float)
+    table_ids = np.asarray(table_ids, dtype=np.int64)
+    known = table_ids != UNKNOWN_ID
+    dense[table_ids[known]] = np.asarray(values, dtype=float)[known]
+    return dense[np.asarray(ids, dtype=np.int64)]
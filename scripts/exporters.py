@@ -0,0 +1,122 @@
+"""
+EXPORTADORES - escritura de CSV/JSON en segundo plano
+
+- Varias salidas se escriben a la vez en hilos de fondo (ExportQueue),
+  mientras el hilo principal sigue con el reporte.
+- La serialización es por bloques (generadores): no se hace una segunda
+  copia completa del DataFrame.
+- NaN → null lo resuelve pandas al serializar cada bloque (to_json), sin
+  un `where` sobre todo el frame.
+- Escritura atómica: archivo temporal en la misma carpeta + os.replace,
+  así el dashboard nunca lee un archivo a medio escribir.
+"""
+
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+CHUNK_ROWS = 5_000
+
+
+@contextmanager
+def atomic_writer(path, mode="w", encoding="utf-8"):
+    """Abre un temporal junto a `path` y lo renombra al cerrar sin errores"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=os.path.basename(path))
+    text_options = {} if "b" in mode else {"encoding": encoding, "newline": ""}
+    try:
+        with os.fdopen(fd, mode, **text_options) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def iter_csv_chunks(df, chunk_rows=CHUNK_ROWS):
+    """Texto CSV por bloques (el encabezado va solo en el primero)"""
+    for start in range(0, max(len(df), 1), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=(start == 0))
+
+
+def iter_json_records(df, columns=None, chunk_rows=CHUNK_ROWS):
+    """
+    Arreglo JSON de registros por bloques: un registro por línea.
+    to_json ya serializa NaN como null.
+    """
+    if columns is not None:
+        columns = [c for c in columns if c in df.columns]
+
+    yield "[\n"
+    first = True
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        if columns is not None:
+            chunk = chunk[columns]
+        records = chunk.to_json(orient="records", force_ascii=False, lines=True).rstrip("\n")
+        if not records:
+            continue
+        yield ("" if first else ",\n") + records.replace("\n", ",\n")
+        first = False
+    yield "\n]\n"
+
+
+def write_chunks(path, chunks, encoding="utf-8"):
+    """Escribe atómicamente el texto de un generador de bloques"""
+    with atomic_writer(path, encoding=encoding) as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return path
+
+
+def write_csv(df, path, encoding="utf-8-sig"):
+    return write_chunks(path, iter_csv_chunks(df), encoding=encoding)
+
+
+def write_json_records(df, path, columns=None):
+    return write_chunks(path, iter_json_records(df, columns))
+
+
+class ExportQueue:
+    """
+    Ejecuta escrituras en hilos de fondo.
+
+        with ExportQueue() as exports:
+            exports.submit(write_csv, df, "a.csv")
+            exports.submit(write_json_records, df, "b.json", cols)
+            ...  # el hilo principal sigue trabajando
+        # al salir del with se espera a todas y se propagan los errores
+    """
+
+    def __init__(self, max_workers=4):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._futures = []
+
+    def submit(self, func, *args, **kwargs):
+        future = self._pool.submit(func, *args, **kwargs)
+        self._futures.append(future)
+        return future
+
+    def wait(self):
+        """Espera todas las escrituras; retorna las rutas escritas"""
+        try:
+            return [future.result() for future in self._futures]
+        finally:
+            self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self.wait()
+        finally:
+            self._pool.shutdown(wait=True)
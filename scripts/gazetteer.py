@@ -0,0 +1,262 @@
+"""
+GAZETTEER DE URBANIZACIONES DE LIMA (sin conexión)
+
+Resuelve distrito y coordenadas aproximadas desde el texto de `location`
+sin regex por fila ni llamadas de geocodificación:
+
+1. Índice: trie de tokens plegados (fold_name: sin tildes, mayúsculas)
+   con dos tipos de entrada: alias de distritos (districts.py) y
+   urbanizaciones del archivo local (nombre → distrito, lat, lon).
+2. Por ubicación ('Ur. Santa Cruz, Miraflores, Lima, Lima'):
+   - solo provincia de Lima (termina en 'Lima, Lima'), como la regex;
+   - se quita el tipo de zona de la primera parte (solo los de ZONE_TYPES:
+     'Ur.', 'Hu.', 'Ah.', 'Urb', ...; 'Sta.' o 'San' no son tipos);
+   - el distrito sale de la parte que coincide completa con un alias
+     (de la última a la primera); si ninguna, de la urbanización más
+     larga que sea prefijo de una parte ('Santa Cruz Etapa II' → 'Santa Cruz');
+   - las coordenadas (centroide) salen de la urbanización si el archivo
+     las trae y es del mismo distrito; si no, NaN.
+3. En lote: cada ubicación distinta se resuelve una vez y se reparte por
+   códigos (pd.factorize).
+
+Archivo: data/raw/lima_urbanizaciones.csv (o LIMA_GAZETTEER) con columnas
+urbanizacion, district, lat, lon (centroide, opcionales) y listings.
+Debe ser un listado curado de urbanizaciones con sus centroides. El que
+trae el repo es solo una semilla derivada del propio dataset (urbanización
+→ distrito más frecuente, sin coordenadas): no agrega urbanizaciones que
+los avisos no mencionen. Para regenerar la semilla (no pisa un archivo
+que ya tenga coordenadas):
+    python scripts/gazetteer.py --seed
+"""
+
+import argparse
+import os
+import re
+import sys
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.districts import DISTRICT_TABLE, UNKNOWN_ID, district_names, fold_name, resolve_district_ids
+from scripts.exporters import write_csv
+
+GAZETTEER_PATH = os.getenv("LIMA_GAZETTEER", "data/raw/lima_urbanizaciones.csv")
+DATASET_PATH = "data/raw/dataset.csv"
+
+# Tipos de zona que Properati antepone a la urbanización (abreviados con punto)
+ZONE_TYPES = (
+    "UR",  # urbanización
+    "HU",  # habilitación urbana
+    "AH",  # asentamiento humano
+    "AS",  # asociación
+    "CO",  # cooperativa
+    "SD",  # sector/sin denominación
+    "PJ",  # pueblo joven
+    "RE",  # residencial
+    "BA",  # barrio
+    "AG",  # agrupación
+    "LO",  # lotización
+    "UV",  # unidad vecinal
+    "UP",  # urbanización popular
+    "CV",  # conjunto de vivienda
+    "PO",  # pueblo
+)
+# Tipo de zona al inicio de la primera parte: 'UR.', 'HU.', ..., 'URB', 'AV', 'JR', 'CALLE'
+_TYPE_PREFIX = re.compile(rf"^(?:(?:{'|'.join(ZONE_TYPES)})\.|(?:URB|AV|JR|CALLE)\b)\s*")
+_TOKEN = re.compile(r"[A-Z0-9]+")
+
+DISTRICT, URBANIZACION = 0, 1
+_END = None  # clave de fin de entrada en el trie
+
+
+def split_location(location):
+    """
+    'Ur. Santa Cruz, Miraflores, Lima, Lima' → [['SANTA', 'CRUZ'], ['MIRAFLORES']]
+    Partes antes de 'Lima, Lima' (tokens plegados); None si no es provincia de Lima.
+    """
+    parts = [fold_name(part) for part in str(location).split(",")]
+    if len(parts) < 3 or parts[-2:] != ["LIMA", "LIMA"]:
+        return None
+    return [_TOKEN.findall(_TYPE_PREFIX.sub("", part)) for part in parts[:-2]]
+
+
+class Gazetteer:
+    """Trie de tokens con alias de distritos y urbanizaciones"""
+
+    def __init__(self, names, district_ids, lat=None, lon=None):
+        self.district_ids = [UNKNOWN_ID]
+        self.kinds = [DISTRICT]
+        self.lat = [np.nan]
+        self.lon = [np.nan]
+        self.root = {}
+
+        names = list(names)
+        lat = np.full(len(names), np.nan) if lat is None else lat
+        lon = np.full(len(names), np.nan) if lon is None else lon
+        for district_id, aliases in DISTRICT_TABLE["aliases"].items():
+            for alias in aliases:
+                self._insert(_TOKEN.findall(fold_name(alias)), district_id, DISTRICT)
+        for name, district_id, y, x in zip(names, district_ids, lat, lon):
+            if district_id != UNKNOWN_ID:
+                self._insert(split_location(f"{name}, Lima, Lima")[0], district_id, URBANIZACION, y, x)
+
+        self.district_ids = np.asarray(self.district_ids, dtype=np.int16)
+        self.kinds = np.asarray(self.kinds, dtype=np.int8)
+        self.lat = np.asarray(self.lat, dtype=float)
+        self.lon = np.asarray(self.lon, dtype=float)
+
+    def _insert(self, tokens, district_id, kind, lat=np.nan, lon=np.nan):
+        if not tokens:
+            return
+        node = self.root
+        for token in tokens:
+            node = node.setdefault(token, {})
+        # Un alias de distrito no se pisa con una urbanización homónima
+        if _END in node and self.kinds[node[_END]] == DISTRICT:
+            return
+        node[_END] = len(self.district_ids)
+        self.district_ids.append(district_id)
+        self.kinds.append(kind)
+        self.lat.append(lat)
+        self.lon.append(lon)
+
+    @classmethod
+    def from_csv(cls, path=GAZETTEER_PATH):
+        """lat/lon son opcionales: sin columnas (o celdas vacías) → NaN"""
+        table = pd.read_csv(path, encoding="utf-8")
+        coords = [pd.to_numeric(table[c], errors="coerce") if c in table else None for c in ("lat", "lon")]
+        return cls(table["urbanizacion"], resolve_district_ids(table["district"]), *coords)
+
+    def longest_prefix(self, tokens):
+        """(entrada, tokens consumidos) de la entrada más larga que es prefijo de `tokens`"""
+        node, best, used = self.root, 0, 0
+        for i, token in enumerate(tokens, start=1):
+            node = node.get(token)
+            if node is None:
+                break
+            if _END in node:
+                best, used = node[_END], i
+        return best, used
+
+    def match(self, location):
+        """location → índice de entrada para el distrito y para las coordenadas (0 = ninguna)"""
+        parts = split_location(location)
+        if not parts:
+            return 0, 0
+
+        # Urbanización de la primera parte (si la hay): aporta coordenadas y respaldo del distrito
+        urban, _ = self.longest_prefix(parts[0])
+        urban = urban if self.kinds[urban] == URBANIZACION else 0
+
+        for tokens in reversed(parts):
+            entry, used = self.longest_prefix(tokens)
+            if entry and self.kinds[entry] == DISTRICT and used == len(tokens):
+                same = urban and self.district_ids[urban] == self.district_ids[entry]
+                return entry, urban if same else 0
+        return urban, urban
+
+    def resolve(self, locations):
+        """
+        Serie de locations → DataFrame (mismo índice) con district_id, lat, lon
+        (NaN si la urbanización no tiene centroide) y source ('distrito',
+        'urbanizacion' o None). Una resolución por valor distinto.
+        """
+        codes, uniques = pd.factorize(pd.Series(locations))
+        matches = np.array([self.match(location) for location in uniques], dtype=np.int64).reshape(-1, 2)
+        # Código -1 (NaN) → entrada 0 (desconocido)
+        district_entry = np.where(codes >= 0, matches[codes, 0] if len(matches) else 0, 0)
+        coords_entry = np.where(codes >= 0, matches[codes, 1] if len(matches) else 0, 0)
+
+        source = np.where(self.kinds[district_entry] == URBANIZACION, "urbanizacion", "distrito").astype(object)
+        source[district_entry == 0] = None
+        return pd.DataFrame({
+            "district_id": self.district_ids[district_entry],
+            "lat": self.lat[coords_entry],
+            "lon": self.lon[coords_entry],
+            "source": source,
+        }, index=pd.Series(locations).index)
+
+
+@lru_cache(maxsize=4)
+def load_gazetteer(path=GAZETTEER_PATH):
+    """Gazetteer cacheado por proceso; None si no hay archivo local"""
+    if not path or not os.path.exists(path):
+        return None
+    return Gazetteer.from_csv(path)
+
+
+def seed_gazetteer(dataset_path=DATASET_PATH, path=GAZETTEER_PATH):
+    """
+    Semilla del gazetteer desde el dataset: urbanizaciones ('Ur. X, Distrito,
+    Lima, Lima') → distrito más frecuente por nombre plegado. lat/lon quedan
+    vacíos (el dataset no trae coordenadas).
+    """
+    df = pd.read_csv(dataset_path, encoding="utf-8")
+    parts = df["location"].dropna().str.split(",")
+    lima = parts[(parts.str.len() >= 4) & parts.map(lambda p: split_location(",".join(p)) is not None)]
+
+    rows = pd.DataFrame({
+        "name": lima.str[0].str.strip().map(lambda s: _TYPE_PREFIX.sub("", s.upper()).strip().title()),
+        "key": lima.str[0].map(lambda s: " ".join(_TOKEN.findall(_TYPE_PREFIX.sub("", fold_name(s))))),
+        "district_id": resolve_district_ids(lima.str[-3].str.strip()),
+    })
+    rows = rows[(rows["key"] != "") & (rows["district_id"] != UNKNOWN_ID)]
+
+    # Distrito más frecuente por urbanización (empates: el de menor id)
+    counts = rows.groupby(["key", "district_id"]).size().rename("listings").reset_index()
+    counts = counts.sort_values(["key", "listings", "district_id"], ascending=[True, False, True])
+    best = counts.drop_duplicates("key").set_index("key")
+
+    chosen = rows[rows["district_id"].to_numpy() == best.loc[rows["key"], "district_id"].to_numpy()]
+    grouped = chosen.groupby("key")
+    table = pd.DataFrame({
+        "urbanizacion": grouped["name"].agg(lambda s: s.mode().iloc[0]),
+        "district": district_names(best.loc[grouped.size().index, "district_id"]),
+        "lat": np.nan,
+        "lon": np.nan,
+        "listings": best.loc[grouped.size().index, "listings"],
+    }).sort_values(["district", "urbanizacion"])
+
+    write_csv(table, path, encoding="utf-8")
+    return table
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gazetteer local de urbanizaciones de Lima")
+    parser.add_argument("--seed", action="store_true", help="regenerar la semilla derivada del dataset")
+    parser.add_argument("--dataset", default=DATASET_PATH)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗺️  LIMA HOUSING ANALYTICS - GAZETTEER DE URBANIZACIONES")
+    print("=" * 60)
+
+    if args.seed:
+        gazetteer = load_gazetteer()
+        if gazetteer is not None and np.isfinite(gazetteer.lat).any():
+            print(f"❌ {GAZETTEER_PATH} ya tiene coordenadas (listado curado); no se reemplaza por la semilla")
+            return
+        table = seed_gazetteer(args.dataset)
+        load_gazetteer.cache_clear()
+        print(f"✅ Semilla del gazetteer (derivada del dataset, sin coordenadas): {len(table)} "
+              f"urbanizaciones en {table['district'].nunique()} distritos → {GAZETTEER_PATH}")
+
+    gazetteer = load_gazetteer()
+    if gazetteer is None:
+        print(f"❌ No existe {GAZETTEER_PATH}; genere una semilla con --seed o use un listado curado")
+        return
+
+    df = pd.read_csv(args.dataset, encoding="utf-8")
+    resolved = gazetteer.resolve(df["location"])
+    lima = df["location"].map(lambda loc: split_location(loc) is not None, na_action="ignore").fillna(False)
+    print(f"📍 Ubicaciones de Lima: {int(lima.sum())}")
+    for source, count in resolved.loc[lima.astype(bool), "source"].fillna("sin resolver").value_counts().items():
+        print(f"   • {source}: {count}")
+    print(f"   • con coordenadas: {int(resolved['lat'].notna().sum())}")
+
+
+if __name__ == "__main__":
+    main()
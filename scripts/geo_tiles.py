@@ -0,0 +1,196 @@
+"""
+TILES DE MAPA DE CALOR - precio y score por celda
+
+Agrupa las propiedades con coordenadas (columnas `lat`/`lon`, las mismas
+que usa similarity.py) en una grilla jerárquica z/x/y (Web Mercator) a
+varios niveles de zoom. Cada tile se divide en 2^CELL_BITS × 2^CELL_BITS
+celdas y por celda se guarda:
+    count, mediana de precio por m², promedio de final_score y safety_score
+
+Salidas (web/data/tiles/):
+    index.json        niveles de zoom y tiles existentes (con conteos)
+    {z}/{x}/{y}.json  celdas de un tile (para que un mapa pida solo los visibles)
+
+Reconstrucción incremental: se guarda un hash por url (posición, precio
+y scores) y solo se recalculan y reescriben los tiles que tocan las
+propiedades nuevas, modificadas o eliminadas (index.json se rehace con
+conteos por tile, sin estadísticas por celda).
+
+Uso (desde la raíz del repo, después de data_processor_final.py):
+    python scripts/geo_tiles.py [--force]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.exporters import atomic_writer
+
+SCORED_PATH = "data/processed/scored_properties.csv"
+TILES_DIR = "web/data/tiles"
+INDEX_JSON = os.path.join(TILES_DIR, "index.json")
+STATE_PATH = "data/processed/tiles_state.pkl"
+
+ZOOMS = (11, 13, 15)   # ciudad, distrito, barrio
+CELL_BITS = 3          # 8 × 8 celdas por tile
+MAX_LAT = 85.05112878  # límite de Web Mercator
+
+HASH_COLUMNS = ["lat", "lon", "price_per_m2", "final_score", "safety_score"]
+
+
+def tile_xy(lon, lat, zoom):
+    """lon/lat (arrays) → índices enteros de tile x, y en ese zoom"""
+    n = 2 ** zoom
+    lat_rad = np.radians(np.clip(np.asarray(lat, dtype=float), -MAX_LAT, MAX_LAT))
+    x = (np.asarray(lon, dtype=float) + 180.0) / 360.0 * n
+    y = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / np.pi) / 2.0 * n
+    x = np.clip(np.floor(x), 0, n - 1).astype(np.int64)
+    y = np.clip(np.floor(y), 0, n - 1).astype(np.int64)
+    return x, y
+
+
+def tile_path(zoom, x, y, root=TILES_DIR):
+    return os.path.join(root, str(zoom), str(x), f"{y}.json")
+
+
+def load_points(df):
+    """Propiedades puntuadas con coordenadas válidas + precio por m²"""
+    if not {"lat", "lon"}.issubset(df.columns):
+        return pd.DataFrame(columns=["url"] + HASH_COLUMNS)
+
+    points = pd.DataFrame({
+        "url": df["url"],
+        "lat": pd.to_numeric(df["lat"], errors="coerce"),
+        "lon": pd.to_numeric(df["lon"], errors="coerce"),
+        "price_per_m2": df["price_clean"] / df["area_clean"].where(df["area_clean"] > 0),
+        "final_score": df["final_score"],
+        "safety_score": df["safety_score"],
+    })
+    inside = points["lat"].between(-MAX_LAT, MAX_LAT) & points["lon"].between(-180, 180)
+    points = points[inside & points["url"].notna()].drop_duplicates("url", keep="first")
+    return points.reset_index(drop=True)
+
+
+def _state(points):
+    """url → hash del contenido que afecta a los tiles"""
+    state = points[["url", "lat", "lon"]].copy()
+    state["row_hash"] = pd.util.hash_pandas_object(points[HASH_COLUMNS], index=False).astype(str).to_numpy()
+    return state
+
+
+def dirty_positions(old_state, new_state):
+    """lat/lon de las propiedades nuevas, modificadas o eliminadas (posición vieja y nueva)"""
+    merged = old_state.merge(new_state, on="url", how="outer", suffixes=("_old", "_new"))
+    changed = merged["row_hash_old"] != merged["row_hash_new"]  # NaN (alta/baja) también cuenta
+    merged = merged[changed]
+    old = merged[["lat_old", "lon_old"]].dropna().to_numpy()
+    new = merged[["lat_new", "lon_new"]].dropna().to_numpy()
+    positions = np.vstack([old, new]) if len(old) or len(new) else np.empty((0, 2))
+    return positions[:, 0], positions[:, 1], int(changed.sum())
+
+
+def aggregate_cells(points, zoom):
+    """Una fila por celda: tile x/y, celda cx/cy dentro del tile y estadísticas"""
+    cell_x, cell_y = tile_xy(points["lon"].to_numpy(), points["lat"].to_numpy(), zoom + CELL_BITS)
+    mask = (1 << CELL_BITS) - 1
+    keyed = points.assign(
+        x=cell_x >> CELL_BITS, y=cell_y >> CELL_BITS,
+        cx=cell_x & mask, cy=cell_y & mask,
+    )
+    return (
+        keyed.groupby(["x", "y", "cx", "cy"], sort=True)
+        .agg(
+            count=("url", "size"),
+            price_m2_median=("price_per_m2", "median"),
+            final_score_mean=("final_score", "mean"),
+            safety_score_mean=("safety_score", "mean"),
+        )
+        .round(2)
+        .reset_index()
+    )
+
+
+def _write_tile(zoom, x, y, cells, root):
+    path = tile_path(zoom, x, y, root)
+    records = cells.drop(columns=["x", "y"]).to_json(orient="records", force_ascii=False)
+    with atomic_writer(path) as f:
+        f.write(f'{{"z":{zoom},"x":{x},"y":{y},"cells":{records}}}')
+
+
+def build_tiles(scored_path=SCORED_PATH, root=TILES_DIR, state_path=STATE_PATH, force=False):
+    """Etapa completa: reescribe solo los tiles afectados y actualiza index.json"""
+    points = load_points(pd.read_csv(scored_path))
+    new_state = _state(points)
+
+    full = force or not os.path.exists(state_path) or not os.path.exists(os.path.join(root, "index.json"))
+    if full:
+        if os.path.isdir(root):
+            shutil.rmtree(root)
+        dirty_lat, dirty_lon, changed = points["lat"].to_numpy(), points["lon"].to_numpy(), len(points)
+    else:
+        dirty_lat, dirty_lon, changed = dirty_positions(pd.read_pickle(state_path), new_state)
+
+    index = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "cells_per_side": 1 << CELL_BITS,
+        "points": len(points),
+        "zooms": {},
+    }
+    written = removed = 0
+
+    for zoom in ZOOMS:
+        # Conteos por tile para index.json (barato); las estadísticas por celda
+        # solo se recalculan para los puntos que caen en tiles afectados
+        point_x, point_y = tile_xy(points["lon"].to_numpy(), points["lat"].to_numpy(), zoom)
+        keys = pd.MultiIndex.from_arrays([point_x, point_y])
+        tiles = pd.Series(1, index=keys).groupby(level=[0, 1]).sum()
+        index["zooms"][str(zoom)] = [[int(x), int(y), int(n)] for (x, y), n in tiles.items()]
+
+        dirty_x, dirty_y = tile_xy(dirty_lon, dirty_lat, zoom)
+        dirty = set(zip(dirty_x.tolist(), dirty_y.tolist()))
+        cells = aggregate_cells(points[keys.isin(list(dirty))], zoom)
+        present = set(tiles.index)
+        for x, y in sorted(dirty):
+            if (x, y) in present:
+                tile_cells = cells[(cells["x"] == x) & (cells["y"] == y)]
+                _write_tile(zoom, x, y, tile_cells, root)
+                written += 1
+            elif os.path.exists(tile_path(zoom, x, y, root)):
+                os.remove(tile_path(zoom, x, y, root))
+                removed += 1
+
+    with atomic_writer(os.path.join(root, "index.json")) as f:
+        json.dump(index, f, ensure_ascii=False, separators=(",", ":"))
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    new_state.to_pickle(state_path)
+
+    if not len(points):
+        print("ℹ️  Sin coordenadas (lat/lon) en las propiedades; no se generan tiles")
+    else:
+        mode = "completa" if full else "incremental"
+        print(f"✅ Tiles ({mode}): {len(points)} propiedades con coordenadas, {changed} cambiaron")
+        print(f"   Tiles escritos: {written} | eliminados: {removed} | zooms: {list(ZOOMS)}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Genera tiles de mapa de calor (precio/m² y scores)")
+    parser.add_argument("--force", action="store_true", help="reconstruir todos los tiles")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗺️  LIMA HOUSING ANALYTICS - TILES DE MAPA DE CALOR")
+    print("=" * 60)
+    build_tiles(force=args.force)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+"""
+ALMACÉN SQLITE de propiedades puntuadas (opcional)
+
+- Upsert por `url`: cada fila lleva un hash de su contenido y solo se
+  reescriben las que cambiaron entre corridas.
+- Índices sobre (district, price_clean) y (final_score) para filtrar y
+  ordenar (no son de cobertura: search devuelve la fila completa).
+- Tabla FTS5 sobre title y location, sincronizada con triggers.
+- Inserciones por lotes dentro de transacciones, en modo WAL (los
+  lectores no se bloquean mientras el pipeline escribe).
+
+Se activa con la variable de entorno LISTINGS_DB (ruta del .db) o con
+`--sqlite` en scripts/partitions.py.
+
+Ejemplo:
+    store = ListingStore()
+    store.search(district="SURCO", bedrooms=3, max_price=3000, text="piscina")
+"""
+
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DB_PATH = os.getenv("LISTINGS_DB")
+BATCH_ROWS = 5_000
+
+# columna → tipo SQLite
+COLUMNS = {
+    "url": "TEXT PRIMARY KEY",
+    "title": "TEXT",
+    "location": "TEXT",
+    "city": "TEXT",
+    "district": "TEXT",
+    "district_id": "INTEGER",
+    "price_clean": "REAL",
+    "area_clean": "REAL",
+    "bedroom_clean": "INTEGER",
+    "bathroom_clean": "INTEGER",
+    "cost_score": "REAL",
+    "safety_score": "REAL",
+    "services_score": "REAL",
+    "final_score": "REAL",
+    "date_pub": "TEXT",
+    "row_hash": "TEXT NOT NULL",
+    "updated_at": "TEXT NOT NULL",
+}
+DATA_COLUMNS = [c for c in COLUMNS if c not in ("url", "row_hash", "updated_at")]
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS listings (
+    {", ".join(f"{name} {kind}" for name, kind in COLUMNS.items())}
+);
+
+CREATE INDEX IF NOT EXISTS idx_listings_district_price
+    ON listings (district, price_clean);
+CREATE INDEX IF NOT EXISTS idx_listings_final_score
+    ON listings (final_score);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS listings_fts USING fts5(
+    title, location, content='listings', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS listings_ai AFTER INSERT ON listings BEGIN
+    INSERT INTO listings_fts (rowid, title, location) VALUES (new.rowid, new.title, new.location);
+END;
+CREATE TRIGGER IF NOT EXISTS listings_ad AFTER DELETE ON listings BEGIN
+    INSERT INTO listings_fts (listings_fts, rowid, title, location)
+        VALUES ('delete', old.rowid, old.title, old.location);
+END;
+CREATE TRIGGER IF NOT EXISTS listings_au AFTER UPDATE ON listings BEGIN
+    INSERT INTO listings_fts (listings_fts, rowid, title, location)
+        VALUES ('delete', old.rowid, old.title, old.location);
+    INSERT INTO listings_fts (rowid, title, location) VALUES (new.rowid, new.title, new.location);
+END;
+"""
+
+
+def _row_hashes(df):
+    """Hash del contenido de cada fila (vectorizado)"""
+    return pd.util.hash_pandas_object(df[DATA_COLUMNS], index=False).astype(str)
+
+
+FTS_OPERATORS = ("AND", "OR", "NOT")
+
+
+def fts_query(text):
+    """
+    Texto libre → consulta FTS5 segura: cada palabra va entre comillas
+    (guiones, comillas sueltas o paréntesis dejan de ser sintaxis) y
+    AND/OR/NOT solo se mantienen como operadores entre dos palabras.
+    'san-isidro' → '"san-isidro"', 'terraza OR jardin' → '"terraza" OR "jardin"'
+    """
+    words = str(text).split()
+    terms = []
+    for i, word in enumerate(words):
+        between = 0 < i < len(words) - 1 and words[i - 1] not in FTS_OPERATORS \
+            and words[i + 1] not in FTS_OPERATORS
+        if word in FTS_OPERATORS and between:
+            terms.append(word)
+        else:
+            terms.append('"' + word.replace('"', '""') + '"')
+    return " ".join(terms)
+
+
+class ListingStore:
+    def __init__(self, path=None):
+        self.path = path or DB_PATH or "data/processed/listings.db"
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # timeout: las ciudades se escriben desde procesos en paralelo
+        self.conn = sqlite3.connect(self.path, timeout=60)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def upsert(self, df, batch_rows=BATCH_ROWS):
+        """
+        Inserta o actualiza por url. Las filas con el mismo hash no se tocan.
+        Retorna la cantidad de filas insertadas o modificadas.
+        """
+        frame = pd.DataFrame({c: df[c] if c in df.columns else None for c in ["url"] + DATA_COLUMNS})
+        frame = frame[frame["url"].notna()].drop_duplicates("url", keep="first")
+        frame["row_hash"] = _row_hashes(frame)
+        frame["updated_at"] = datetime.now().isoformat(timespec="seconds")
+
+        # Solo filas nuevas o con contenido distinto
+        existing = dict(self.conn.execute("SELECT url, row_hash FROM listings"))
+        frame = frame[frame["url"].map(existing) != frame["row_hash"]]
+
+        names = list(COLUMNS)
+        updates = ", ".join(f"{c} = excluded.{c}" for c in names if c != "url")
+        sql = (
+            f"INSERT INTO listings ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT(url) DO UPDATE SET {updates}"
+        )
+
+        # NaN → NULL
+        frame = frame.astype(object).where(frame.notna(), None)
+        rows = frame[names].itertuples(index=False, name=None)
+        while True:
+            batch = [row for _, row in zip(range(batch_rows), rows)]
+            if not batch:
+                break
+            with self.conn:  # una transacción por lote
+                self.conn.executemany(sql, batch)
+        return len(frame)
+
+    def delete_missing(self, urls, city=None):
+        """Borra las propiedades (de una ciudad) que ya no están en `urls`"""
+        keep = set(urls)
+        query = "SELECT url FROM listings" + (" WHERE city = ?" if city else "")
+        stored = [row[0] for row in self.conn.execute(query, (city,) if city else ())]
+        gone = [(url,) for url in stored if url not in keep]
+        with self.conn:
+            self.conn.executemany("DELETE FROM listings WHERE url = ?", gone)
+        return len(gone)
+
+    def search(self, district=None, city=None, min_price=None, max_price=None,
+               bedrooms=None, min_score=None, text=None, order_by="final_score", limit=20):
+        """
+        Consulta con filtros combinables.
+        text: búsqueda FTS5 sobre title/location (p.ej. 'piscina', 'terraza OR jardin');
+        cualquier texto es válido (ver fts_query).
+        """
+        if order_by not in ("final_score", "price_clean", "area_clean"):
+            raise ValueError(f"order_by no soportado: {order_by}")
+
+        where, params = [], []
+        source = "listings l"
+        if text:
+            source += " JOIN listings_fts f ON f.rowid = l.rowid"
+            where.append("listings_fts MATCH ?")
+            params.append(fts_query(text))
+        if district:
+            where.append("l.district = ?")
+            params.append(district.upper())
+        if city:
+            where.append("l.city = ?")
+            params.append(city)
+        if min_price is not None:
+            where.append("l.price_clean >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            where.append("l.price_clean <= ?")
+            params.append(max_price)
+        if bedrooms is not None:
+            where.append("l.bedroom_clean = ?")
+            params.append(bedrooms)
+        if min_score is not None:
+            where.append("l.final_score >= ?")
+            params.append(min_score)
+
+        direction = "ASC" if order_by == "price_clean" else "DESC"
+        sql = f"SELECT l.* FROM {source}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" ORDER BY l.{order_by} {direction} LIMIT ?"
+        params.append(limit)
+
+        return pd.read_sql_query(sql, self.conn, params=params)
+
+
+def store_listings(df, path=None, city=None):
+    """Sink del procesador: upsert de una ciudad y limpieza de las que desaparecieron"""
+    with ListingStore(path) as store:
+        changed = store.upsert(df)
+        removed = store.delete_missing(df["url"].dropna(), city=city)
+    print(f"🗄️  SQLite {path or DB_PATH}: {changed} filas nuevas/cambiadas, {removed} borradas")
+    return changed
@@ -0,0 +1,386 @@
+"""
+ÍNDICE DE MERCADO - precio por m² diario por distrito (solo agrega)
+
+En lugar de recalcular todo desde la última foto del dataset, cada corrida
+suma al día de hoy solo las propiedades que no se habían visto antes (por
+url). Por día y distrito se guarda:
+    count, suma de precio/m² y un histograma logarítmico de precio/m²
+El histograma es un sketch que se puede sumar entre días, así que la
+mediana de cualquier ventana sale de los agregados con error relativo
+acotado (~SKETCH_GAMMA - 1) sin volver a las filas crudas.
+
+Primera corrida (sin índice previo): el histórico no se amontona en el día
+de hoy. Cada propiedad se asigna a su fecha de publicación (`date_pub`,
+p. ej. '14 ene. 2023 - Publicado por ...'); las que solo traen una fecha
+relativa ('Hace 3 semanas, ...') quedan como vistas sin contarse.
+
+Archivos: data/processed/market_index/, un day-AAAA-MM-DD.npz por día de
+corrida con filas dispersas (día, distrito, count, suma) y (día, distrito,
+bucket, count) más las urls vistas por primera vez, e index.json con la
+lista de partes y los parámetros del sketch. Una corrida agrega filas solo
+a la parte de su día, así que el costo crece con las propiedades nuevas y
+no con el histórico. Un market_index.npz denso anterior se convierte al
+cargarlo.
+Las ventanas móviles de 7/30/90 días también se publican en
+web/data/market_trends.json para el dashboard.
+
+Ejemplo:
+    index = MarketIndex.load()
+    index.rolling(30)                      # todos los distritos
+    index.series(district_id=22, window=7) # serie diaria de Miraflores
+
+Uso (desde la raíz del repo, después de data_processor_final.py):
+    python scripts/market_index.py [--date AAAA-MM-DD]
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.districts import DISTRICT_TABLE, UNKNOWN_ID, district_names
+from scripts.exporters import atomic_writer
+
+SCORED_PATH = "data/processed/scored_properties.csv"
+INDEX_PATH = "data/processed/market_index/index.json"
+LEGACY_PATH = "data/processed/market_index.npz"  # formato denso anterior (se migra al cargar)
+TRENDS_JSON = "web/data/market_trends.json"
+
+WINDOWS = (7, 30, 90)
+
+# Buckets logarítmicos de precio/m² (S/): el bucket i cubre [MIN·γ^i, MIN·γ^(i+1))
+SKETCH_MIN = 1.0
+SKETCH_MAX = 2_000.0
+SKETCH_GAMMA = 1.02
+SKETCH_BUCKETS = int(np.ceil(np.log(SKETCH_MAX / SKETCH_MIN) / np.log(SKETCH_GAMMA)))
+
+# Meses abreviados de date_pub (Properati en español)
+MONTHS = {
+    "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6,
+    "jul": 7, "ago": 8, "set": 9, "sep": 9, "oct": 10, "nov": 11, "dic": 12,
+}
+_PUBLISH_DATE = r"^\s*(\d{1,2}) (\w{3})\w*\.? (\d{4})"
+
+# Eje de distritos: la posición es el district_id (0 = desconocido, no se usa)
+N_DISTRICTS = len(DISTRICT_TABLE) + 1
+
+
+def sketch_bucket(values):
+    """precio/m² → índice de bucket (los extremos caen en el primero/último)"""
+    ratio = np.maximum(np.asarray(values, dtype=float) / SKETCH_MIN, 1.0)
+    return np.clip(np.floor(np.log(ratio) / np.log(SKETCH_GAMMA)), 0, SKETCH_BUCKETS - 1).astype(np.int64)
+
+
+def sketch_quantile(sketch, q=0.5):
+    """
+    Cuantil desde histogramas (último eje = buckets). Retorna el punto
+    medio geométrico del bucket que contiene el cuantil; NaN si está vacío.
+    """
+    cumulative = np.cumsum(sketch, axis=-1)
+    total = cumulative[..., -1]
+    target = np.maximum(np.ceil(q * total), 1)[..., None]
+    bucket = (cumulative < target).sum(axis=-1)
+    value = SKETCH_MIN * SKETCH_GAMMA ** (np.minimum(bucket, SKETCH_BUCKETS - 1) + 0.5)
+    return np.where(total > 0, value, np.nan)
+
+
+def publish_dates(date_pub):
+    """'14 ene. 2023 - Publicado por ...' → 2023-01-14; fechas relativas o vacías → NaT"""
+    parts = pd.Series(date_pub, dtype=object).astype(str).str.extract(_PUBLISH_DATE)
+    dates = pd.to_datetime(pd.DataFrame({
+        "year": pd.to_numeric(parts[2]).astype(float),
+        "month": parts[1].str.lower().map(MONTHS).astype(float),
+        "day": pd.to_numeric(parts[0]).astype(float),
+    }), errors="coerce")
+    return dates.to_numpy(dtype="datetime64[D]")
+
+
+def url_keys(urls):
+    """url → hash uint64 (el conjunto de 'ya vistas' se guarda así, ordenado)"""
+    return pd.util.hash_array(pd.Series(urls).astype(str).to_numpy())
+
+
+def _sum_by(keys, *values):
+    """Claves repetidas → (claves únicas ordenadas, suma de cada arreglo de valores por clave)"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, [np.bincount(inverse, weights=v, minlength=len(unique)) for v in values]
+
+
+# Columnas de una parte, en el orden de los argumentos de _part
+PART_COLUMNS = ("day", "district", "count", "sum",
+                "cell_day", "cell_district", "cell_bucket", "cell_count", "seen")
+
+
+def _part(day, district, count, total, bucket_day, bucket_district, bucket, bucket_count, seen):
+    """
+    Filas dispersas de un día de corrida, compactadas:
+        day, district, count, sum          → una fila por (día, distrito) con datos
+        cell_day, cell_district,
+        cell_bucket, cell_count            → una fila por bucket no vacío
+        seen                               → urls vistas por primera vez en esa corrida
+    """
+    day = np.asarray(day, dtype="datetime64[D]").astype(np.int64)
+    keys, (count, total) = _sum_by(day * N_DISTRICTS + np.asarray(district, dtype=np.int64), count, total)
+    cell_keys, (cell_count,) = _sum_by(
+        (np.asarray(bucket_day, dtype="datetime64[D]").astype(np.int64) * N_DISTRICTS
+         + np.asarray(bucket_district, dtype=np.int64)) * SKETCH_BUCKETS + np.asarray(bucket, dtype=np.int64),
+        bucket_count,
+    )
+    cell_day, cell_rest = np.divmod(cell_keys, N_DISTRICTS * SKETCH_BUCKETS)
+    return {
+        "day": (keys // N_DISTRICTS).astype("datetime64[D]"),
+        "district": (keys % N_DISTRICTS).astype(np.int16),
+        "count": count.astype(np.int64),
+        "sum": total,
+        "cell_day": cell_day.astype("datetime64[D]"),
+        "cell_district": (cell_rest // SKETCH_BUCKETS).astype(np.int16),
+        "cell_bucket": (cell_rest % SKETCH_BUCKETS).astype(np.int16),
+        "cell_count": cell_count.astype(np.int64),
+        "seen": np.asarray(seen, dtype=np.uint64),
+    }
+
+
+def _merge_parts(a, b):
+    """Une dos partes del mismo día de corrida (costo proporcional a ese día, no al histórico)"""
+    return _part(*(np.concatenate([a[column], b[column]]) for column in PART_COLUMNS))
+
+
+_EMPTY_PART = _part(*[[]] * 9)
+
+
+def _part_name(run_day):
+    return f"day-{run_day}.npz"
+
+
+class MarketIndex:
+    """
+    Agregados diarios por distrito en filas dispersas, un archivo por día de
+    corrida, + conjunto de urls ya contadas. Una corrida solo reescribe su
+    propio archivo y el manifest.
+    """
+
+    def __init__(self, parts=None):
+        self.parts = dict(parts or {})  # día de corrida (AAAA-MM-DD) → filas de _part
+        self.dirty = set(self.parts)     # días de corrida a escribir en el próximo save()
+        seen = [part["seen"] for part in self.parts.values()]
+        self.seen = np.unique(np.concatenate(seen)) if seen else np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def empty(cls):
+        return cls()
+
+    def save(self, path=INDEX_PATH):
+        """Escribe solo las partes nuevas o modificadas y luego el manifest (todo atómico)"""
+        directory = os.path.dirname(path)
+        for run_day in sorted(self.dirty):
+            with atomic_writer(os.path.join(directory, _part_name(run_day)), mode="wb") as f:
+                np.savez_compressed(f, **self.parts[run_day])
+        manifest = {
+            "sketch": [SKETCH_MIN, SKETCH_MAX, SKETCH_GAMMA],
+            "parts": [_part_name(run_day) for run_day in sorted(self.parts)],
+        }
+        with atomic_writer(path) as f:
+            json.dump(manifest, f, indent=2)
+        self.dirty = set()
+
+    @classmethod
+    def load(cls, path=INDEX_PATH, legacy_path=LEGACY_PATH):
+        if not os.path.exists(path):
+            # Índice denso anterior (días × distritos × buckets): se convierte una vez
+            return cls.from_dense(legacy_path) if os.path.exists(legacy_path) else cls.empty()
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if not np.allclose(manifest["sketch"], [SKETCH_MIN, SKETCH_MAX, SKETCH_GAMMA]):
+            raise ValueError(f"{path} usa otros parámetros de sketch; reconstruya el índice")
+
+        parts = {}
+        for name in manifest["parts"]:
+            with np.load(os.path.join(os.path.dirname(path), name)) as data:
+                parts[name[len("day-"):-len(".npz")]] = {key: data[key] for key in data.files}
+        index = cls(parts)
+        index.dirty = set()
+        return index
+
+    @classmethod
+    def from_dense(cls, path):
+        """market_index.npz con arreglos densos → una sola parte (con el día de hoy)"""
+        with np.load(path) as data:
+            if not np.allclose(data["sketch"], [SKETCH_MIN, SKETCH_MAX, SKETCH_GAMMA]):
+                raise ValueError(f"{path} usa otros parámetros de sketch; reconstruya el índice")
+            days, counts, sums, sketches, seen = (
+                data["days"], data["counts"], data["sums"], data["sketches"], data["seen"]
+            )
+        day, district = np.nonzero(counts)
+        cell_day, cell_district, bucket = np.nonzero(sketches)
+        part = _part(days[day], district, counts[day, district], sums[day, district],
+                     days[cell_day], cell_district, bucket, sketches[cell_day, cell_district, bucket], seen)
+        return cls({str(date.today()): part})
+
+    def _rows(self, *columns):
+        """Columnas de todas las partes concatenadas (para consultas; update no las usa)"""
+        parts = list(self.parts.values()) or [_EMPTY_PART]
+        return [np.concatenate([part[column] for part in parts]) for column in columns]
+
+    @property
+    def days(self):
+        """Días con datos, ordenados"""
+        return np.unique(self._rows("day")[0])
+
+    def update(self, df, day=None, seed=False):
+        """
+        Suma al día `day` (hoy por defecto) las propiedades cuya url no se
+        había visto. El costo depende solo de las filas nuevas: se agregan
+        filas a la parte del día de corrida, sin tocar las demás.
+        seed=True (primera corrida): cada propiedad va a su fecha de
+        publicación y las que no tienen una fecha absoluta no se cuentan.
+        Retorna la cantidad de propiedades agregadas.
+        """
+        keys, first = np.unique(url_keys(df["url"]), return_index=True)
+        pos = np.searchsorted(self.seen, keys)
+        known = (pos < len(self.seen)) & (self.seen[np.minimum(pos, len(self.seen) - 1)] == keys) \
+            if len(self.seen) else np.zeros(len(keys), dtype=bool)
+        new_keys, rows = keys[~known], first[~known]
+        if not len(new_keys):
+            return 0
+
+        new = df.iloc[rows]
+        price_m2 = (new["price_clean"] / new["area_clean"].where(new["area_clean"] > 0)).to_numpy(dtype=float)
+        district = new["district_id"].fillna(UNKNOWN_ID).to_numpy(dtype=np.int64)
+        ok = np.isfinite(price_m2) & (price_m2 > 0) & (district != UNKNOWN_ID)
+
+        run_day = np.datetime64(day or date.today(), "D")
+        if seed:
+            days = publish_dates(new["date_pub"]) if "date_pub" in new.columns \
+                else np.full(len(new), np.datetime64("NaT"), dtype="datetime64[D]")
+            ok &= ~np.isnat(days)
+        else:
+            days = np.full(len(new), run_day)
+
+        ones = np.ones(int(ok.sum()))
+        # Todas las nuevas cuentan como vistas (también las sin distrito, precio o fecha)
+        part = _part(days[ok], district[ok], ones, price_m2[ok],
+                     days[ok], district[ok], sketch_bucket(price_m2[ok]), ones, new_keys)
+        run_day = str(run_day)
+        self.parts[run_day] = _merge_parts(self.parts[run_day], part) if run_day in self.parts else part
+        self.dirty.add(run_day)
+        self.seen = np.insert(self.seen, np.searchsorted(self.seen, new_keys), new_keys)
+        return int(ok.sum())
+
+    def _window(self, window, end):
+        days = self.days
+        end = np.datetime64(end or (days[-1] if len(days) else date.today()), "D")
+        return end - np.timedelta64(window, "D"), end
+
+    def rolling(self, window=30, end=None):
+        """Una fila por distrito con datos en los `window` días que terminan en `end`"""
+        start, end = self._window(window, end)
+        day, district, count, total = self._rows("day", "district", "count", "sum")
+        mask = (day > start) & (day <= end)
+        counts = np.bincount(district[mask].astype(np.int64), weights=count[mask], minlength=N_DISTRICTS)
+        sums = np.bincount(district[mask].astype(np.int64), weights=total[mask], minlength=N_DISTRICTS)
+
+        cell_day, cell_district, bucket, cell_count = self._rows("cell_day", "cell_district", "cell_bucket", "cell_count")
+        cells = (cell_day > start) & (cell_day <= end)
+        sketch = np.zeros((N_DISTRICTS, SKETCH_BUCKETS), dtype=np.int64)
+        np.add.at(sketch, (cell_district[cells].astype(np.int64), bucket[cells].astype(np.int64)), cell_count[cells])
+
+        ids = np.flatnonzero(counts)
+        return pd.DataFrame({
+            "district_id": ids,
+            "district": district_names(ids),
+            "count": counts[ids].astype(np.int64),
+            "mean_price_m2": (sums[ids] / counts[ids]).round(2),
+            "median_price_m2": sketch_quantile(sketch[ids]).round(2),
+            "window_days": window,
+            "end": str(end),
+        })
+
+    def series(self, district_id, window=30):
+        """Serie diaria de la ventana móvil (sumas acumuladas sobre el eje de días)"""
+        days = self.days
+        if not len(days):
+            return pd.DataFrame(columns=["count", "mean_price_m2", "median_price_m2"])
+
+        # Solo el distrito pedido se densifica (días × buckets)
+        day, district, count, total = self._rows("day", "district", "count", "sum")
+        mine = district == district_id
+        position = np.searchsorted(days, day[mine])
+        daily_counts = np.bincount(position, weights=count[mine], minlength=len(days)).astype(np.int64)
+        daily_sums = np.bincount(position, weights=total[mine], minlength=len(days))
+        cell_day, cell_district, bucket, cell_count = self._rows("cell_day", "cell_district", "cell_bucket", "cell_count")
+        cells = cell_district == district_id
+        daily_sketches = np.zeros((len(days), SKETCH_BUCKETS), dtype=np.int64)
+        np.add.at(daily_sketches, (np.searchsorted(days, cell_day[cells]), bucket[cells].astype(np.int64)),
+                  cell_count[cells])
+
+        def prefix(a):
+            return np.concatenate([np.zeros((1,) + a.shape[1:], dtype=a.dtype), np.cumsum(a, axis=0)])
+
+        counts = prefix(daily_counts)
+        sums = prefix(daily_sums)
+        sketches = prefix(daily_sketches)
+
+        start = np.searchsorted(days, days - np.timedelta64(window - 1, "D"))
+        end = np.arange(1, len(days) + 1)
+        count = counts[end] - counts[start]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = (sums[end] - sums[start]) / count
+        return pd.DataFrame({
+            "count": count,
+            "mean_price_m2": mean.round(2),
+            "median_price_m2": sketch_quantile(sketches[end] - sketches[start]).round(2),
+        }, index=pd.DatetimeIndex(days, name="day"))
+
+
+def write_trends(index, path=TRENDS_JSON, windows=WINDOWS):
+    """Ventanas 7/30/90 días por distrito para el dashboard"""
+    trends = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "windows": {
+            str(window): index.rolling(window).drop(columns=["window_days"]).to_dict(orient="records")
+            for window in windows
+        },
+    }
+    with atomic_writer(path) as f:
+        json.dump(trends, f, ensure_ascii=False, separators=(",", ":"))
+
+
+def update_market_index(scored_path=SCORED_PATH, index_path=INDEX_PATH, day=None):
+    """Etapa completa: agrega las propiedades nuevas del día y publica las ventanas"""
+    index = MarketIndex.load(index_path)
+    seed = not len(index.seen)
+    added = index.update(pd.read_csv(scored_path), day=day, seed=seed)
+    index.save(index_path)
+    write_trends(index)
+
+    if seed:
+        print(f"✅ Índice de mercado (primera corrida): {added} propiedades por fecha de publicación")
+    else:
+        print(f"✅ Índice de mercado: {added} propiedades nuevas para {day or date.today()}")
+    print(f"   Días en el índice: {len(index.days)} | urls vistas: {len(index.seen)}")
+    latest = index.rolling(30).sort_values("median_price_m2", ascending=False).head(5)
+    for _, row in latest.iterrows():
+        print(f"   • {row['district']:<25} S/ {row['median_price_m2']:>8.2f}/m² (30 días, n={row['count']})")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Actualiza el índice diario de precio por m²")
+    parser.add_argument("--date", type=date.fromisoformat, default=None,
+                        help="día al que se asignan las propiedades nuevas (por defecto hoy)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("📈 LIMA HOUSING ANALYTICS - ÍNDICE DE MERCADO")
+    print("=" * 60)
+    update_market_index(day=args.date)
+
+
+if __name__ == "__main__":
+    main()
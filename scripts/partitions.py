@@ -0,0 +1,281 @@
+"""
+PARTICIONES POR CIUDAD
+
+La ingesta valida el dataset y separa las propiedades por ciudad
+(provincia) según el final de `location`:
+    'Ur. Santa Cruz, Miraflores, Lima, Lima'   → city=lima
+    'Cercado, Arequipa, Arequipa, Arequipa'    → city=arequipa
+Cada partición se guarda aparte y se procesa de forma independiente (en
+paralelo), con salidas en data/processed/city=<ciudad>/. Una ciudad solo
+se reprocesa si cambiaron sus filas, los datos de seguridad, el código
+que limpia/puntúa/exporta (SCORING_CODE) o, para Lima, el GeoJSON de
+distritos y el gazetteer, así que agregar Arequipa o Trujillo no vuelve
+a correr Lima. Las filas con lat/lon dentro de un distrito de Lima van a
+la partición de Lima aunque `location` diga otra cosa.
+
+La partición de Lima además se publica en las rutas de siempre
+(data/processed/scored_properties.csv y web/data/properties.json).
+
+Uso (desde la raíz del repo):
+    python scripts/partitions.py [--city lima arequipa] [--force] [--workers N] [--sqlite data/processed/listings.db]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import data_processor_final as dp
+from scripts.districts import UNKNOWN_ID, fold_name
+from scripts.district_polygons import POLYGONS_PATH, load_polygons
+from scripts.delta_feed import FEED_INDEX, publish_feed
+from scripts.exporters import ExportQueue
+from scripts.gazetteer import GAZETTEER_PATH
+from scripts.listing_store import DB_PATH, store_listings
+from scripts.validation import validate_and_quarantine
+
+INTERIM_ROOT = "data/interim"
+PROCESSED_ROOT = "data/processed"
+INTERIM_MANIFEST = os.path.join(INTERIM_ROOT, "partitions.json")
+PROCESSED_MANIFEST = os.path.join(PROCESSED_ROOT, "partitions.json")
+
+LIMA = "lima"
+UNKNOWN_CITY = "sin-ciudad"
+
+_PROVINCE_PREFIXES = ("PROVINCIA DE ", "PROVINCIA ")
+
+# Módulos que definen las salidas por ciudad: si cambian, todo se reprocesa
+# (también es el `code` de la etapa score en pipeline.py)
+SCORING_CODE = [
+    "data_processor_final.py", "partitions.py", "validation.py", "districts.py", "district_polygons.py",
+    "gazetteer.py", "exporters.py", "listing_store.py", "delta_feed.py",
+]
+
+
+def city_slug(province):
+    """'Provincia de Cañete' → 'canete', 'Lima' → 'lima'"""
+    name = fold_name(province)
+    for prefix in _PROVINCE_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix):]
+    return name.lower().replace(" ", "-") or UNKNOWN_CITY
+
+
+def parse_location(df):
+    """
+    Agrega region, province, city y location_district desde `location`
+    (vectorizado; cada ubicación distinta se procesa una vez).
+    Formato: [zona,] distrito, provincia, región
+    Las filas con lat/lon dentro de un polígono de distrito van a Lima
+    aunque el texto diga otra cosa.
+    """
+    locations = df["location"].astype("string").str.strip()
+    unique = pd.Series(locations.dropna().unique(), dtype="string")
+    parts = unique.str.split(",").apply(lambda p: [x.strip() for x in p])
+
+    table = pd.DataFrame({
+        "location_key": unique,
+        "region": parts.str[-1],
+        "province": parts.apply(lambda p: p[-2] if len(p) >= 2 else None),
+        "location_district": parts.apply(lambda p: p[-3] if len(p) >= 3 else None),
+    })
+    table["city"] = table["province"].map(lambda p: city_slug(p) if p else UNKNOWN_CITY)
+
+    parsed = pd.DataFrame({"location_key": locations}, index=df.index).merge(
+        table, on="location_key", how="left"
+    )
+    parsed.index = df.index
+    for column in ("region", "province", "location_district", "city"):
+        df[column] = parsed[column]
+    df["city"] = df["city"].fillna(UNKNOWN_CITY)
+
+    # Con coordenadas dentro de un distrito de Lima, la partición sale del punto
+    polygons = load_polygons()
+    if polygons is not None and {"lat", "lon"}.issubset(df.columns):
+        lat = pd.to_numeric(df["lat"], errors="coerce")
+        lon = pd.to_numeric(df["lon"], errors="coerce")
+        located = lat.notna() & lon.notna()
+        in_lima = polygons.assign(lon[located], lat[located]) != UNKNOWN_ID
+        df.loc[df.index[located][in_lima], "city"] = LIMA
+    return df
+
+
+def _partition_dir(root, city):
+    return os.path.join(root, f"city={city}")
+
+
+def _frame_hash(df):
+    return hashlib.sha256(pd.util.hash_pandas_object(df, index=True).values.tobytes()).hexdigest()
+
+
+def _file_hash(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def code_hash(modules=SCORING_CODE):
+    """Hash combinado de los módulos de scripts/ que producen las salidas"""
+    hasher = hashlib.sha256()
+    base = os.path.dirname(os.path.abspath(__file__))
+    for module in modules:
+        hasher.update(module.encode())
+        hasher.update((_file_hash(os.path.join(base, module)) or "").encode())
+    return hasher.hexdigest()
+
+
+def _load_json(path):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def _save_json(data, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def ingest(dataset_path=dp.DATASET_PATH):
+    """
+    Dataset crudo → validación → una partición por ciudad en data/interim.
+    Solo se reescriben las particiones cuyas filas cambiaron.
+    """
+    df = validate_and_quarantine(dp.load_listings(dataset_path))
+    df = parse_location(df)
+
+    old_manifest = _load_json(INTERIM_MANIFEST)
+    manifest = {}
+    changed = []
+
+    for city, part in df.groupby("city", sort=True):
+        part = part.drop(columns=["city"])
+        digest = _frame_hash(part)
+        path = os.path.join(_partition_dir(INTERIM_ROOT, city), "listings.pkl")
+
+        if old_manifest.get(city, {}).get("sha256") != digest or not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            part.to_pickle(path)
+            changed.append(city)
+        manifest[city] = {"rows": len(part), "sha256": digest, "path": path}
+
+    # Ciudades que desaparecieron del dataset
+    for city in set(old_manifest) - set(manifest):
+        stale = old_manifest[city].get("path")
+        if stale and os.path.exists(stale):
+            os.remove(stale)
+
+    _save_json(manifest, INTERIM_MANIFEST)
+    print(f"🗂️  Particiones: {len(manifest)} ciudades | cambiaron: {changed or 'ninguna'}")
+    return manifest
+
+
+def process_city(city, listings_path, security_path=dp.SECURITY_PATH, sqlite_path=DB_PATH):
+    """Limpia, puntúa y exporta una sola ciudad (se ejecuta en un proceso del pool)"""
+    df = pd.read_pickle(listings_path)
+    df = dp.clean_listings(df, lima_only=(city == LIMA))
+    df_scored, valid_data = dp.score_listings(df, dp.load_security_scores(security_path))
+    df_scored["city"] = city
+
+    export_city(city, df_scored, sqlite_path)
+    return {"rows": len(df_scored), "valid": len(valid_data)}
+
+
+def export_city(city, df_scored, sqlite_path=DB_PATH):
+    """Publica las salidas de una ciudad (CSV/JSON, rutas de Lima y sink SQLite) a la vez"""
+    out_dir = _partition_dir(PROCESSED_ROOT, city)
+    with ExportQueue() as exports:
+        dp.export_results(
+            df_scored,
+            output_csv=os.path.join(out_dir, "scored_properties.csv"),
+            output_json=os.path.join(out_dir, "properties.json"),
+            exports=exports,
+        )
+        if city == LIMA:
+            # Rutas publicadas por el dashboard + feed de cambios por url
+            dp.export_results(df_scored, exports=exports)
+            exports.submit(publish_feed, df_scored)
+        if sqlite_path:
+            exports.submit(store_listings, df_scored, sqlite_path, city)
+
+
+def process_partitions(cities=None, force=False, workers=None, security_path=dp.SECURITY_PATH,
+                       sqlite_path=DB_PATH):
+    """Procesa en paralelo las ciudades cuyo input (filas, seguridad o código) cambió"""
+    interim = _load_json(INTERIM_MANIFEST)
+    if not interim:
+        raise FileNotFoundError(f"No hay particiones; ejecute la ingesta primero ({INTERIM_MANIFEST})")
+
+    processed = _load_json(PROCESSED_MANIFEST)
+    security_hash = _file_hash(security_path)
+    gazetteer_hash = _file_hash(GAZETTEER_PATH)
+    polygons_hash = _file_hash(POLYGONS_PATH)
+    scoring_hash = code_hash()
+    selected = cities or sorted(interim)
+
+    pending = []
+    for city in selected:
+        if city not in interim:
+            raise KeyError(f"Ciudad sin partición: {city} (disponibles: {sorted(interim)})")
+        inputs = {"listings": interim[city]["sha256"], "security": security_hash, "code": scoring_hash}
+        if city == LIMA:
+            # Polígonos y gazetteer de urbanizaciones solo intervienen en la limpieza de Lima
+            inputs["polygons"] = polygons_hash
+            inputs["gazetteer"] = gazetteer_hash
+        previous = processed.get(city, {})
+        outputs = [os.path.join(_partition_dir(PROCESSED_ROOT, city), "scored_properties.csv")]
+        if city == LIMA:
+            outputs.append(FEED_INDEX)
+        if force or previous.get("inputs") != inputs or not all(map(os.path.exists, outputs)):
+            pending.append((city, inputs))
+
+    skipped = [c for c in selected if c not in {p[0] for p in pending}]
+    print(f"🏙️  Ciudades a procesar: {[c for c, _ in pending] or 'ninguna'} | sin cambios: {len(skipped)}")
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                city: (pool.submit(process_city, city, interim[city]["path"], security_path, sqlite_path), inputs)
+                for city, inputs in pending
+            }
+            for city, (future, inputs) in futures.items():
+                summary = future.result()
+                processed[city] = {"inputs": inputs, **summary}
+                print(f"   ✅ city={city}: {summary['rows']} propiedades")
+
+    for city in set(processed) - set(interim):
+        del processed[city]
+    _save_json(processed, PROCESSED_MANIFEST)
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingesta y procesamiento por ciudad")
+    parser.add_argument("--city", nargs="+", help="procesar solo estas ciudades (slug)")
+    parser.add_argument("--skip-ingest", action="store_true", help="usar las particiones existentes")
+    parser.add_argument("--force", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--sqlite", default=DB_PATH, help="ruta del .db para el sink SQLite (opcional)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🗂️  LIMA HOUSING ANALYTICS - PROCESAMIENTO POR CIUDAD")
+    print("=" * 60)
+
+    if not args.skip_ingest:
+        ingest()
+    process_partitions(cities=args.city, force=args.force, workers=args.workers, sqlite_path=args.sqlite)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+PIPELINE DE DATOS - Ejecutor de etapas (DAG)
+
+Cada etapa declara sus artefactos de entrada y salida y los archivos de
+código de los que depende. Las dependencias entre etapas salen de los
+artefactos (la salida de una es entrada de otra), así que no hay que
+correr los scripts a mano en orden.
+
+- Una etapa se salta si la huella (SHA-256) de sus entradas y de su código
+  no cambió desde la última corrida y sus salidas siguen en disco.
+- Las etapas independientes corren en paralelo (procesos).
+- Al final se imprime y guarda un reporte con tiempos.
+
+Uso (desde la raíz del repo):
+    python scripts/pipeline.py [--force] [--only ETAPA ...] [--workers N]
+
+Para mantener las salidas al día sin relanzar el pipeline, ver el modo
+daemon en scripts/watch.py.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.build_images import SOURCE_DIR as IMAGES_DIR, find_sources
+from scripts.district_polygons import POLYGONS_PATH
+from scripts.gazetteer import GAZETTEER_PATH
+from scripts.partitions import SCORING_CODE
+
+STATE_PATH = "data/.pipeline_state.json"
+REPORT_PATH = "data/processed/pipeline_report.json"
+INTERIM_DIR = "data/interim"
+
+PARTITIONS_MANIFEST = os.path.join(INTERIM_DIR, "partitions.json")
+
+
+# ---------------------------------------------------------
+# Etapas (funciones a nivel de módulo para poder enviarlas a otro proceso)
+# ---------------------------------------------------------
+
+def run_security():
+    """INEI crudo → security_by_district.csv"""
+    from scripts import process_security
+    process_security.main()
+
+
+def run_partition():
+    """dataset.csv → validación/cuarentena → una partición por ciudad"""
+    from scripts import partitions
+    partitions.ingest()
+
+
+def run_score():
+    """particiones + seguridad → data/processed/city=<x>/ (Lima también en las rutas publicadas)"""
+    from scripts import partitions
+    partitions.process_partitions()
+
+
+def run_similarity():
+    """propiedades puntuadas → índice KD-tree + vecinos precalculados"""
+    from scripts import similarity
+    similarity.build_similarity()
+
+
+def run_tiles():
+    """propiedades puntuadas (con lat/lon) → tiles de mapa de calor por zoom"""
+    from scripts import geo_tiles
+    geo_tiles.build_tiles()
+
+
+def run_market():
+    """propiedades puntuadas → índice diario de precio/m² (solo las nuevas) + ventanas 7/30/90"""
+    from scripts import market_index
+    market_index.update_market_index()
+
+
+def run_images():
+    """fotos de distritos → variantes responsivas + manifest"""
+    from scripts import build_images
+    build_images.build_images()
+
+
+class Stage:
+    def __init__(self, name, func, inputs, outputs, code):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+
+
+STAGES = [
+    Stage(
+        "security", run_security,
+        inputs=["data/raw/security_raw.csv"],
+        outputs=["data/processed/security_by_district.csv", "data/processed/crime_cube.npz"],
+        code=["scripts/process_security.py", "scripts/crime_cube.py", "scripts/districts.py"],
+    ),
+    Stage(
+        "partition", run_partition,
+        # Con lat/lon, la ciudad de cada fila sale de los polígonos (si existen)
+        inputs=["data/raw/dataset.csv"] + [p for p in [POLYGONS_PATH] if os.path.exists(p)],
+        outputs=[
+            PARTITIONS_MANIFEST,
+            "data/processed/quarantine_listings.csv",
+            "data/processed/validation_report.json",
+        ],
+        code=[
+            "scripts/partitions.py", "scripts/data_processor_final.py",
+            "scripts/validation.py", "scripts/districts.py", "scripts/district_polygons.py",
+        ],
+    ),
+    Stage(
+        "score", run_score,
+        # El GeoJSON de distritos y el gazetteer son opcionales: solo son entrada si existen
+        inputs=[PARTITIONS_MANIFEST, "data/processed/security_by_district.csv"]
+        + [p for p in [POLYGONS_PATH, GAZETTEER_PATH] if os.path.exists(p)],
+        outputs=[
+            "data/processed/partitions.json",
+            "data/processed/scored_properties.csv",
+            "web/data/properties.json",
+            "web/data/feed/index.json",
+        ],
+        # Los mismos módulos con los que partitions.py decide qué ciudades reprocesar
+        code=[f"scripts/{module}" for module in SCORING_CODE],
+    ),
+    Stage(
+        "similarity", run_similarity,
+        inputs=["data/processed/scored_properties.csv"],
+        outputs=["data/processed/similarity_index.npz", "web/data/similar_listings.json"],
+        code=["scripts/similarity.py"],
+    ),
+    Stage(
+        "tiles", run_tiles,
+        inputs=["data/processed/scored_properties.csv"],
+        outputs=["web/data/tiles/index.json"],
+        code=["scripts/geo_tiles.py"],
+    ),
+    Stage(
+        "market", run_market,
+        inputs=["data/processed/scored_properties.csv"],
+        outputs=["data/processed/market_index/index.json", "web/data/market_trends.json"],
+        code=["scripts/market_index.py", "scripts/districts.py"],
+    ),
+    Stage(
+        "images", run_images,
+        # Las mismas fuentes que usa build_images.py (.jpg, .jpeg y .png de distritos conocidos)
+        inputs=sorted(find_sources()[0].values()) if os.path.isdir(IMAGES_DIR) else [],
+        outputs=["web/assets/img/build/manifest.json"],
+        code=["scripts/build_images.py", "scripts/districts.py"],
+    ),
+]
+
+
+# ---------------------------------------------------------
+# Huellas
+# ---------------------------------------------------------
+
+class Fingerprints:
+    """
+    SHA-256 por archivo, con caché por (tamaño, mtime) para que una corrida
+    sin cambios no tenga que volver a leer los archivos grandes.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def file(self, path):
+        if not os.path.exists(path):
+            return None
+        st = os.stat(path)
+        cached = self.cache.get(path)
+        if cached and cached["size"] == st.st_size and cached["mtime_ns"] == st.st_mtime_ns:
+            return cached["sha256"]
+
+        hasher = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(block)
+        digest = hasher.hexdigest()
+        self.cache[path] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest}
+        return digest
+
+    def stage(self, stage):
+        hasher = hashlib.sha256()
+        for path in sorted(stage.inputs) + sorted(stage.code):
+            hasher.update(path.encode())
+            hasher.update((self.file(path) or "missing").encode())
+        return hasher.hexdigest()
+
+
+def load_state(path=STATE_PATH):
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    return {"files": {}, "stages": {}}
+
+
+def save_state(state, path=STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+# ---------------------------------------------------------
+# Planificación y ejecución
+# ---------------------------------------------------------
+
+def build_graph(stages):
+    """Etapa → etapas de las que depende (según artefactos)"""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            producers[output] = stage.name
+
+    deps = {}
+    for stage in stages:
+        deps[stage.name] = {
+            producers[path] for path in stage.inputs
+            if path in producers and producers[path] != stage.name
+        }
+    return deps
+
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def run_pipeline(stages=STAGES, force=False, only=None, workers=None):
+    """Ejecuta el DAG y retorna el reporte (lista de dicts por etapa)"""
+    run_start = time.perf_counter()
+    state = load_state()
+    fingerprints = Fingerprints(state.setdefault("files", {}))
+    stage_state = state.setdefault("stages", {})
+
+    by_name = {stage.name: stage for stage in stages}
+    deps = build_graph(stages)
+    selected = set(only) if only else set(by_name)
+
+    pending = set(by_name)
+    done = set()
+    report = {}
+    running = {}
+
+    def ready():
+        return sorted(name for name in pending if deps[name] <= done)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in ready():
+                pending.discard(name)
+                stage = by_name[name]
+
+                if any(report.get(d, {}).get("status") in ("failed", "blocked") for d in deps[name]):
+                    report[name] = {"stage": name, "status": "blocked", "seconds": 0.0}
+                    done.add(name)
+                    continue
+
+                fingerprint = fingerprints.stage(stage)
+                outputs_ok = all(os.path.exists(p) for p in stage.outputs)
+                missing_inputs = [p for p in stage.inputs if not os.path.exists(p)]
+
+                if name not in selected:
+                    status = "not selected"
+                elif missing_inputs and any(os.path.exists(p) for p in stage.outputs):
+                    # Fuente no disponible (p.ej. extracto INEI no descargado): se usa lo publicado,
+                    # aunque falten salidas que solo se generan desde la fuente (crime_cube.npz)
+                    status = "skipped (sin entradas)"
+                elif not force and outputs_ok and stage_state.get(name) == fingerprint:
+                    status = "skipped"
+                else:
+                    status = None
+
+                if status:
+                    report[name] = {"stage": name, "status": status, "seconds": 0.0}
+                    done.add(name)
+                    continue
+
+                print(f"▶️  {name}")
+                running[pool.submit(_timed, stage.func)] = (name, fingerprint)
+
+            if not running:
+                if pending and not ready():
+                    raise RuntimeError(f"Dependencias circulares entre etapas: {sorted(pending)}")
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, _ = running.pop(future)
+                stage = by_name[name]
+                try:
+                    seconds = future.result()
+                    # Huella con las entradas tal como quedaron (incluye salidas nuevas de dependencias)
+                    stage_state[name] = fingerprints.stage(stage)
+                    for output in stage.outputs:
+                        fingerprints.file(output)
+                    report[name] = {"stage": name, "status": "ran", "seconds": round(seconds, 3)}
+                    print(f"✅ {name} ({seconds:.2f}s)")
+                except Exception as e:
+                    report[name] = {"stage": name, "status": "failed", "seconds": 0.0, "error": str(e)}
+                    print(f"❌ {name}: {e}")
+                done.add(name)
+
+    save_state(state)
+
+    total = time.perf_counter() - run_start
+    result = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "total_seconds": round(total, 3),
+        "stages": [report[stage.name] for stage in stages],
+    }
+    os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+    with open(REPORT_PATH, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    return result
+
+
+def print_run_report(result):
+    print("\n" + "=" * 60)
+    print("📋 REPORTE DEL PIPELINE")
+    print("=" * 60)
+    for entry in result["stages"]:
+        print(f"   • {entry['stage']:<16} {entry['status']:<24} {entry['seconds']:>8.2f}s")
+    print(f"   Total: {result['total_seconds']:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ejecuta el pipeline de datos")
+    parser.add_argument("--force", action="store_true", help="ignorar huellas y correr todo")
+    parser.add_argument("--only", nargs="+", choices=[s.name for s in STAGES],
+                        help="correr solo estas etapas")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🏡 LIMA HOUSING ANALYTICS - PIPELINE")
+    print("=" * 60)
+
+    result = run_pipeline(force=args.force, only=args.only, workers=args.workers)
+    print_run_report(result)
+
+    if any(entry["status"] in ("failed", "blocked") for entry in result["stages"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,59 +1,132 @@
+import os
+import sys
+
 import pandas as pd
 
-# 1. Cargar CSV INEI
-df = pd.read_csv("data/raw/security_raw.csv", encoding="latin1")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.crime_cube import CUBE_PATH, CrimeCube, add_cube_keys
+from scripts.districts import DISTRICT_TABLE, UNKNOWN_ID, district_names, resolve_district_ids
+
+RAW_PATH = "data/raw/security_raw.csv"
+OUTPUT_PATH = "data/processed/security_by_district.csv"
 
-# 2. Filtrar SOLO Lima Metropolitana
-df = df[df["DPTO_HECHO_NEW"].str.strip() == "LIMA METROPOLITANA"]
+# Filas por bloque al leer el extracto INEI (el archivo nacional no entra en memoria)
+CHUNK_SIZE = 200_000
 
-# 3. Filtrar SOLO provincia Lima
-df = df[df["PROV_HECHO"].str.strip() == "LIMA"]
 
-# 4. Limpiar distrito
-df["district"] = (
-    df["DIST_HECHO"]
-    .astype(str)
-    .str.upper()
-    .str.strip()
-)
+def filter_lima(df):
+    """Filtra SOLO Lima Metropolitana, provincia Lima, y limpia el distrito"""
+    # 2. Filtrar SOLO Lima Metropolitana
+    df = df[df["DPTO_HECHO_NEW"].str.strip() == "LIMA METROPOLITANA"]
 
-# 5. Agrupar delitos por distrito
-security = (
-    df.groupby("district")["cantidad"]
-    .sum()
-    .reset_index()
-)
+    # 3. Filtrar SOLO provincia Lima
+    df = df[df["PROV_HECHO"].str.strip() == "LIMA"].copy()
+
+    # 4. Limpiar distrito
+    df["district"] = (
+        df["DIST_HECHO"]
+        .astype(str)
+        .str.upper()
+        .str.strip()
+    )
+    return df
 
-security.rename(columns={"cantidad": "crime_count"}, inplace=True)
 
+def aggregate_crimes(chunks):
+    """
+    Agrupa delitos por distrito × periodo × categoría a partir de bloques de
+    filas INEI. Acepta cualquier iterable de DataFrames (pd.read_csv con
+    chunksize, o las filas que entrega el descargador en streaming).
+    Retorna filas (district, period, category, crime_count).
+    """
+    partials = []
+    total_rows = 0
 
-# Normalizar nombres de distrito (encoding + formato)
-security["district"] = (
-    security["district"]
-    .str.upper()
-    .str.replace("Ã", "Ñ")
-    .str.strip()
-)
+    for chunk in chunks:
+        total_rows += len(chunk)
+        lima = filter_lima(chunk)
+        if len(lima) == 0:
+            continue
+        lima = add_cube_keys(lima)
+        # 5. Agrupar delitos (parcial por bloque)
+        partials.append(lima.groupby(["district", "period", "category"])["cantidad"].sum())
 
+    print(f"   Filas INEI leídas: {total_rows}")
 
-max_crime = security["crime_count"].max()
-min_crime = security["crime_count"].min()
+    if not partials:
+        return pd.DataFrame(columns=["district", "period", "category", "crime_count"])
 
-security["security_score"] = (
-    10 - (
-        (security["crime_count"] - min_crime) /
-        (max_crime - min_crime) * 10
+    crimes = (
+        pd.concat(partials)
+        .groupby(level=[0, 1, 2])
+        .sum()
+        .reset_index()
     )
-).round(2)
+    crimes.columns = ["district", "period", "category", "crime_count"]
+    return crimes
+
+
+def resolve_crime_districts(crimes):
+    """Resuelve district_id con la dimensión compartida y descarta lo desconocido"""
+    # Normalizar nombres de distrito (encoding + alias); cada nombre distinto una vez
+    crimes["district_id"] = resolve_district_ids(crimes["district"])
+
+    unknown = crimes.loc[crimes["district_id"] == UNKNOWN_ID, "district"].unique().tolist()
+    if unknown:
+        print(f"⚠️  Distritos INEI sin id: {unknown}")
+
+    return crimes[crimes["district_id"] != UNKNOWN_ID]
+
+
+def compute_security_scores(crimes):
+    """Consolida por distrito y calcula security_score (0-10, menos delitos = mejor)"""
+    security = crimes.groupby("district_id", as_index=False)["crime_count"].sum()
+    security["district"] = district_names(security["district_id"])
+    security["ubigeo"] = DISTRICT_TABLE.loc[security["district_id"], "ubigeo"].values
+
+    max_crime = security["crime_count"].max()
+    min_crime = security["crime_count"].min()
+
+    security["security_score"] = (
+        10 - (
+            (security["crime_count"] - min_crime) /
+            (max_crime - min_crime) * 10
+        )
+    ).round(2)
+    return security[["district_id", "ubigeo", "district", "crime_count", "security_score"]]
+
+
+def save_security(security, output_path=OUTPUT_PATH):
+    """Guarda el resultado por distrito"""
+    security.to_csv(
+        output_path,
+        index=False,
+        encoding="utf-8-sig"
+    )
+
+
+def process_security(chunks, output_path=OUTPUT_PATH, cube_path=CUBE_PATH):
+    """Pipeline completo: bloques INEI → security_by_district.csv + cubo de delitos"""
+    crimes = resolve_crime_districts(aggregate_crimes(chunks))
+    security = compute_security_scores(crimes)
+    save_security(security, output_path)
+
+    cube = CrimeCube.from_long(crimes)
+    cube.save(cube_path)
+    print(f"🧊 Cubo de delitos: {cube.counts.shape} (distritos × periodos × categorías) → {cube_path}")
+
+    print("✅ Seguridad INEI procesada correctamente")
+    print("📊 Distritos únicos:", security.shape[0])
+    print(security.sort_values("crime_count", ascending=False).head())
+    return security
+
 
+def main():
+    # 1. Cargar CSV INEI (por bloques)
+    chunks = pd.read_csv(RAW_PATH, encoding="latin1", chunksize=CHUNK_SIZE)
+    process_security(chunks)
 
-# 6. Guardar resultado
-security.to_csv(
-    "data/processed/security_by_district.csv",
-    index=False,
-    encoding="utf-8-sig"
-)
 
-print("✅ Seguridad INEI procesada correctamente")
-print("📊 Distritos únicos:", security.shape[0])
-print(security.sort_values("crime_count", ascending=False).head())
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,227 @@
+"""
+MODO MUESTRA (--sample) - vista previa rápida con márgenes de error
+
+Para ajustar pesos o reglas de limpieza sin correr todo:
+
+1. Muestra estratificada por distrito (ciudad + distrito de `location`).
+   Es reproducible: dentro de cada estrato se eligen las urls con menor
+   hash(url, semilla), así que la misma semilla da la misma muestra, y
+   una propiedad sigue en la muestra aunque el dataset crezca.
+2. Se corre el pipeline de Lima (validación → limpieza → scoring) solo
+   sobre la muestra, sin escribir las salidas publicadas. cost_score se
+   normaliza con el precio/m² máximo de la última corrida completa, así
+   los scores son comparables.
+3. Estadísticas por distrito con intervalos de confianza (t de Student con
+   corrección por población finita) y estimación estratificada global.
+4. Diferencias del top-N (propiedades y distritos) contra la última
+   corrida completa (data/processed/scored_properties.csv).
+
+Uso (desde la raíz del repo):
+    python scripts/data_processor_final.py --sample 0.2 [--seed 42] [--top 10]
+"""
+
+import json
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from scripts import data_processor_final as dp
+from scripts.districts import fold_name
+from scripts.exporters import atomic_writer
+from scripts.partitions import LIMA, parse_location
+from scripts.validation import validate_listings
+
+SAMPLE_REPORT = "data/processed/sample_report.json"
+CONFIDENCE = 0.95
+MIN_PER_STRATUM = 2
+
+
+def stratum_keys(df):
+    """'lima/MIRAFLORES' por fila (df ya pasó por parse_location)"""
+    districts = df["location_district"].map(fold_name, na_action="ignore").fillna("")
+    return df["city"].astype(str) + "/" + districts
+
+
+def stratified_sample(df, fraction, seed=42, min_per_stratum=MIN_PER_STRATUM):
+    """
+    Retorna (muestra, tamaño poblacional por estrato).
+    Cada estrato aporta ceil(fraction × N_h) filas (al menos min_per_stratum, sin pasar de N_h).
+    """
+    if not 0 < fraction <= 1:
+        raise ValueError(f"--sample debe estar en (0, 1]: {fraction}")
+
+    keys = stratum_keys(df)
+    population = keys.value_counts()
+    take = np.minimum(np.maximum(np.ceil(fraction * population), min_per_stratum), population)
+
+    hash_key = f"{seed:016d}"[-16:]
+    order = pd.Series(
+        pd.util.hash_array(df["url"].astype(str).to_numpy(), hash_key=hash_key), index=df.index
+    )
+    rank = order.groupby(keys).rank(method="first")
+    sample = df[rank <= keys.map(take)].copy()
+    sample["stratum"] = keys[sample.index]
+    return sample, population
+
+
+def _mean_ci(values, population_size):
+    """(media, semiancho del IC) con corrección por población finita"""
+    values = values.dropna()
+    n = len(values)
+    if n == 0:
+        return np.nan, np.nan
+    if n < 2:
+        return values.mean(), np.nan
+    fpc = max(0.0, 1 - n / population_size)
+    half = stats.t.ppf((1 + CONFIDENCE) / 2, n - 1) * values.std(ddof=1) / np.sqrt(n) * np.sqrt(fpc)
+    return values.mean(), half
+
+
+def district_estimates(scored, population):
+    """Media e IC de precio y final_score por distrito"""
+    rows = []
+    for district, group in scored.groupby("district", sort=True):
+        # Un distrito canónico puede venir de más de un estrato de texto
+        size = int(population.reindex(group["stratum"].unique()).fillna(len(group)).sum())
+        price, price_ci = _mean_ci(group["price_clean"], size)
+        score, score_ci = _mean_ci(group["final_score"], size)
+        rows.append({
+            "district": district, "n": len(group), "N": size,
+            "price_mean": price, "price_ci": price_ci,
+            "score_mean": score, "score_ci": score_ci,
+        })
+    return pd.DataFrame(rows).sort_values("score_mean", ascending=False).reset_index(drop=True)
+
+
+def overall_estimate(estimates):
+    """Media estratificada de final_score (pesos N_h) con IC normal"""
+    known = estimates.dropna(subset=["score_mean"])
+    weights = known["N"] / known["N"].sum()
+    mean = float((weights * known["score_mean"]).sum())
+    # score_ci = t·se  →  se ≈ score_ci / t (estratos con n < 2 no aportan varianza)
+    t = stats.t.ppf((1 + CONFIDENCE) / 2, np.maximum(known["n"] - 1, 1))
+    se = (known["score_ci"] / t).fillna(0.0)
+    z = stats.norm.ppf((1 + CONFIDENCE) / 2)
+    return mean, float(z * np.sqrt((weights ** 2 * se ** 2).sum()))
+
+
+def compare_with_full(scored, full, top_n):
+    """Top-N de la muestra contra el ranking de la última corrida completa"""
+    merged = scored[["url", "district", "price_clean", "final_score"]].merge(
+        full[["url", "final_score"]], on="url", how="inner", suffixes=("", "_full")
+    )
+    if merged.empty:
+        return None
+
+    merged["rank"] = merged["final_score"].rank(ascending=False, method="first").astype(int)
+    merged["rank_full"] = merged["final_score_full"].rank(ascending=False, method="first").astype(int)
+    merged["delta"] = merged["final_score"] - merged["final_score_full"]
+
+    top_new = merged[merged["rank"] <= top_n].sort_values("rank")
+    top_old = merged[merged["rank_full"] <= top_n]
+
+    districts_new = scored.groupby("district")["final_score"].mean().rank(ascending=False, method="first")
+    districts_old = full.groupby("district")["final_score"].mean().rank(ascending=False, method="first")
+    district_top = pd.DataFrame({"rank": districts_new, "rank_full": districts_old.reindex(districts_new.index)})
+    district_top = district_top[district_top["rank"] <= top_n].sort_values("rank")
+
+    return {
+        "compared": len(merged),
+        "spearman": float(merged["final_score"].corr(merged["final_score_full"], method="spearman")),
+        "mean_abs_delta": float(merged["delta"].abs().mean()),
+        "top": top_new,
+        "entered": sorted(set(top_new["url"]) - set(top_old["url"])),
+        "left": sorted(set(top_old["url"]) - set(top_new["url"])),
+        "district_top": district_top,
+        "district_overlap": int((district_top["rank_full"] <= top_n).sum()),
+    }
+
+
+def print_sample_report(estimates, overall, comparison, top_n, seconds):
+    print(f"\n🏙️  DISTRITOS (muestra, IC {CONFIDENCE:.0%}):")
+    for _, row in estimates.iterrows():
+        ci = "" if np.isnan(row["score_ci"]) else f" ± {row['score_ci']:.2f}"
+        price_ci = "" if np.isnan(row["price_ci"]) else f" ± {row['price_ci']:.0f}"
+        print(f"   • {row['district']:<25} n={row['n']:>3}/{row['N']:<4} "
+              f"Score {row['score_mean']:.2f}{ci} | Precio S/. {row['price_mean']:.0f}{price_ci}")
+
+    mean, half = overall
+    print(f"\n📈 Score promedio estimado: {mean:.2f} ± {half:.2f}")
+
+    if comparison is None:
+        print("\nℹ️  Sin corrida completa previa para comparar el top-N")
+    else:
+        print(f"\n🔀 CONTRA LA ÚLTIMA CORRIDA COMPLETA ({comparison['compared']} propiedades en común):")
+        print(f"   • Correlación de rangos (Spearman): {comparison['spearman']:.3f}")
+        print(f"   • Cambio medio de score: {comparison['mean_abs_delta']:.3f}")
+        print(f"   • Top {top_n} propiedades: entran {len(comparison['entered'])}, salen {len(comparison['left'])}")
+        for _, row in comparison["top"].iterrows():
+            move = int(row["rank_full"] - row["rank"])
+            arrow = "=" if move == 0 else (f"↑{move}" if move > 0 else f"↓{-move}")
+            print(f"     {row['rank']:>2}. {row['district']:<22} {row['final_score']:.2f} "
+                  f"(antes #{row['rank_full']}, {arrow})")
+        print(f"   • Top {top_n} distritos: {comparison['district_overlap']}/{len(comparison['district_top'])} "
+              f"también estaban en el top de la corrida completa")
+
+    print(f"\n⏱️  Muestra procesada en {seconds:.2f}s (no se publicó nada)")
+
+
+def write_sample_report(meta, estimates, overall, comparison, path=SAMPLE_REPORT):
+    report = {
+        **meta,
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "confidence": CONFIDENCE,
+        "overall_score": {"mean": overall[0], "ci": overall[1]},
+        "districts": json.loads(estimates.to_json(orient="records")),
+    }
+    if comparison is not None:
+        report["comparison"] = {
+            "compared": comparison["compared"],
+            "spearman": comparison["spearman"],
+            "mean_abs_delta": comparison["mean_abs_delta"],
+            "entered": comparison["entered"],
+            "left": comparison["left"],
+            "top": json.loads(comparison["top"].to_json(orient="records")),
+        }
+    with atomic_writer(path) as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def run_sample(fraction, seed=42, top_n=10, dataset_path=dp.DATASET_PATH, full_path=dp.OUTPUT_CSV):
+    """Pipeline de Lima sobre una muestra estratificada; reporte sin publicar salidas"""
+    start = time.perf_counter()
+
+    df = parse_location(dp.load_listings(dataset_path))
+    sample, population = stratified_sample(df, fraction, seed)
+    print(f"🎲 Muestra estratificada: {len(sample)}/{len(df)} filas "
+          f"({fraction:.0%}, semilla {seed}, {population.size} estratos)")
+
+    valid, quarantine, _ = validate_listings(sample)
+    print(f"🔎 Validación: {len(valid)} válidas, {len(quarantine)} en cuarentena (no se escribe)")
+    lima = valid[valid["city"] == LIMA].drop(columns=["city"])
+
+    full = pd.read_csv(full_path) if os.path.exists(full_path) else None
+    reference = None
+    if full is not None:
+        valid_full = full[full["price_clean"].notna() & (full["area_clean"] > 0)]
+        reference = (valid_full["price_clean"] / valid_full["area_clean"]).max()
+
+    cleaned = dp.clean_listings(lima)
+    _, scored = dp.score_listings(cleaned, dp.load_security_scores(), max_price_m2=reference)
+
+    estimates = district_estimates(scored, population)
+    overall = overall_estimate(estimates)
+    comparison = compare_with_full(scored, full, top_n) if full is not None else None
+
+    seconds = time.perf_counter() - start
+    print_sample_report(estimates, overall, comparison, top_n, seconds)
+    write_sample_report(
+        {"fraction": fraction, "seed": seed, "rows": len(sample), "population": len(df), "top_n": top_n},
+        estimates, overall, comparison,
+    )
+    print(f"📝 Reporte: {SAMPLE_REPORT}")
+    return estimates, comparison
@@ -93,6 +93,7 @@ class CurrencyAPI:
         usd_count = 0
         pen_count = 0
         total_converted = 0
+        unparsed = []  # (índice, precio original) que no se pudieron convertir
         
         # Crear nuevas columnas
         df['price_clean'] = None
@@ -123,14 +124,19 @@ class CurrencyAPI:
                         df.at[idx, 'price_clean'] = value
                         df.at[idx, 'price_currency'] = 'PEN'
                         pen_count += 1
+                else:
+                    unparsed.append((idx, row['price']))
                         
-            except Exception as e:
-                continue
+            except ValueError:
+                unparsed.append((idx, row['price']))
         
         # Estadísticas
         print(f"\n📊 ESTADÍSTICAS DE CONVERSIÓN:")
         print(f"   • Propiedades en USD: {usd_count}")
         print(f"   • Propiedades en PEN: {pen_count}")
+        print(f"   • Precios no convertibles: {len(unparsed)}")
+        for idx, price in unparsed[:5]:
+            print(f"     ⚠️  fila {idx}: {price!r}")
         print(f"   • Total USD convertido: ${total_converted:.2f}")
         print(f"   • Tipo de cambio usado: {exchange_rate}")
         print(f"   • Fecha de consulta: {datetime.now().strftime('%Y-%m-%d %H:%M')}")
@@ -0,0 +1,296 @@
+"""
+DESCARGADOR INEI - Extracto de denuncias por delitos
+Descarga reanudable (HTTP Range) con verificación SHA-256 y descompresión
+en streaming. Las filas pueden ir directo a la agregación de
+process_security.py (--aggregate), sin que el CSV nacional se escriba
+descomprimido en disco. Es una entrada independiente: la etapa `security`
+del pipeline sigue leyendo data/raw/security_raw.csv.
+
+Uso (desde la raíz del repo):
+    python scripts/scraping/inei_api_dowloader.py <url> [--sha256 HEX] [--aggregate]
+La URL también puede venir de la variable de entorno INEI_SECURITY_URL.
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import os
+import sys
+import zipfile
+
+import requests
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from scripts.process_security import CHUNK_SIZE, OUTPUT_PATH, process_security
+
+DOWNLOAD_DIR = "data/raw"
+BLOCK_SIZE = 1024 * 1024  # 1 MB por lectura de red
+
+
+class ChecksumError(Exception):
+    """El archivo descargado no coincide con el SHA-256 esperado"""
+
+
+def _archive_name(url):
+    name = os.path.basename(url.split("?", 1)[0])
+    return name or "security_raw.csv.gz"
+
+
+class ResumableDownload(io.RawIOBase):
+    """
+    Fuente de bytes reanudable y de solo lectura.
+
+    Si existe `<dest>.part` (descarga previa interrumpida) pide el resto
+    con Range + If-Range (ETag o Last-Modified guardado en
+    `<dest>.part.validator`). Con 206 entrega primero lo que ya estaba en
+    disco y luego continúa desde la red; si el archivo cambió en el
+    servidor (200), descarta el `.part` y empieza de cero antes de
+    entregar un solo byte. Cada bloque nuevo se agrega al `.part` y al
+    hash; al final verifica el SHA-256 y renombra `.part` → `dest`.
+    """
+
+    def __init__(self, url, dest, expected_sha256=None, timeout=30):
+        self.url = url
+        self.dest = dest
+        self.part_path = dest + ".part"
+        self.validator_path = self.part_path + ".validator"
+        self.expected_sha256 = expected_sha256.lower() if expected_sha256 else None
+        self.timeout = timeout
+        self.hasher = hashlib.sha256()
+        self.bytes_total = 0
+        self.resumed_from = 0
+
+        self._local = None
+        self._local_left = 0
+        self._response = None
+        self._remote = None
+        self._sink = None
+        self._finished = False
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._read_block(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        return n
+
+    def _read_block(self, size):
+        if self._remote is None:
+            if self._finished:
+                return b""
+            self._open_remote()
+
+        # 1. Bytes ya descargados en un intento anterior (validados con If-Range)
+        if self._local is not None:
+            data = self._local.read(min(size, self._local_left))
+            if data:
+                self._local_left -= len(data)
+                self.hasher.update(data)
+                self.bytes_total += len(data)
+                return data
+            self._local.close()
+            self._local = None
+
+        # 2. Resto desde la red
+        data = self._remote.read(size)
+        if data:
+            self._sink.write(data)
+            self.hasher.update(data)
+            self.bytes_total += len(data)
+            return data
+
+        self._finish()
+        return b""
+
+    def _load_validator(self):
+        if not os.path.exists(self.validator_path):
+            return None
+        with open(self.validator_path, encoding="utf-8") as f:
+            return f.read().strip() or None
+
+    def _save_validator(self, headers):
+        # If-Range solo acepta ETag fuerte o fecha
+        etag = headers.get("ETag")
+        validator = etag if etag and not etag.startswith("W/") else headers.get("Last-Modified")
+        if validator:
+            with open(self.validator_path, "w", encoding="utf-8") as f:
+                f.write(validator)
+        elif os.path.exists(self.validator_path):
+            os.remove(self.validator_path)
+
+    def _open_remote(self):
+        offset = os.path.getsize(self.part_path) if os.path.exists(self.part_path) else 0
+        headers = {}
+        if offset > 0:
+            headers["Range"] = f"bytes={offset}-"
+            validator = self._load_validator()
+            if validator:
+                headers["If-Range"] = validator
+
+        response = requests.get(self.url, headers=headers, stream=True, timeout=self.timeout)
+
+        if response.status_code == 416:
+            # El .part ya está completo
+            response.close()
+            self._remote = io.BytesIO(b"")
+        else:
+            response.raise_for_status()
+            if offset > 0 and response.status_code != 206:
+                # Cambió en el servidor (If-Range no coincide) o no hay soporte de Range
+                print(f"   ⚠️  El servidor envió el archivo completo; se descarta {self.part_path}")
+                os.remove(self.part_path)
+                offset = 0
+            if offset == 0:
+                self._save_validator(response.headers)
+            # Leer bytes crudos (sin que requests descomprima Content-Encoding)
+            response.raw.decode_content = False
+            self._response = response
+            self._remote = response.raw
+
+        if offset > 0:
+            print(f"   ↪️  Reanudando desde el byte {offset}")
+            self.resumed_from = offset
+            self._local = open(self.part_path, "rb")
+            self._local_left = offset
+        self._sink = open(self.part_path, "ab")
+
+    def _finish(self):
+        self._finished = True
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+        if self._response is not None:
+            self._response.close()
+        self._remote = None
+        if os.path.exists(self.validator_path):
+            os.remove(self.validator_path)
+
+        digest = self.hasher.hexdigest()
+        if self.expected_sha256 and digest != self.expected_sha256:
+            os.remove(self.part_path)
+            raise ChecksumError(
+                f"SHA-256 no coincide para {self.url}: "
+                f"esperado {self.expected_sha256}, obtenido {digest}"
+            )
+        os.replace(self.part_path, self.dest)
+        print(f"✅ Descarga completa: {self.dest} ({self.bytes_total} bytes, sha256 {digest[:12]}…)")
+
+    def close(self):
+        if self._local is not None:
+            self._local.close()
+            self._local = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+        if self._response is not None:
+            self._response.close()
+        super().close()
+
+
+def _file_sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _reusable(dest, expected_sha256=None):
+    """
+    True si `dest` ya está descargado por completo y (con checksum) coincide.
+    Un archivo que no coincide (corrupto o extracto nuevo en la misma URL)
+    se borra para descargarlo de nuevo.
+    """
+    if not os.path.exists(dest) or os.path.exists(dest + ".part"):
+        return False
+    if expected_sha256 and _file_sha256(dest) != expected_sha256.lower():
+        print(f"⚠️  {dest} no coincide con el SHA-256 esperado; se descarga de nuevo")
+        os.remove(dest)
+        return False
+    return True
+
+
+def download(url, dest_dir=DOWNLOAD_DIR, expected_sha256=None):
+    """Descarga (reanudable) el archivo comprimido a disco y retorna su ruta"""
+    os.makedirs(dest_dir, exist_ok=True)
+    dest = os.path.join(dest_dir, _archive_name(url))
+
+    if _reusable(dest, expected_sha256):
+        print(f"📦 Ya descargado: {dest}")
+        return dest
+
+    print(f"📥 Descargando {url}")
+    with ResumableDownload(url, dest, expected_sha256) as source:
+        while source.read(BLOCK_SIZE):
+            pass
+    return dest
+
+
+def iter_security_rows(url, dest_dir=DOWNLOAD_DIR, expected_sha256=None,
+                       encoding="latin1", chunksize=CHUNK_SIZE):
+    """
+    Entrega DataFrames de `chunksize` filas mientras se descarga el archivo.
+
+    - .gz / .csv: se descomprime al vuelo sobre el flujo de red, guardando
+      en disco solo el archivo comprimido (reanudable).
+    - .zip: el directorio central está al final, así que se descarga
+      completo (reanudable) y luego se lee el CSV del zip en streaming.
+    """
+    os.makedirs(dest_dir, exist_ok=True)
+    dest = os.path.join(dest_dir, _archive_name(url))
+
+    if dest.endswith(".zip"):
+        download(url, dest_dir, expected_sha256)
+        with zipfile.ZipFile(dest) as archive:
+            member = next(n for n in archive.namelist() if n.lower().endswith(".csv"))
+            with archive.open(member) as raw:
+                text = io.TextIOWrapper(raw, encoding=encoding)
+                yield from pd.read_csv(text, chunksize=chunksize)
+        return
+
+    if _reusable(dest, expected_sha256):
+        source = open(dest, "rb")
+    else:
+        print(f"📥 Descargando y procesando en streaming: {url}")
+        source = ResumableDownload(url, dest, expected_sha256)
+
+    with source:
+        stream = io.BufferedReader(source, BLOCK_SIZE)
+        if dest.endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=stream)
+        text = io.TextIOWrapper(stream, encoding=encoding)
+        yield from pd.read_csv(text, chunksize=chunksize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Descarga el extracto de delitos INEI")
+    parser.add_argument("url", nargs="?", default=os.getenv("INEI_SECURITY_URL"))
+    parser.add_argument("--sha256", default=os.getenv("INEI_SECURITY_SHA256"),
+                        help="checksum esperado del archivo comprimido")
+    parser.add_argument("--dest-dir", default=DOWNLOAD_DIR)
+    parser.add_argument("--aggregate", action="store_true",
+                        help="enviar las filas directo a process_security")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    if not args.url:
+        parser.error("falta la URL (argumento o INEI_SECURITY_URL)")
+
+    print("=" * 60)
+    print("🚓 DESCARGADOR INEI - DELITOS POR DISTRITO")
+    print("=" * 60)
+
+    if args.aggregate:
+        rows = iter_security_rows(args.url, args.dest_dir, args.sha256)
+        process_security(rows, args.output)
+    else:
+        download(args.url, args.dest_dir, args.sha256)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+ÍNDICE DE SIMILITUD - "Propiedades similares"
+
+KD-tree (scipy.spatial.cKDTree) sobre las características normalizadas
+de cada propiedad puntuada: precio por m², área, dormitorios, baños, los
+scores por componente y, si existen, las coordenadas. Responde
+"top-K más parecidas a la propiedad X" y "top-K cerca de este vector"
+sin recorrer la lista completa, y precalcula en lote las listas de
+vecinos que usa el dashboard.
+
+Uso (desde la raíz del repo, después de data_processor_final.py):
+    python scripts/similarity.py [--k 5]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.exporters import atomic_writer
+
+SCORED_PATH = "data/processed/scored_properties.csv"
+INDEX_PATH = "data/processed/similarity_index.npz"
+NEIGHBORS_JSON = "web/data/similar_listings.json"
+
+# característica → peso (después de normalizar a z-score)
+FEATURE_WEIGHTS = {
+    "price_per_m2": 1.5,
+    "area_clean": 1.0,
+    "bedroom_clean": 1.0,
+    "bathroom_clean": 0.75,
+    "cost_score": 0.5,
+    "safety_score": 0.75,
+    "services_score": 0.5,
+}
+COORD_COLUMNS = ("lat", "lon")
+COORD_WEIGHT = 1.5
+
+
+def feature_matrix(df):
+    """DataFrame puntuado → (matriz float, nombres de columnas, pesos)"""
+    features = pd.DataFrame(index=df.index)
+    features["price_per_m2"] = df["price_clean"] / df["area_clean"]
+    for column in FEATURE_WEIGHTS:
+        if column != "price_per_m2":
+            features[column] = df[column]
+
+    # Faltantes → mediana de la columna (un valor típico; no es neutro: el z-score centra en la media)
+    features = features.astype(float)
+    features = features.fillna(features.median())
+
+    weights = dict(FEATURE_WEIGHTS)
+    if all(c in df.columns for c in COORD_COLUMNS) and df[list(COORD_COLUMNS)].notna().any().all():
+        # Las coordenadas faltantes quedan en NaN: esas filas no usan la ubicación
+        for column in COORD_COLUMNS:
+            features[column] = pd.to_numeric(df[column], errors="coerce")
+            weights[column] = COORD_WEIGHT
+
+    return features.to_numpy(), list(features.columns), np.array([weights[c] for c in features.columns])
+
+
+class SimilarityIndex:
+    """
+    Filas con coordenadas: distancia con todas las características.
+    Consulta sin coordenadas: solo características base contra todas las filas.
+    Consulta con coordenadas: contra las filas con coordenadas, distancia
+    completa; contra las que no tienen, distancia base más una penalización
+    fija de ubicación (la distancia esperada entre dos puntos al azar en las
+    dimensiones lat/lon normalizadas), así los dos grupos de candidatos se
+    comparan en la misma métrica y las propiedades sin ubicación no parecen
+    más cercanas solo por no tenerla.
+    Para eso hay un árbol completo sobre las filas con coordenadas y dos
+    sin ubicación (todas las filas / solo las que no tienen coordenadas).
+    """
+
+    def __init__(self, features, columns, weights, mean, std, urls):
+        self.columns = list(columns)
+        self.weights = np.asarray(weights, dtype=float)
+        self.mean = np.asarray(mean, dtype=float)
+        self.std = np.asarray(std, dtype=float)
+        self.urls = np.asarray(urls, dtype=object)
+        self.features = np.asarray(features, dtype=float)
+        self.points = self._transform(self.features)
+        self._position = {url: i for i, url in enumerate(self.urls)}
+
+        coord_dims = [i for i, c in enumerate(self.columns) if c in COORD_COLUMNS]
+        # z-score → E[(a - b)²] = 2 por dimensión, escalado por el peso²
+        self.location_penalty = float(np.sqrt(2 * np.sum(self.weights[coord_dims] ** 2)))
+        self.base_dims = [i for i, c in enumerate(self.columns) if c not in COORD_COLUMNS]
+        self.located = np.isfinite(self.points[:, coord_dims]).all(axis=1) if coord_dims \
+            else np.zeros(len(self.urls), dtype=bool)
+        self.located_rows = np.flatnonzero(self.located)
+        self.unlocated_rows = np.flatnonzero(~self.located)
+
+        base = self.points[:, self.base_dims]
+        self.base_tree = cKDTree(base)
+        self.located_tree = cKDTree(self.points[self.located_rows]) if len(self.located_rows) else None
+        self.unlocated_tree = cKDTree(base[self.unlocated_rows]) if len(self.unlocated_rows) else None
+
+    @classmethod
+    def from_scored(cls, df):
+        """Construye el índice con las propiedades que tienen precio y área válidos (una fila por url)"""
+        valid = df[df["price_clean"].notna() & df["area_clean"].notna() & (df["area_clean"] > 0)]
+        valid = valid[valid["url"].notna()].drop_duplicates("url", keep="first")
+        features, columns, weights = feature_matrix(valid)
+        mean = np.nanmean(features, axis=0)
+        std = np.nanstd(features, axis=0)
+        std[~(std > 0)] = 1.0
+        return cls(features, columns, weights, mean, std, valid["url"].to_numpy())
+
+    def _transform(self, features):
+        return (features - self.mean) / self.std * self.weights
+
+    def save(self, path=INDEX_PATH):
+        np.savez_compressed(
+            path, features=self.features, columns=np.array(self.columns),
+            weights=self.weights, mean=self.mean, std=self.std,
+            urls=self.urls.astype(str),
+        )
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path) as data:
+            return cls(data["features"], data["columns"].tolist(), data["weights"],
+                       data["mean"], data["std"], data["urls"])
+
+    @staticmethod
+    def _tree_query(tree, points, k, rows=None):
+        """cKDTree.query con salida siempre 2D y posiciones traducidas a filas del índice"""
+        k = min(k, tree.n)
+        distances, positions = tree.query(points, k=k)
+        distances = np.asarray(distances).reshape(len(points), k)
+        positions = np.asarray(positions).reshape(len(points), k)
+        return distances, (positions if rows is None else rows[positions])
+
+    def _query(self, points, located, k):
+        """K vecinos por punto (matriz ya transformada); `located` indica qué puntos usan ubicación"""
+        k = min(k, len(self.urls))
+        distances = np.full((len(points), k), np.inf)
+        positions = np.full((len(points), k), -1, dtype=np.int64)
+
+        # Consulta sin ubicación: solo características base contra todas las filas
+        free = ~located
+        if free.any():
+            distances[free], positions[free] = self._tree_query(self.base_tree, points[free][:, self.base_dims], k)
+
+        # Consulta con ubicación: completa contra filas con coordenadas, base contra el resto
+        if located.any() and self.located_tree is not None:
+            parts = [self._tree_query(self.located_tree, points[located], k, self.located_rows)]
+            if self.unlocated_tree is not None:
+                d, p = self._tree_query(self.unlocated_tree, points[located][:, self.base_dims], k, self.unlocated_rows)
+                parts.append((np.sqrt(d ** 2 + self.location_penalty ** 2), p))
+            d = np.hstack([part[0] for part in parts])
+            p = np.hstack([part[1] for part in parts])
+            order = np.argsort(d, axis=1, kind="stable")[:, :k]
+            distances[located] = np.take_along_axis(d, order, axis=1)
+            positions[located] = np.take_along_axis(p, order, axis=1)
+        return distances, positions
+
+    def similar_to(self, url, k=5):
+        """Top-K propiedades más parecidas a `url` (sin incluirla). Lista de (url, distancia)."""
+        i = self._position[url]
+        distances, positions = self._query(self.points[i:i + 1], self.located[i:i + 1], k + 1)
+        return [
+            (self.urls[j], float(d))
+            for d, j in zip(distances[0], positions[0])
+            if j != i and j >= 0
+        ][:k]
+
+    def nearest(self, vector, k=5):
+        """
+        Top-K cerca de un vector de características.
+        `vector` es un dict columna → valor; las columnas omitidas toman la
+        media (sin lat/lon la ubicación no cuenta).
+        """
+        raw = np.array([vector.get(c, m) for c, m in zip(self.columns, self.mean)], dtype=float)
+        located = np.array([all(vector.get(c) is not None for c in COORD_COLUMNS)])
+        distances, positions = self._query(self._transform(raw)[None, :], located, k)
+        return [(self.urls[j], float(d)) for d, j in zip(distances[0], positions[0]) if j >= 0]
+
+    def batch_neighbors(self, k=5):
+        """Vecinos de todas las propiedades en una consulta por árbol"""
+        k = min(k + 1, len(self.urls))
+        distances, positions = self._query(self.points, self.located, k)
+
+        neighbors = {}
+        for i, url in enumerate(self.urls):
+            keep = (positions[i] != i) & (positions[i] >= 0)
+            neighbors[url] = [
+                {"url": self.urls[j], "distance": round(float(d), 3)}
+                for j, d in zip(positions[i][keep][:k - 1], distances[i][keep][:k - 1])
+            ]
+        return neighbors
+
+
+def build_similarity(scored_path=SCORED_PATH, k=5):
+    """Etapa completa: índice + listas de vecinos para el dashboard"""
+    df = pd.read_csv(scored_path)
+    index = SimilarityIndex.from_scored(df)
+    index.save()
+
+    neighbors = index.batch_neighbors(k)
+    with atomic_writer(NEIGHBORS_JSON) as f:
+        json.dump(neighbors, f, ensure_ascii=False, separators=(",", ":"))
+
+    print(f"✅ Índice de similitud: {len(index.urls)} propiedades × {len(index.columns)} características")
+    print(f"   Características: {index.columns}")
+    print(f"✅ Vecinos ({k} por propiedad) guardados: {NEIGHBORS_JSON}")
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Construye el índice de propiedades similares")
+    parser.add_argument("--k", type=int, default=5, help="vecinos por propiedad")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("🔗 LIMA HOUSING ANALYTICS - PROPIEDADES SIMILARES")
+    print("=" * 60)
+    build_similarity(k=args.k)
+
+
+if __name__ == "__main__":
+    main()
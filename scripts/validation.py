@@ -0,0 +1,227 @@
+"""
+VALIDACIÓN Y CUARENTENA de propiedades crudas
+
+Revisa formato y rango de precio, área, dormitorios, baños, año y
+ubicación con máscaras vectorizadas (sin bucles por fila). Las filas con
+errores salen del pipeline y se escriben con sus códigos de motivo en un
+archivo de cuarentena; las advertencias solo se cuentan. Al final se
+reportan los conteos por regla.
+
+Los parsers vectorizados (parse_price, parse_number, parse_count) son los
+mismos que usa clean_listings, así que lo que se valida es exactamente lo
+que se puntúa.
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+QUARANTINE_PATH = "data/processed/quarantine_listings.csv"
+REPORT_PATH = "data/processed/validation_report.json"
+
+USD_TO_PEN = 3.7  # tipo de cambio (único lugar donde se define)
+
+PRICE_RANGE = (50, 500_000)      # S/ por mes
+AREA_RANGE = (10, 20_000)        # m²
+ROOMS_RANGE = (0, 30)
+YEAR_RANGE = (1900, datetime.now().year + 5)
+
+ERROR = "error"
+WARNING = "warning"
+
+# código → (severidad, descripción)
+RULES = {
+    "PRICE_ON_REQUEST": (WARNING, "precio sin número (p.ej. 'Consultar')"),
+    "PRICE_OUT_OF_RANGE": (ERROR, f"precio fuera de {PRICE_RANGE} soles"),
+    "AREA_MISSING": (WARNING, "sin área"),
+    "AREA_UNPARSEABLE": (ERROR, "área sin número"),
+    "AREA_OUT_OF_RANGE": (ERROR, f"área fuera de {AREA_RANGE} m²"),
+    "BEDROOM_MISSING": (WARNING, "sin dormitorios (se asume 1)"),
+    "BEDROOM_UNPARSEABLE": (ERROR, "dormitorios sin número"),
+    "BEDROOM_OUT_OF_RANGE": (ERROR, f"dormitorios fuera de {ROOMS_RANGE}"),
+    "BATHROOM_MISSING": (WARNING, "sin baños (se asume 1)"),
+    "BATHROOM_UNPARSEABLE": (ERROR, "baños sin número"),
+    "BATHROOM_OUT_OF_RANGE": (ERROR, f"baños fuera de {ROOMS_RANGE}"),
+    "YEAR_MISSING": (WARNING, "sin año de construcción"),
+    "YEAR_UNPARSEABLE": (ERROR, "año de construcción no numérico"),
+    "YEAR_OUT_OF_RANGE": (ERROR, f"año fuera de {YEAR_RANGE}"),
+    "LOCATION_MISSING": (ERROR, "sin ubicación"),
+    "LOCATION_FORMAT": (ERROR, "ubicación sin partes separadas por coma"),
+}
+
+_NUMBER = r'(\d+\.?\d*)'
+
+
+def _per_unique(series, func, na_value):
+    """
+    Aplica `func` (vectorizada) solo a los valores distintos y expande el
+    resultado con los códigos de pd.factorize. Los campos de avisos se
+    repiten mucho ('2 dormitorios', 'USD1,200'), así que esto reduce el
+    trabajo de texto a una fracción de las filas.
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = np.asarray(func(pd.Series(uniques, dtype="string")))
+    values = np.append(values, np.asarray([na_value], dtype=values.dtype))
+    # el sentinel -1 (NaN) cae en la última posición
+    return pd.Series(values[codes], index=series.index)
+
+
+def _number(text):
+    text = text.str.replace(",", "", regex=False)
+    return pd.to_numeric(text.str.extract(_NUMBER, expand=False), errors="coerce").astype(float)
+
+
+def parse_number(series):
+    """'1,200 m²' → 1200.0 ; sin número → NaN (vectorizado)"""
+    return _per_unique(series, _number, np.nan)
+
+
+def parse_price(series, usd_rate=USD_TO_PEN):
+    """Precio en soles; 'USD' se convierte con usd_rate (vectorizado)"""
+    def price(text):
+        value = _number(text)
+        is_usd = text.str.upper().str.contains("USD", regex=False).fillna(False).astype(bool)
+        return value.where(~is_usd, value * usd_rate)
+
+    return _per_unique(series, price, np.nan)
+
+
+def parse_count(series, default=1):
+    """'2 dormitorios' → 2 ; vacío o sin número → default (ver BEDROOM_MISSING/BATHROOM_MISSING)"""
+    def count(text):
+        number = pd.to_numeric(text.str.extract(r'(\d+)', expand=False), errors="coerce")
+        return number.astype(float).fillna(default).astype(int)
+
+    return _per_unique(series, count, default)
+
+
+def _out_of_range(values, bounds):
+    low, high = bounds
+    return values.notna() & ((values < low) | (values > high))
+
+
+def _rule_masks(df):
+    """código → máscara booleana de filas que incumplen la regla"""
+    masks = {}
+
+    def present(column):
+        if column not in df.columns:
+            return pd.Series(False, index=df.index)
+        return _per_unique(
+            df[column], lambda text: (text.str.strip() != "").fillna(False).astype(bool), False
+        )
+
+    def digits(column):
+        return _per_unique(
+            df[column], lambda text: text.str.contains(r'\d', regex=True).fillna(False).astype(bool), False
+        )
+
+    # Precio
+    price = parse_price(df["price"])
+    masks["PRICE_ON_REQUEST"] = price.isna()
+    masks["PRICE_OUT_OF_RANGE"] = _out_of_range(price, PRICE_RANGE)
+
+    # Área
+    has_area = present("area")
+    area = parse_number(df["area"])
+    masks["AREA_MISSING"] = ~has_area
+    masks["AREA_UNPARSEABLE"] = has_area & area.isna()
+    masks["AREA_OUT_OF_RANGE"] = _out_of_range(area, AREA_RANGE)
+
+    # Dormitorios y baños
+    for column, prefix in (("bedroom", "BEDROOM"), ("bathroom", "BATHROOM")):
+        has_value = present(column)
+        count = parse_number(df[column])
+        masks[f"{prefix}_MISSING"] = ~has_value
+        masks[f"{prefix}_UNPARSEABLE"] = has_value & ~digits(column)
+        masks[f"{prefix}_OUT_OF_RANGE"] = _out_of_range(count, ROOMS_RANGE)
+
+    # Año de construcción
+    has_year = present("year_contruction")
+    year = pd.to_numeric(df["year_contruction"], errors="coerce") if "year_contruction" in df.columns \
+        else pd.Series(np.nan, index=df.index)
+    masks["YEAR_MISSING"] = ~has_year
+    masks["YEAR_UNPARSEABLE"] = has_year & year.isna()
+    masks["YEAR_OUT_OF_RANGE"] = _out_of_range(year, YEAR_RANGE)
+
+    # Ubicación: al menos "zona, ciudad"
+    has_location = present("location")
+    masks["LOCATION_MISSING"] = ~has_location
+    masks["LOCATION_FORMAT"] = has_location & ~_per_unique(
+        df["location"],
+        lambda text: text.str.contains(r'[^,]+,[^,]+', regex=True).fillna(False).astype(bool),
+        False,
+    )
+
+    return masks
+
+
+def rule_flags(df):
+    """DataFrame booleano (fila × código de regla) con el mismo índice que df"""
+    return pd.DataFrame(_rule_masks(df), index=df.index)
+
+
+def split_by_flags(df, flags):
+    """(filas válidas, filas en cuarentena con columna `reasons`) según los flags de error"""
+    error_codes = [code for code, (severity, _) in RULES.items() if severity == ERROR]
+    errors = flags[error_codes].to_numpy(dtype=bool)
+    failed = errors.any(axis=1)
+
+    quarantine = df[failed].copy()
+    if len(quarantine):
+        # Motivos solo para las filas que fallan (matriz booleana pequeña)
+        codes = np.array(error_codes)
+        quarantine["reasons"] = ["|".join(codes[row]) for row in errors[failed]]
+    else:
+        quarantine["reasons"] = pd.Series(dtype=str)
+
+    return df[~failed], quarantine
+
+
+def validate_listings(df):
+    """
+    Aplica todas las reglas.
+    Retorna (filas válidas, filas en cuarentena con columna `reasons`, conteos por regla).
+    """
+    flags = rule_flags(df)
+    valid, quarantine = split_by_flags(df, flags)
+    counts = {code: int(flags[code].sum()) for code in flags.columns}
+    return valid, quarantine, counts
+
+
+def write_quarantine(quarantine, counts, total_rows,
+                     quarantine_path=QUARANTINE_PATH, report_path=REPORT_PATH):
+    """Guarda las filas en cuarentena y el reporte de reglas"""
+    os.makedirs(os.path.dirname(quarantine_path), exist_ok=True)
+    quarantine.to_csv(quarantine_path, index=False, encoding="utf-8-sig")
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": total_rows,
+        "quarantined": len(quarantine),
+        "rules": {
+            code: {"severity": RULES[code][0], "description": RULES[code][1], "count": count}
+            for code, count in counts.items()
+        },
+    }
+    with open(report_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def print_validation_summary(counts, total_rows, quarantined):
+    print(f"🔎 Validación: {total_rows - quarantined}/{total_rows} filas válidas, {quarantined} en cuarentena")
+    for code, count in counts.items():
+        if count:
+            icon = "❌" if RULES[code][0] == ERROR else "⚠️ "
+            print(f"   {icon} {code}: {count}")
+
+
+def validate_and_quarantine(df, quarantine_path=QUARANTINE_PATH, report_path=REPORT_PATH):
+    """Etapa completa: valida, escribe cuarentena + reporte y retorna las filas válidas"""
+    valid, quarantine, counts = validate_listings(df)
+    write_quarantine(quarantine, counts, len(df), quarantine_path, report_path)
+    print_validation_summary(counts, len(df), len(quarantine))
+    return valid
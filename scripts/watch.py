@@ -0,0 +1,382 @@
+"""
+MODO DAEMON - reprocesamiento continuo con estado en memoria
+
+Un solo proceso residente (pandas, dimensión de distritos, cachés del
+resolvedor, polígonos y tabla de seguridad ya cargados) que vigila
+data/raw/ y, cuando llega algo nuevo:
+
+- dataset.csv (el mismo archivo que lee el procesamiento por lotes): si
+  creció por el final solo se leen los bytes agregados; si cambió en otra
+  parte se relee y se comparan hashes por fila. Solo las filas nuevas o modificadas pasan por validación
+  y limpieza; luego se vuelve a puntuar (vectorizado) cada ciudad afectada.
+- security_raw.csv: se recalcula la seguridad y se re-puntúan todas las
+  ciudades con las filas ya limpias (sin volver a parsear nada). Al
+  arrancar solo se recalcula si el extracto es más nuevo que
+  security_by_district.csv / crime_cube.npz.
+- lima_districts.geojson: se recargan los polígonos y se reasignan las
+  ciudades y los distritos desde las filas validadas en memoria.
+- lima_urbanizaciones.csv: se recarga el gazetteer y se vuelve a limpiar Lima.
+
+Las filas se identifican igual que en el procesamiento por lotes: no se
+descartan urls vacías ni repetidas (ver WatchDaemon._row_keys).
+
+Las salidas (web/data/*, data/processed/*) se publican con escritura
+atómica, así que el dashboard nunca ve un archivo a medio escribir. Después
+se corren las etapas derivadas (similares, tiles, índice de mercado).
+
+Uso (desde la raíz del repo):
+    python scripts/watch.py [--interval 1.0] [--once] [--sqlite RUTA]
+"""
+
+import argparse
+import fnmatch
+import io
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import data_processor_final as dp
+from scripts import district_polygons, gazetteer, geo_tiles, market_index, partitions, process_security, similarity
+from scripts.listing_store import DB_PATH
+from scripts.validation import rule_flags, split_by_flags, write_quarantine
+
+RAW_DIR = "data/raw"
+# Mismo archivo que dp.load_listings: daemon y lotes deben ver las mismas filas
+LISTING_PATTERNS = (os.path.basename(dp.DATASET_PATH),)
+TAIL_BYTES = 64  # bytes que se comparan para detectar que el archivo solo creció
+FILE_STRIDE = 10 ** 9  # posición global = orden del archivo × FILE_STRIDE + fila
+
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _read_tail(path, offset):
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - TAIL_BYTES))
+        return f.read(min(offset, TAIL_BYTES))
+
+
+class WatchDaemon:
+    def __init__(self, raw_dir=RAW_DIR, sqlite_path=DB_PATH):
+        self.raw_dir = raw_dir
+        self.sqlite_path = sqlite_path
+        self.security_raw = os.path.join(raw_dir, os.path.basename(process_security.RAW_PATH))
+        self.polygons_path = district_polygons.POLYGONS_PATH
+        self.gazetteer_path = gazetteer.GAZETTEER_PATH
+
+        self.signatures = {}   # ruta → (tamaño, mtime) ya procesado
+        self.pending = {}      # ruta → firma vista en el poll anterior (espera a que se estabilice)
+        self.files = {}        # ruta → {"offset", "tail", "header"} de archivos de propiedades
+
+        # Estado caliente
+        self.row_hash = pd.Series(dtype="uint64")  # clave de fila → hash de la fila cruda
+        self.source = pd.Series(dtype=object)      # clave de fila → archivo de origen
+        self.position = pd.Series(dtype="int64")   # clave de fila → posición en el origen (orden de salida)
+        self.flags = pd.DataFrame()                # clave de fila × regla de validación
+        self.quarantine = pd.DataFrame()
+        self.valid = pd.DataFrame()                # filas válidas con city (índice clave de fila)
+        self.cleaned = {}                          # city → filas limpias (índice clave de fila)
+        self.security = self._load_security()
+        # Polígonos y gazetteer se cargan (en caché) con el contenido actual al primer uso
+        for path in (self.polygons_path, self.gazetteer_path):
+            self.signatures[path] = _signature(path)
+        if self._security_is_current():
+            # La seguridad publicada ya sale de este extracto: no se recalcula al arrancar
+            self.signatures[self.security_raw] = _signature(self.security_raw)
+
+    # ---------------------------------------------------------
+    # Detección de cambios
+    # ---------------------------------------------------------
+
+    def watched_files(self):
+        if not os.path.isdir(self.raw_dir):
+            return []
+        return sorted(os.path.join(self.raw_dir, name) for name in os.listdir(self.raw_dir))
+
+    def _is_listing_file(self, path):
+        return any(fnmatch.fnmatch(os.path.basename(path), p) for p in LISTING_PATTERNS)
+
+    def changed_files(self):
+        """Archivos con una firma nueva que ya no cambió entre dos polls seguidos"""
+        ready = []
+        for path in self.watched_files():
+            signature = _signature(path)
+            if self.signatures.get(path) == signature:
+                self.pending.pop(path, None)
+                continue
+            if self.pending.get(path) == signature:
+                ready.append(path)
+                del self.pending[path]
+            else:
+                self.pending[path] = signature  # todavía se está escribiendo (o recién apareció)
+        return ready
+
+    # ---------------------------------------------------------
+    # Lectura incremental de propiedades
+    # ---------------------------------------------------------
+
+    def _read_listing_file(self, path):
+        """Retorna (filas leídas, lectura completa). Solo lee lo agregado si el archivo creció."""
+        state = self.files.get(path)
+        size = os.path.getsize(path)
+        appended = (
+            state is not None and size >= state["offset"]
+            and _read_tail(path, state["offset"]) == state["tail"]
+        )
+
+        with open(path, "rb") as f:
+            f.seek(state["offset"] if appended else 0)
+            data = f.read()
+        # Solo líneas completas: una línea a medio escribir se lee en el próximo poll
+        data = data[:data.rfind(b"\n") + 1]
+        offset = (state["offset"] if appended else 0) + len(data)
+
+        if appended:
+            frame = pd.read_csv(io.BytesIO(data), header=None, names=state["header"], encoding="utf-8") \
+                if data.strip() else pd.DataFrame(columns=state["header"])
+        else:
+            frame = pd.read_csv(io.BytesIO(data), encoding="utf-8")
+
+        first_row = state["rows"] if appended else 0
+        frame.index = pd.RangeIndex(first_row, first_row + len(frame))
+        self.files[path] = {
+            "offset": offset,
+            "tail": _read_tail(path, offset),
+            "header": state["header"] if appended else list(frame.columns),
+            "rows": first_row + len(frame),
+            # url → filas ya leídas con esa url (numera las repeticiones, ver _row_keys)
+            "occurrences": state["occurrences"] if appended else pd.Series(dtype="int64"),
+        }
+        return frame, not appended
+
+    def _row_keys(self, path, frame, hashes):
+        """
+        Clave estable por fila (archivo | url | n.º de repetición). Igual que el
+        procesamiento por lotes no se descarta ninguna fila: las urls repetidas
+        se numeran y las filas sin url se identifican por su contenido.
+        """
+        base = frame["url"].astype(object).where(frame["url"].notna(), "sin-url:" + hashes.astype(str))
+        previous = self.files[path]["occurrences"]
+        repeat = base.groupby(base, sort=False).cumcount() + base.map(previous).fillna(0).astype("int64")
+        self.files[path]["occurrences"] = previous.add(base.value_counts(), fill_value=0).astype("int64")
+
+        keys = os.path.basename(path) + "|" + base
+        return keys.where(repeat == 0, keys + "#" + repeat.astype(str))
+
+    def _diff_rows(self, path, frame, full):
+        """(filas nuevas o modificadas indexadas por clave de fila, claves eliminadas de este archivo)"""
+        frame = dp.filter_rentals(frame)
+        hashes = pd.util.hash_pandas_object(frame, index=False)
+        keys = self._row_keys(path, frame, hashes).to_numpy()
+        rank = sorted(p for p in self.files).index(path)
+        position = pd.Series(rank * FILE_STRIDE + frame.index.to_numpy(), index=keys)
+        frame = frame.set_index(keys)
+        hashes.index = frame.index
+
+        previous = self.row_hash.reindex(frame.index)
+        changed = frame[previous.to_numpy() != hashes.to_numpy()]
+
+        removed = pd.Index([])
+        if full:
+            from_file = self.source.index[self.source.to_numpy() == path]
+            removed = from_file.difference(frame.index)
+
+        self.row_hash = pd.concat([self.row_hash.drop(removed), hashes])
+        self.row_hash = self.row_hash[~self.row_hash.index.duplicated(keep="last")]
+        self.source = pd.concat([self.source.drop(removed), pd.Series(path, index=frame.index)])
+        self.source = self.source[~self.source.index.duplicated(keep="last")]
+        self.position = pd.concat([self.position.drop(removed), position])
+        self.position = self.position[~self.position.index.duplicated(keep="last")]
+        return changed, removed
+
+    # ---------------------------------------------------------
+    # Etapas sobre las filas que cambiaron
+    # ---------------------------------------------------------
+
+    def _validate(self, changed, removed):
+        """Valida solo las filas cambiadas y actualiza cuarentena/reporte completos"""
+        touched = changed.index.union(removed)
+        flags = rule_flags(changed)
+        valid, quarantine = split_by_flags(changed, flags)
+
+        self.flags = pd.concat([self.flags.drop(touched, errors="ignore"), flags])
+        self.quarantine = pd.concat([self.quarantine.drop(touched, errors="ignore"), quarantine])
+        counts = {code: int(self.flags[code].sum()) for code in self.flags.columns}
+        write_quarantine(self.quarantine, counts, len(self.flags))
+        return valid
+
+    def _merge_valid(self, valid, touched):
+        """Actualiza las filas válidas en memoria; retorna las ciudades afectadas"""
+        valid = partitions.parse_location(valid.copy())
+        old_cities = set(self.valid.loc[self.valid.index.intersection(touched), "city"]) if len(self.valid) else set()
+        self.valid = pd.concat([self.valid.drop(touched, errors="ignore"), valid])
+
+        for city in old_cities:
+            if city in self.cleaned:
+                self.cleaned[city] = self.cleaned[city].drop(touched, errors="ignore")
+        return old_cities | set(valid["city"]), valid
+
+    def _clean(self, valid):
+        """Limpia por ciudad solo las filas dadas y las agrega a las ya limpias"""
+        for city, rows in valid.groupby("city", sort=True):
+            rows = rows.drop(columns=["city"])
+            cleaned = dp.clean_listings(rows, lima_only=(city == partitions.LIMA))
+            previous = self.cleaned.get(city)
+            self.cleaned[city] = cleaned if previous is None else pd.concat([previous, cleaned])
+
+    def _publish(self, cities):
+        """Puntúa (vectorizado, con las filas ya limpias) y publica las ciudades dadas"""
+        for city in sorted(cities):
+            cleaned = self.cleaned.get(city)
+            if cleaned is None or not len(cleaned):
+                continue
+            # Mismo orden de filas que el procesamiento por lotes (orden del archivo)
+            order = self.position.reindex(cleaned.index).to_numpy().argsort(kind="stable")
+            df_scored, _ = dp.score_listings(cleaned.iloc[order].reset_index(drop=True), self.security)
+            df_scored["city"] = city
+            partitions.export_city(city, df_scored, self.sqlite_path)
+            print(f"   📤 city={city}: {len(df_scored)} propiedades publicadas")
+
+        if partitions.LIMA in cities:
+            for name, stage in (
+                ("similares", similarity.build_similarity),
+                ("tiles", geo_tiles.build_tiles),
+                ("mercado", market_index.update_market_index),
+            ):
+                try:
+                    stage()
+                except Exception as e:
+                    # Una etapa derivada que falla no tumba al daemon
+                    print(f"❌ Etapa {name}: {e}")
+
+    def _security_is_current(self):
+        """True si las salidas de seguridad existen y son posteriores al extracto INEI"""
+        outputs = [dp.SECURITY_PATH, process_security.CUBE_PATH]
+        if not os.path.exists(self.security_raw) or not all(map(os.path.exists, outputs)):
+            return False
+        raw_mtime = os.stat(self.security_raw).st_mtime_ns
+        return all(os.stat(path).st_mtime_ns >= raw_mtime for path in outputs)
+
+    def _load_security(self):
+        if os.path.exists(dp.SECURITY_PATH):
+            return dp.load_security_scores()
+        return pd.DataFrame(columns=["district_id", "security_score"])
+
+    # ---------------------------------------------------------
+    # Ciclo
+    # ---------------------------------------------------------
+
+    def refresh(self, paths):
+        """Procesa un conjunto de archivos cambiados; retorna las ciudades republicadas"""
+        start = time.perf_counter()
+        try:
+            cities, added, dropped = self._apply(paths)
+        finally:
+            # Un archivo que falló no se reintenta hasta que vuelva a cambiar
+            for path in paths:
+                self.signatures[path] = _signature(path)
+
+        if cities:
+            print(f"🔄 Cambios: +{added} / -{dropped} filas → ciudades {sorted(cities)}")
+            self._publish(cities)
+            print(f"✅ Republicado en {time.perf_counter() - start:.2f}s")
+        return cities
+
+    def _apply(self, paths):
+        affected, rescore_all = set(), False
+        added = dropped = 0
+
+        for path in paths:
+            if self._is_listing_file(path):
+                if not os.path.exists(path):
+                    continue
+                frame, full = self._read_listing_file(path)
+                changed, removed = self._diff_rows(path, frame, full)
+                if not len(changed) and not len(removed):
+                    continue
+                added, dropped = added + len(changed), dropped + len(removed)
+                valid = self._validate(changed, removed)
+                cities, valid = self._merge_valid(valid, changed.index.union(removed))
+                self._clean(valid)
+                affected |= cities
+
+            elif path == self.security_raw and os.path.exists(path):
+                print("🛡️  Datos de seguridad nuevos: recalculando...")
+                chunks = pd.read_csv(path, encoding="latin1", chunksize=process_security.CHUNK_SIZE)
+                process_security.process_security(chunks)
+                self.security = self._load_security()
+                rescore_all = True
+
+            elif os.path.abspath(path) == os.path.abspath(self.polygons_path):
+                print("🗺️  Polígonos de distritos nuevos: reasignando ciudades y distritos...")
+                district_polygons.load_polygons.cache_clear()
+                self.cleaned = {}
+                if len(self.valid):
+                    # Con lat/lon la ciudad también sale de los polígonos
+                    self.valid = partitions.parse_location(self.valid)
+                    self._clean(self.valid)
+                rescore_all = True
+
+            elif os.path.abspath(path) == os.path.abspath(self.gazetteer_path):
+                print("📖 Gazetteer de urbanizaciones nuevo: reasignando distritos de Lima...")
+                gazetteer.load_gazetteer.cache_clear()
+                self.cleaned.pop(partitions.LIMA, None)
+                lima = self.valid[self.valid["city"] == partitions.LIMA] if len(self.valid) else self.valid
+                if len(lima):
+                    self._clean(lima)
+                affected.add(partitions.LIMA)
+
+        cities = set(self.cleaned) if rescore_all else affected
+        return cities, added, dropped
+
+    def poll(self):
+        paths = self.changed_files()
+        return self.refresh(paths) if paths else set()
+
+    def run(self, interval=1.0):
+        print(f"👀 Vigilando {self.raw_dir}/ cada {interval}s (Ctrl+C para salir)")
+        while True:
+            try:
+                self.poll()
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                # El daemon sigue vivo; el archivo se reintenta cuando vuelva a cambiar
+                print(f"❌ ERROR procesando cambios: {e}")
+            time.sleep(interval)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Daemon: reprocesa al llegar datos nuevos a data/raw/")
+    parser.add_argument("--interval", type=float, default=1.0, help="segundos entre revisiones")
+    parser.add_argument("--once", action="store_true", help="procesar lo que haya y salir")
+    parser.add_argument("--sqlite", default=DB_PATH, help="ruta del .db para el sink SQLite (opcional)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("👀 LIMA HOUSING ANALYTICS - MODO DAEMON")
+    print("=" * 60)
+
+    daemon = WatchDaemon(sqlite_path=args.sqlite)
+    # Carga inicial: todo lo que hay en data/raw/ se procesa una vez (salvo lo ya al día,
+    # como un extracto de seguridad que no cambió desde la última corrida)
+    daemon.refresh([p for p in daemon.watched_files() if daemon.signatures.get(p) != _signature(p)])
+    if args.once:
+        return
+    try:
+        daemon.run(args.interval)
+    except KeyboardInterrupt:
+        print("\n👋 Daemon detenido")
+
+
+if __name__ == "__main__":
+    main()
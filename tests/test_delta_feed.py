@@ -0,0 +1,123 @@
+"""
+Feed de cambios: publicar varias versiones y reconstruir el conjunto
+actual desde el lado del consumidor (snapshot + deltas en orden).
+
+Ejecutar desde la raíz del repo:
+    python -m pytest -q tests
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import delta_feed
+from scripts.data_processor_final import JSON_COLUMNS
+
+
+def _scored(n, seed=0):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({column: np.nan for column in JSON_COLUMNS}, index=range(n))
+    df["url"] = [f"https://example.pe/{i}" for i in range(n)]
+    df["title"] = [f"Departamento {i}" for i in range(n)]
+    df["district"] = rng.choice(["MIRAFLORES", "BARRANCO", "LINCE"], n)
+    df["price_clean"] = rng.integers(1000, 5000, n).astype(float)
+    df["area_clean"] = rng.integers(40, 200, n).astype(float)
+    df["final_score"] = rng.uniform(0, 10, n).round(2)
+    return df
+
+
+@pytest.fixture
+def feed(tmp_path):
+    return str(tmp_path / "feed"), str(tmp_path / "feed_state.pkl")
+
+
+def _read(feed_dir, name):
+    with open(os.path.join(feed_dir, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _sync(feed_dir, records=None, version=None):
+    """Mismo algoritmo que syncProperties (dashboard.js): snapshot si hace falta, luego deltas"""
+    manifest = _read(feed_dir, "index.json")
+    chain_start = manifest["deltas"][0]["from"] if manifest["deltas"] else manifest["version"]
+    if version is None or version > manifest["version"] or version < chain_start:
+        snapshot = _read(feed_dir, manifest["snapshot"]["path"])
+        records = {record["url"]: record for record in snapshot["records"]}
+        version = snapshot["version"]
+
+    pending = [d for d in manifest["deltas"] if d["from"] >= version]
+    for summary in pending:
+        records = delta_feed.apply_delta(dict(records), _read(feed_dir, summary["path"]))
+    if pending:
+        version = manifest["version"]
+    return records, version
+
+
+def _expected(df):
+    return {record["url"]: record for record in json.loads(delta_feed.feed_records(df).to_json(orient="records"))}
+
+
+def test_three_versions_round_trip(feed):
+    feed_dir, state = feed
+    v1 = _scored(50)
+    v2 = v1.drop(index=[3, 7]).copy()
+    v2.loc[10, "price_clean"] = 9999.0
+    v2.loc[11, "final_score"] = np.nan
+    v3 = pd.concat([v2, _scored(53).iloc[50:]])
+    v3.loc[20, "district"] = "SURCO"
+
+    assert delta_feed.publish_feed(v1, feed_dir, state)["to"] == 1
+    client_v1, _ = _sync(feed_dir)
+
+    summary = delta_feed.publish_feed(v2, feed_dir, state)
+    assert (summary["removed"], summary["changed"], summary["added"]) == (2, 2, 0)
+    summary = delta_feed.publish_feed(v3, feed_dir, state)
+    assert (summary["removed"], summary["changed"], summary["added"]) == (0, 1, 3)
+    assert delta_feed.publish_feed(v3, feed_dir, state) is None  # sin cambios: misma versión
+
+    # Cliente nuevo (snapshot v1 + 2 deltas) y cliente que ya tenía la v1
+    fresh, version = _sync(feed_dir)
+    incremental, _ = _sync(feed_dir, client_v1, 1)
+    assert version == 3
+    assert fresh == _expected(v3)
+    assert incremental == _expected(v3)
+
+
+def test_snapshot_cadence(feed, monkeypatch):
+    feed_dir, state = feed
+    monkeypatch.setattr(delta_feed, "SNAPSHOT_EVERY", 2)
+    df = _scored(40)
+    for version in range(1, 6):
+        df = df.copy()
+        df.loc[version, "price_clean"] += 1
+        delta_feed.publish_feed(df, feed_dir, state)
+
+    manifest = _read(feed_dir, "index.json")
+    assert manifest["version"] == 5
+    assert manifest["snapshot"]["version"] == 5  # v1, v3, v5
+    snapshots = [name for name in os.listdir(feed_dir) if name.startswith("snapshot-")]
+    assert snapshots == ["snapshot-000005.json"]
+    assert _sync(feed_dir)[0] == _expected(df)
+
+
+def test_restart_after_lost_state_moves_version_forward(feed):
+    feed_dir, state = feed
+    df = _scored(30)
+    delta_feed.publish_feed(df, feed_dir, state)
+    delta_feed.publish_feed(df.drop(index=[0]), feed_dir, state)
+    os.remove(state)
+
+    summary = delta_feed.publish_feed(df, feed_dir, state)
+
+    manifest = _read(feed_dir, "index.json")
+    assert summary["to"] == 3 and manifest["version"] == 3
+    assert manifest["snapshot"]["version"] == 3 and manifest["deltas"] == []
+    # Un cliente en la v2 no tiene deltas que aplicar: recarga el snapshot
+    records, version = _sync(feed_dir, {}, 2)
+    assert version == 3 and records == _expected(df)
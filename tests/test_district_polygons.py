@@ -0,0 +1,45 @@
+"""
+Distrito de cada feature del GeoJSON (propiedades estilo INEI) y asignación
+de puntos por polígono.
+
+Ejecutar desde la raíz del repo:
+    python -m pytest -q tests
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.district_polygons import DistrictPolygons, feature_district_id
+from scripts.districts import UNKNOWN_ID, resolve_district_id
+
+INEI = {"NOMBDEP": "LIMA", "NOMBPROV": "LIMA", "NOMBDIST": "MIRAFLORES"}
+
+
+def test_inei_properties_use_district_name():
+    miraflores = resolve_district_id("MIRAFLORES")
+    assert feature_district_id(INEI) == miraflores
+    assert feature_district_id({"DEPARTAMEN": "LIMA", "PROVINCIA": "LIMA", "DISTRITO": "BARRANCO"}) \
+        == resolve_district_id("BARRANCO")
+    assert feature_district_id({"name": "San Isidro"}) == resolve_district_id("SAN ISIDRO")
+    # Cercado de Lima sigue reconociéndose por su propio campo de distrito
+    assert feature_district_id({**INEI, "NOMBDIST": "LIMA"}) == resolve_district_id("LIMA")
+    # Solo departamento/provincia: no hay distrito
+    assert feature_district_id({"NOMBDEP": "LIMA", "NOMBPROV": "LIMA"}) == UNKNOWN_ID
+
+
+def test_assign_with_inei_features(tmp_path):
+    square = [[-77.05, -12.13], [-77.01, -12.13], [-77.01, -12.10], [-77.05, -12.10], [-77.05, -12.13]]
+    collection = {"type": "FeatureCollection", "features": [
+        {"type": "Feature", "properties": INEI, "geometry": {"type": "Polygon", "coordinates": [square]}},
+    ]}
+    path = tmp_path / "lima_districts.geojson"
+    path.write_text(json.dumps(collection), encoding="utf-8")
+
+    polygons = DistrictPolygons.from_geojson(str(path))
+    result = polygons.assign([-77.03, -77.10, np.nan], [-12.12, -12.12, -12.12])
+    assert result.tolist() == [resolve_district_id("MIRAFLORES"), UNKNOWN_ID, UNKNOWN_ID]
@@ -0,0 +1,55 @@
+"""
+Gazetteer de urbanizaciones: distrito y centroide desde `location`, con y
+sin columnas lat/lon en el archivo.
+
+Ejecutar desde la raíz del repo:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.districts import UNKNOWN_ID, resolve_district_id
+from scripts.gazetteer import Gazetteer
+
+LOCATIONS = pd.Series([
+    "Ur. Santa Cruz, Miraflores, Lima, Lima",    # distrito + urbanización del mismo distrito
+    "Ur. Santa Cruz Etapa II, Lima, Lima",       # solo urbanización (prefijo)
+    "Ur. Santa Cruz, Barranco, Lima, Lima",      # urbanización de otro distrito: sin coordenadas
+    "Cayma, Arequipa, Arequipa",                 # fuera de Lima
+    np.nan,
+], index=[10, 11, 12, 13, 14])
+
+
+def _table(tmp_path, with_coords):
+    table = pd.DataFrame({"urbanizacion": ["Santa Cruz"], "district": ["MIRAFLORES"], "listings": [3]})
+    if with_coords:
+        table["lat"], table["lon"] = [-12.115], [-77.040]
+    path = tmp_path / "lima_urbanizaciones.csv"
+    table.to_csv(path, index=False)
+    return Gazetteer.from_csv(str(path))
+
+
+def test_resolve_returns_urbanization_centroid(tmp_path):
+    found = _table(tmp_path, with_coords=True).resolve(LOCATIONS)
+
+    assert found.index.tolist() == LOCATIONS.index.tolist()
+    assert found["district_id"].tolist() == [
+        resolve_district_id("MIRAFLORES"), resolve_district_id("MIRAFLORES"),
+        resolve_district_id("BARRANCO"), UNKNOWN_ID, UNKNOWN_ID,
+    ]
+    assert found["source"].tolist() == ["distrito", "urbanizacion", "distrito", None, None]
+    assert found["lat"].tolist()[:2] == [-12.115, -12.115]
+    assert found["lon"].tolist()[:2] == [-77.040, -77.040]
+    assert found[["lat", "lon"]].iloc[2:].isna().all().all()
+
+
+def test_file_without_coordinates_gives_nan(tmp_path):
+    found = _table(tmp_path, with_coords=False).resolve(LOCATIONS)
+    assert found["district_id"].iloc[1] == resolve_district_id("MIRAFLORES")
+    assert found[["lat", "lon"]].isna().all().all()
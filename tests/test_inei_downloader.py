@@ -0,0 +1,237 @@
+"""
+Descargador INEI contra un servidor HTTP local con soporte de Range/If-Range.
+
+Ejecutar desde la raíz del repo:
+    python -m pytest -q tests
+"""
+
+import gzip
+import hashlib
+import io
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts.scraping import inei_api_dowloader as downloader
+
+CSV = "".join(
+    f"{i},LIMA,LIMA,MIRAFLORES,2023,ROBO,{i % 7 + 1}\n" for i in range(5000)
+).encode("latin1")
+CSV = b"id,dpto_hecho,prov_hecho,dist_hecho,anio,tipo,cantidad\n" + CSV
+
+
+class ArchiveServer(ThreadingHTTPServer):
+    """Sirve un único archivo (`body`, `etag`) y registra los headers de cada pedido"""
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), RangeHandler)
+        self.body = b""
+        self.etag = '"v1"'
+        self.requests = []
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server, body = self.server, self.server.body
+        server.requests.append(dict(self.headers))
+
+        start = 0
+        ranged = self.headers.get("Range")
+        if_range = self.headers.get("If-Range")
+        if ranged and (if_range is None or if_range == server.etag):
+            start = int(ranged.split("=")[1].split("-")[0])
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+
+        self.send_header("ETag", server.etag)
+        self.send_header("Content-Length", str(len(body) - start))
+        self.end_headers()
+        self.wfile.write(body[start:])
+
+
+@pytest.fixture
+def server():
+    httpd = ArchiveServer()
+    httpd.body = gzip.compress(CSV)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server):
+    return f"http://127.0.0.1:{server.server_address[1]}/delitos.csv.gz"
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_fresh_download_verifies_checksum(server, tmp_path):
+    dest = downloader.download(_url(server), str(tmp_path), _sha(server.body))
+
+    assert open(dest, "rb").read() == server.body
+    assert not os.path.exists(dest + ".part")
+    assert not os.path.exists(dest + ".part.validator")
+    assert "Range" not in server.requests[0]
+
+
+def test_resume_from_truncated_part(server, tmp_path):
+    # Primer intento: se corta a la mitad (queda el .part y el ETag)
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    half = len(server.body) // 2
+    with open(dest + ".part", "wb") as f:
+        f.write(server.body[:half])
+    with open(dest + ".part.validator", "w") as f:
+        f.write(server.etag)
+
+    downloader.download(_url(server), str(tmp_path), _sha(server.body))
+
+    assert open(dest, "rb").read() == server.body
+    assert server.requests[-1]["Range"] == f"bytes={half}-"
+    assert server.requests[-1]["If-Range"] == server.etag
+
+
+def test_complete_part_gets_416(server, tmp_path):
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    with open(dest + ".part", "wb") as f:
+        f.write(server.body)
+
+    downloader.download(_url(server), str(tmp_path), _sha(server.body))
+
+    assert open(dest, "rb").read() == server.body
+    assert server.requests[-1]["Range"] == f"bytes={len(server.body)}-"
+
+
+def test_checksum_mismatch_discards_part(server, tmp_path):
+    with pytest.raises(downloader.ChecksumError):
+        downloader.download(_url(server), str(tmp_path), "0" * 64)
+
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    assert not os.path.exists(dest)
+    assert not os.path.exists(dest + ".part")
+
+
+def test_changed_file_restarts_instead_of_splicing(server, tmp_path):
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    old = server.body
+    with open(dest + ".part", "wb") as f:
+        f.write(old[: len(old) // 2])
+    with open(dest + ".part.validator", "w") as f:
+        f.write(server.etag)
+
+    # El archivo cambió en el servidor después del primer intento
+    server.body = gzip.compress(CSV + b"9999,LIMA,LIMA,SURCO,2024,HURTO,3\n")
+    server.etag = '"v2"'
+
+    downloader.download(_url(server), str(tmp_path))
+
+    # Un solo pedido (Range + If-Range viejo → 200) y sin mezclar bytes viejos
+    assert len(server.requests) == 1
+    assert server.requests[0]["If-Range"] == '"v1"'
+    assert open(dest, "rb").read() == server.body
+
+
+def test_streaming_rows_while_resuming(server, tmp_path):
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    with open(dest + ".part", "wb") as f:
+        f.write(server.body[:1000])
+    with open(dest + ".part.validator", "w") as f:
+        f.write(server.etag)
+
+    chunks = downloader.iter_security_rows(_url(server), str(tmp_path), _sha(server.body), chunksize=1000)
+    rows = sum(len(chunk) for chunk in chunks)
+
+    assert rows == 5000
+    assert open(dest, "rb").read() == server.body
+
+
+def test_existing_archive_is_reused_only_if_checksum_matches(server, tmp_path):
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    with open(dest, "wb") as f:
+        f.write(server.body)
+
+    downloader.download(_url(server), str(tmp_path), _sha(server.body))
+    assert server.requests == []
+
+    # Archivo corrupto (o extracto nuevo publicado en la misma URL): se descarga de nuevo
+    with open(dest, "wb") as f:
+        f.write(server.body[:-10])
+    downloader.download(_url(server), str(tmp_path), _sha(server.body))
+
+    assert len(server.requests) == 1
+    assert open(dest, "rb").read() == server.body
+
+
+def test_streaming_rows_redownloads_stale_archive(server, tmp_path):
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    with open(dest, "wb") as f:
+        f.write(gzip.compress(CSV[:2000]))
+
+    chunks = downloader.iter_security_rows(_url(server), str(tmp_path), _sha(server.body), chunksize=1000)
+
+    assert sum(len(chunk) for chunk in chunks) == 5000
+    assert open(dest, "rb").read() == server.body
+
+
+INEI_CSV = (
+    "DPTO_HECHO_NEW,PROV_HECHO,DIST_HECHO,ANIO,MES,GENERICO,cantidad\n"
+    + "".join(
+        f"{dpto},{prov},{dist},{2022 + i % 2},{i % 12 + 1},{tipo},{i % 5 + 1}\n"
+        for i, (dpto, prov, dist, tipo) in enumerate(
+            [
+                ("LIMA METROPOLITANA", "LIMA", "MIRAFLORES", "HURTO"),
+                ("LIMA METROPOLITANA", "LIMA", "SAN ISIDRO", "ROBO"),
+                ("LIMA METROPOLITANA", "LIMA", "BREÑA", "HURTO"),
+                ("LIMA METROPOLITANA", "CALLAO", "BELLAVISTA", "ROBO"),
+                ("AREQUIPA", "AREQUIPA", "MIRAFLORES", "ROBO"),
+            ] * 400
+        )
+    )
+).encode("latin1")
+
+
+def test_aggregate_from_resumed_stream(server, tmp_path):
+    from scripts.crime_cube import CrimeCube
+    from scripts.process_security import process_security
+
+    server.body = gzip.compress(INEI_CSV)
+    dest = os.path.join(str(tmp_path), "delitos.csv.gz")
+    with open(dest + ".part", "wb") as f:
+        f.write(server.body[: len(server.body) // 3])
+    with open(dest + ".part.validator", "w") as f:
+        f.write(server.etag)
+
+    rows = downloader.iter_security_rows(_url(server), str(tmp_path), _sha(server.body), chunksize=300)
+    output, cube_path = str(tmp_path / "security.csv"), str(tmp_path / "cube.npz")
+    security = process_security(rows, output, cube_path)
+
+    # Mismo resultado que filtrar el CSV completo a mano: solo provincia Lima de Lima Metropolitana
+    raw = pd.read_csv(io.BytesIO(INEI_CSV), encoding="latin1")
+    lima = raw[(raw["DPTO_HECHO_NEW"] == "LIMA METROPOLITANA") & (raw["PROV_HECHO"] == "LIMA")]
+    expected = lima.groupby("DIST_HECHO")["cantidad"].sum()
+
+    got = security.set_index("district")["crime_count"]
+    assert sorted(got.index) == ["BREÑA", "MIRAFLORES", "SAN ISIDRO"]
+    for district, count in expected.items():
+        assert got[district] == count
+    assert CrimeCube.load(cube_path).counts.sum() == expected.sum()
+    assert os.path.exists(output)
+    assert open(dest, "rb").read() == server.body
@@ -0,0 +1,78 @@
+"""
+Índice de mercado: partes dispersas por día de corrida, guardado
+incremental y consultas de ventana.
+
+Ejecutar desde la raíz del repo:
+    python -m pytest -q tests
+"""
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from scripts import market_index as mi
+
+
+def _listings(prefix, price, district_id=22, n=4, date_pub=None):
+    return pd.DataFrame({
+        "url": [f"https://example.pe/{prefix}/{i}" for i in range(n)],
+        "price_clean": [price * (i + 1) for i in range(n)],
+        "area_clean": [100.0] * n,
+        "district_id": [district_id] * n,
+        "date_pub": [date_pub] * n,
+    })
+
+
+def test_update_only_rewrites_its_day(tmp_path):
+    path = str(tmp_path / "market_index" / "index.json")
+    index = mi.MarketIndex.empty()
+    seeded = index.update(_listings("a", 3000, date_pub="14 ene. 2026 - Publicado por X"), seed=True)
+    assert seeded == 4
+    index.update(_listings("b", 4000, district_id=15), day="2026-02-01")
+    index.save(path)
+
+    index = mi.MarketIndex.load(path)
+    assert index.update(_listings("b", 9999), day="2026-02-02") == 0  # urls ya vistas
+    index.update(_listings("c", 5000), day="2026-02-03")
+    files = os.path.dirname(path)
+    before = {name: os.stat(os.path.join(files, name)).st_mtime_ns for name in os.listdir(files)}
+    index.save(path)
+    rewritten = {name for name in os.listdir(files)
+                 if before.get(name) != os.stat(os.path.join(files, name)).st_mtime_ns}
+    assert rewritten == {"day-2026-02-03.npz", "index.json"}
+
+    index = mi.MarketIndex.load(path)
+    assert [str(day) for day in index.days] == ["2026-01-14", "2026-02-01", "2026-02-03"]
+    assert len(index.seen) == 12
+
+    window = index.rolling(7, end="2026-02-03").set_index("district_id")
+    assert window.loc[22, "count"] == 4 and window.loc[15, "count"] == 4
+    assert window.loc[22, "mean_price_m2"] == 125.0
+    median = window.loc[22, "median_price_m2"]
+    assert abs(median - 100.0) / 100.0 < mi.SKETCH_GAMMA - 1
+
+    series = index.series(22, window=7)
+    assert series["count"].tolist() == [4, 0, 4]  # la ventana del 3/2 ya no incluye el 14/1
+
+
+def test_dense_index_is_migrated(tmp_path):
+    days = np.array(["2026-01-01", "2026-01-02"], dtype="datetime64[D]")
+    counts = np.zeros((2, mi.N_DISTRICTS), dtype=np.int64)
+    sums = np.zeros((2, mi.N_DISTRICTS))
+    sketches = np.zeros((2, mi.N_DISTRICTS, mi.SKETCH_BUCKETS), dtype=np.int32)
+    counts[1, 22], sums[1, 22] = 2, 60.0
+    sketches[1, 22, mi.sketch_bucket([20.0, 40.0])] = 1
+    legacy = str(tmp_path / "market_index.npz")
+    np.savez_compressed(legacy, days=days, counts=counts, sums=sums, sketches=sketches,
+                        seen=np.array([1, 2], dtype=np.uint64),
+                        sketch=np.array([mi.SKETCH_MIN, mi.SKETCH_MAX, mi.SKETCH_GAMMA]))
+
+    index = mi.MarketIndex.load(str(tmp_path / "market_index" / "index.json"), legacy_path=legacy)
+    window = index.rolling(7, end="2026-01-02")
+    assert window["district_id"].tolist() == [22]
+    assert window["count"].tolist() == [2] and window["mean_price_m2"].tolist() == [30.0]
+    assert index.seen.tolist() == [1, 2]
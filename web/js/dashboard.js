@@ -3,6 +3,7 @@ class Dashboard {
     constructor() {
         this.properties = [];
         this.filteredProperties = [];
+        this.imageManifest = {};
         this.filters = {
             district: 'all',
             maxPrice: 50000,
@@ -60,14 +61,16 @@ class Dashboard {
     
     async loadData() {
         try {
-            const response = await fetch('data/properties.json');
-            if (!response.ok) {
-                throw new Error(`Error HTTP ${response.status}`);
-            }
-            
-            this.properties = await response.json();
+            // Feed de cambios (scripts/delta_feed.py); sin feed, JSON completo
+            this.properties = await this.syncProperties()
+                .catch(() => this.fetchAllProperties());
             this.filteredProperties = [...this.properties];
             
+            // Variantes responsivas de imágenes (scripts/build_images.py); opcional
+            this.imageManifest = await fetch('assets/img/build/manifest.json')
+                .then(r => r.ok ? r.json() : {})
+                .catch(() => ({}));
+            
             // Limpiar propiedades sin datos esenciales
             this.properties = this.properties.filter(p => 
                 p && p.district && p.price_clean && p.final_score
@@ -81,6 +84,54 @@ class Dashboard {
         }
     }
     
+    async fetchAllProperties() {
+        const response = await fetch('data/properties.json');
+        if (!response.ok) {
+            throw new Error(`Error HTTP ${response.status}`);
+        }
+        return response.json();
+    }
+    
+    async syncProperties() {
+        const feed = await fetch('data/feed/index.json', { cache: 'no-cache' })
+            .then(r => { if (!r.ok) throw new Error(`Error HTTP ${r.status}`); return r.json(); });
+        
+        // Copia local: {version, records} de la última sincronización
+        let local = null;
+        try {
+            local = JSON.parse(localStorage.getItem('lha-feed'));
+        } catch (e) {
+            local = null;
+        }
+        
+        const chainStart = feed.deltas.length ? feed.deltas[0].from : feed.version;
+        if (!local || local.version > feed.version || local.version < chainStart) {
+            // Sin copia o fuera de la cadena de deltas: partir del snapshot vigente
+            const snapshot = await fetch(`data/feed/${feed.snapshot.path}`).then(r => r.json());
+            local = { version: snapshot.version, records: snapshot.records };
+        }
+        
+        const pending = feed.deltas.filter(d => d.from >= local.version);
+        if (pending.length) {
+            const byUrl = new Map(local.records.map(r => [r.url, r]));
+            const deltas = await Promise.all(pending.map(d => fetch(`data/feed/${d.path}`).then(r => r.json())));
+            for (const delta of deltas) {
+                delta.removed.forEach(url => byUrl.delete(url));
+                delta.changed.forEach(entry => byUrl.set(entry.url, { ...byUrl.get(entry.url), ...entry }));
+                delta.added.forEach(record => byUrl.set(record.url, record));
+            }
+            local = { version: feed.version, records: [...byUrl.values()] };
+        }
+        
+        try {
+            localStorage.setItem('lha-feed', JSON.stringify(local));
+        } catch (e) {
+            // Sin espacio en localStorage: la próxima visita parte del snapshot
+        }
+        console.log(`🔁 Feed v${local.version} (${pending.length} deltas aplicados)`);
+        return local.records;
+    }
+    
     renderStats() {
         if (this.properties.length === 0) return;
         
@@ -370,12 +421,11 @@ class Dashboard {
         const bathrooms = property.bathroom_clean || '—';
         
         // Obtener imagen del distrito (si existe)
-        const districtImage = this.getDistrictImage(property.district);
+        const districtImage = this.getDistrictImage(property.district, property.district_slug);
         
         card.innerHTML = `
             <div class="property-image">
-                <img src="${districtImage}" alt="${property.district}" 
-                     onerror="this.src='assets/img/default.jpg'">
+                ${this.renderDistrictPicture(property, districtImage)}
                 <div class="property-score-overlay ${scoreClass}">
                     ${finalScore.toFixed(1)}
                 </div>
@@ -481,7 +531,33 @@ class Dashboard {
         return card;
     }
     
-    getDistrictImage(districtName) {
+    renderDistrictPicture(property, fallbackSrc) {
+        const fallbackImg = `<img src="${fallbackSrc}" alt="${property.district}" 
+                     onerror="this.src='assets/img/default.jpg'">`;
+        const entry = this.imageManifest[property.district_slug];
+        if (!entry) return fallbackImg;
+        
+        const srcset = variants => variants.map(v => `${v.url} ${v.width}w`).join(', ');
+        const sizes = '(max-width: 768px) 100vw, 400px';
+        const types = { avif: 'image/avif', webp: 'image/webp' };
+        
+        const sources = Object.keys(types)
+            .filter(fmt => entry.variants[fmt])
+            .map(fmt => `<source type="${types[fmt]}" srcset="${srcset(entry.variants[fmt])}" sizes="${sizes}">`)
+            .join('');
+        const jpeg = entry.variants.jpeg || [];
+        const smallest = jpeg.length ? jpeg[0].url : fallbackSrc;
+        
+        return `<picture>${sources}
+                <img src="${smallest}" srcset="${srcset(jpeg)}" sizes="${sizes}" 
+                     width="${entry.width}" height="${entry.height}" loading="lazy" 
+                     alt="${property.district}" onerror="this.src='${fallbackSrc}'">
+            </picture>`;
+    }
+    
+    getDistrictImage(districtName, districtSlug) {
+        // Slug precalculado por la dimensión de distritos (scripts/districts.py)
+        if (districtSlug) return `assets/img/${districtSlug}.jpg`;
         if (!districtName) return 'assets/img/default.jpg';
         
         // Normalizar nombre para imagen